@@ -0,0 +1,263 @@
+"""Throughput and latency benchmarks for FileOrganizer.
+
+Each scenario writes a synthetic burst of files into a temporary source
+tree and organizes it either by calling process_file directly or through a
+real watchdog observer. Results are printed as JSON so runs from different
+commits can be compared with --compare.
+
+    python benchmarks/bench.py                       # every scenario, both modes
+    python benchmarks/bench.py small duplicates --mode direct --output run.json
+    python benchmarks/bench.py --compare base.json   # show ratios against an earlier run
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from watchdog.observers import Observer
+from core.FileOrganiser import FileOrganizer
+
+KIB = 1024
+MIB = 1024 * KIB
+EXTENSIONS = ['.pdf', '.txt', '.docx', '.jpg', '.png', '.mp4', '.mp3', '.zip', '.py', '.xyz']
+BLOCK_SIZE = MIB
+
+with open(os.path.join(ROOT, "config", "file_types.json")) as f:
+    FILE_TYPES = json.load(f)
+
+def _small(rng, scale):
+    return [("src0", f"small_{i:05d}{EXTENSIONS[i % len(EXTENSIONS)]}",
+             rng.randint(1 * KIB, 8 * KIB), None)
+            for i in range(int(2000 * scale))]
+
+def _huge(rng, scale):
+    return [("src0", f"huge_{i}.mp4", int(64 * MIB * scale) or MIB, None) for i in range(4)]
+
+def _collisions(rng, scale):
+    # The same names arrive from several folders and all land in Documents/
+    count = max(1, int(100 * scale))
+    return [(f"src{d}", f"report_{i:03d}.pdf", 4 * KIB, None)
+            for d in range(10) for i in range(count)]
+
+def _duplicates(rng, scale):
+    # Ten distinct payloads, each copied many times under different names
+    return [("src0", f"copy_{i:05d}.txt", 16 * KIB, i % 10) for i in range(int(500 * scale))]
+
+def _mixed(rng, scale):
+    specs = []
+    for i in range(int(1000 * scale)):
+        size = int(KIB * 2 ** rng.uniform(0, 12))  # 1 KiB to 4 MiB, log-distributed
+        specs.append((f"src{i % 3}", f"mixed_{i:05d}{rng.choice(EXTENSIONS)}", size, None))
+    return specs
+
+SCENARIOS = {
+    'small': _small,
+    'huge': _huge,
+    'collisions': _collisions,
+    'duplicates': _duplicates,
+    'mixed': _mixed,
+}
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Burst:
+    def __init__(self, specs, workdir, seed):
+        """Write a scenario's files reproducibly; content depends only on seed and spec"""
+        self.specs = specs
+        self.workdir = workdir
+        self.rng = random.Random(seed)
+        self.block = self.rng.randbytes(BLOCK_SIZE)
+        self.source_dirs = sorted({os.path.join(workdir, d) for d, _, _, _ in specs})
+        self.created = {}  # path -> monotonic time the write finished
+        self.total_bytes = sum(size for _, _, size, _ in specs)
+
+    def write(self):
+        for directory in self.source_dirs:
+            os.makedirs(directory, exist_ok=True)
+        for index, (directory, name, size, payload) in enumerate(self.specs):
+            path = os.path.join(self.workdir, directory, name)
+            # A unique header keeps files distinct unless they share a payload id
+            header = f"{payload if payload is not None else index}:".encode()
+            with open(path, 'wb') as f:
+                f.write(header[:size])
+                remaining = size - min(len(header), size)
+                while remaining:
+                    chunk = self.block[:min(remaining, BLOCK_SIZE)]
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            self.created[path] = time.monotonic()
+
+class Run:
+    def __init__(self, burst, dest_dir, quiet_period):
+        self.burst = burst
+        self.organizer = FileOrganizer(burst.source_dirs, dest_dir, file_types=FILE_TYPES)
+        self.organizer.start_time = 0
+        self.organizer.coalescer.quiet_period = quiet_period
+        self.latencies = []
+        self.moved = 0
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._expected = len(burst.specs)
+        self._finished = 0
+
+    def _timed(self, item):
+        result = self.organizer.process_file(item)
+        finished = time.monotonic()
+        path = getattr(item, 'path', item)
+        with self._lock:
+            created = self.burst.created.get(path)
+            if created is not None:
+                self.latencies.append(finished - created)
+            if result:
+                self.moved += 1
+            self._finished += 1
+            if self._finished >= self._expected:
+                self.done.set()
+        return result
+
+    def direct(self):
+        self.burst.write()
+        started = time.monotonic()
+        for path in list(self.burst.created):
+            self._timed(path)
+        return started, time.monotonic()
+
+    def watchdog(self, timeout):
+        self.organizer.worker_pool.handler = self._timed
+        observers = []
+        for directory in self.burst.source_dirs:
+            os.makedirs(directory, exist_ok=True)
+            observer = Observer()
+            observer.schedule(self.organizer, directory, recursive=False)
+            observer.start()
+            observers.append(observer)
+        started = time.monotonic()
+        try:
+            self.burst.write()
+            if not self.done.wait(timeout):
+                logging.warning(f"Timed out with {self._finished}/{self._expected} files handled")
+            finished = time.monotonic()
+        finally:
+            for observer in observers:
+                observer.stop()
+            for observer in observers:
+                observer.join()
+        return started, finished
+
+    def result(self, started, finished):
+        elapsed = max(finished - started, 1e-9)
+        events = self.organizer.coalescer.events_received
+        return {
+            'files': self._expected,
+            'moved': self.moved,
+            'bytes': self.burst.total_bytes,
+            'seconds': elapsed,
+            'events': events,
+            'events_per_second': events / elapsed,
+            'moves_per_second': self.moved / elapsed,
+            'bytes_per_second': self.burst.total_bytes / elapsed,
+            'latency_p50': percentile(self.latencies, 0.50),
+            'latency_p99': percentile(self.latencies, 0.99),
+            'duplicates': self.organizer.duplicate_handler.get_counters()['duplicates'],
+        }
+
+def run_scenario(name, mode, scale, seed, quiet_period, timeout):
+    specs = SCENARIOS[name](random.Random(seed), scale)
+    workdir = tempfile.mkdtemp(prefix=f"fileforge-bench-{name}-")
+    try:
+        burst = Burst(specs, workdir, seed)
+        run = Run(burst, os.path.join(workdir, "Organized"), quiet_period)
+        try:
+            if mode == 'direct':
+                started, finished = run.direct()
+            else:
+                started, finished = run.watchdog(timeout)
+        finally:
+            run.organizer.stop()
+        result = run.result(started, finished)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    result.update({'scenario': name, 'mode': mode})
+    return result
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['scenario'], r['mode']): r for r in json.load(f)['results']}
+    for result in results:
+        base = baseline.get((result['scenario'], result['mode']))
+        if base is None:
+            continue
+        moves = result['moves_per_second'] / base['moves_per_second'] if base['moves_per_second'] else 0
+        p99 = result['latency_p99'] / base['latency_p99'] if base['latency_p99'] else 0
+        print(f"{result['scenario']:>10} {result['mode']:>8}  moves/s x{moves:.2f}  p99 x{p99:.2f}",
+              file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark File Forge throughput and latency")
+    parser.add_argument('scenarios', nargs='*', help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--mode', choices=['direct', 'watchdog', 'both'], default='both')
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply file counts and sizes")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--quiet-period', type=float, default=0.2)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    parser.add_argument('--compare', help="earlier JSON output to compare against")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+    modes = ['direct', 'watchdog'] if args.mode == 'both' else [args.mode]
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        for mode in modes:
+            result = run_scenario(name, mode, args.scale, args.seed, args.quiet_period, args.timeout)
+            print(f"{name:>10} {mode:>8}  {result['moves_per_second']:9.1f} moves/s  "
+                  f"{result['bytes_per_second'] / MIB:8.1f} MiB/s  "
+                  f"p50 {result['latency_p50'] * 1000:8.1f} ms  "
+                  f"p99 {result['latency_p99'] * 1000:8.1f} ms", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'seed': args.seed,
+        'quiet_period': args.quiet_period,
+        'results': results,
+    }
+    if args.compare:
+        compare(results, args.compare)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import pickle
+import logging
+
+# Bump when the shape of anything cached changes
+CACHE_VERSION = 1
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, st.st_mtime_ns, st.st_size
+
+def load_cached(cache_path, sources, build):
+    """Return build(), reusing the pickled result in cache_path while every source is unchanged.
+
+    The cache is keyed on each source file's mtime and size, so editing
+    the JSON invalidates it; a missing, stale or unreadable cache simply
+    falls back to build() and is rewritten.
+    """
+    key = (CACHE_VERSION, tuple(_stamp(path) for path in sources))
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_key, payload = pickle.load(f)
+        if cached_key == key:
+            return payload
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.debug(f"Ignoring unreadable config cache {cache_path}: {str(e)}")
+
+    payload = build()
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            pickle.dump((key, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logging.debug(f"Could not write config cache {cache_path}: {str(e)}")
+    return payload
@@ -1,22 +1,102 @@
 import json
 import os
 from pathlib import Path
+import logging
+from core.classifier import ExtensionClassifier
+from core.rules import RuleEngine
+from config.cache import load_cached
 
 class Config:
     def __init__(self):
+        self.config_path = os.path.join(os.path.dirname(__file__), "file_types.json")
+        self.rules_path = os.path.join(os.path.dirname(__file__), "rules.json")
+        self.organizer_path = os.path.join(os.path.dirname(__file__), "organizer.json")
+        # Compiled tables are pickled next to the byte code and reused until the JSON changes
+        self.cache_dir = os.path.join(os.path.dirname(__file__), "__pycache__")
+        self.classifier = ExtensionClassifier()
+        self.rules = RuleEngine()
         self.load_config()
+        self.load_rules()
+        self.load_organizer_config()
         self._setup_directories()
         
     def load_config(self):
-        config_path = os.path.join(os.path.dirname(__file__), "file_types.json")
-        with open(config_path) as f:
-            self.file_types = json.load(f)
-            
-        # Create case-insensitive mapping of extensions to categories
-        self.flattened_types = {}
-        for category, extensions in self.file_types.items():
-            for ext in extensions:
-                self.flattened_types[ext.lower()] = category
+        self._config_mtime = os.path.getmtime(self.config_path)
+
+        def build():
+            with open(self.config_path) as f:
+                file_types = json.load(f)
+            return file_types, ExtensionClassifier.compile(file_types)
+
+        self.file_types, compiled = load_cached(
+            os.path.join(self.cache_dir, "file_types.cache"), [self.config_path], build
+        )
+        # Swap the shared extension index in place so holders of
+        # self.classifier pick up the new mapping
+        self.classifier.load_compiled(compiled)
+
+    def load_rules(self):
+        """Compile rules.json, if present, into the shared rule engine"""
+        try:
+            self._rules_mtime = os.path.getmtime(self.rules_path)
+        except OSError:
+            self._rules_mtime = None
+            self.rules.load([])
+            return
+
+        def build():
+            with open(self.rules_path) as f:
+                return RuleEngine.compile(json.load(f))
+
+        self.rules.load_compiled(
+            load_cached(os.path.join(self.cache_dir, "rules.cache"), [self.rules_path], build)
+        )
+
+    def load_organizer_config(self):
+        """Read organizer settings (workers, quiet_period, io_budgets, ...) from organizer.json, if present"""
+        self.organizer_config = {}
+        try:
+            with open(self.organizer_path) as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            logging.error(f"Ignoring invalid {self.organizer_path}: {str(e)}")
+            return
+        if not isinstance(settings, dict):
+            logging.error(f"Ignoring {self.organizer_path}: expected an object of settings")
+            return
+        self.organizer_config = settings
+
+    def reload_if_changed(self):
+        """Reload file_types.json or rules.json if either changed on disk, return True if reloaded"""
+        reloaded = False
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            mtime = self._config_mtime
+        if mtime != self._config_mtime:
+            try:
+                self.load_config()
+                reloaded = True
+            except (ValueError, OSError) as e:
+                # Keep classifying with the previous mapping until the file is fixed
+                self._config_mtime = mtime
+                logging.error(f"Invalid file types in {self.config_path}: {str(e)}")
+        try:
+            rules_mtime = os.path.getmtime(self.rules_path)
+        except OSError:
+            rules_mtime = None
+        if rules_mtime != self._rules_mtime:
+            try:
+                self.load_rules()
+                logging.info(f"Loaded {len(self.rules)} routing rules")
+                reloaded = True
+            except (ValueError, OSError) as e:
+                # Keep routing with the previous rules until the file is fixed
+                self._rules_mtime = rules_mtime
+                logging.error(f"Invalid rules in {self.rules_path}: {str(e)}")
+        return reloaded
     
     def _setup_directories(self):
         self.monitored_dirs = [
@@ -26,8 +106,4 @@ class Config:
         self.destination_dir = "D:\\OrganizedFiles"  # Changed to D drive
                 
     def get_category(self, filepath):
-        if filepath.endswith(".tar.gz"):
-            ext = ".tar.gz"
-        else:
-            ext = os.path.splitext(filepath)[1].lower()
-        return self.flattened_types.get(ext, "Others")
\ No newline at end of file
+        return self.classifier.classify(filepath)
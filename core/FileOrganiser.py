@@ -1,203 +1,713 @@
 import os
-import shutil
 import time
 import logging
 from watchdog.events import FileSystemEventHandler
 import datetime
-from core.file_handler import FileHandler
+from core.file_handler import FileHandler, TIMESTAMP_SLACK
+from core.classifier import ExtensionClassifier
+from core.rules import RuleEngine
+from core.coalescer import EventCoalescer
+from core.scheduler import IOScheduler, DeviceBudgets
+from core.transfer import FileTransfer
+from core.names import NameAllocator
+from core.sniffer import ContentSniffer, AMBIGUOUS
+from core.record import FileRecord
+from core.state import LRUCache, approximate_size
 from features.stats import StatsManager
-from features.duplicates import DuplicateHandler
-from features.compression import CompressionHandler
+from features.metrics import Metrics, MetricsServer, SnapshotWriter
+from features.tracing import Tracer
+
+STAGES = ('detect', 'stabilize', 'classify', 'hash', 'move')
 
 class FileOrganizer(FileSystemEventHandler):
-    def __init__(self, source_dirs, dest_dir, file_types=None):
+    def __init__(self, source_dirs, dest_dir, file_types=None, classifier=None, rules=None,
+                 launched_at=None, shard=None, coordinator=None, config=None):
+        """launched_at is the time.perf_counter() value the process started at, for startup timing.
+
+        config overrides entries of the defaults below (Config.organizer_config
+        reads them from config/organizer.json); unknown keys are logged and ignored.
+
+        shard=(index, count) limits this organizer to the paths that hash to
+        index, so count processes can split the same trees; coordinator (a
+        Coordinator) makes each file claimed by one process before it is handled.
+        """
+        self.launched_at = launched_at if launched_at is not None else time.perf_counter()
+        self.first_event_at = None
         self.source_dirs = source_dirs
         self.dest_dir = dest_dir
         self.destination_base_dir = dest_dir  # Add this to fix attribute error
         self.file_types = file_types or {}
+        # Share the caller's classifier (e.g. Config.classifier) so config reloads apply here too
+        self.classifier = classifier or ExtensionClassifier(self.file_types)
+        self._owns_classifier = classifier is None
+        # Routing rules (Config.rules) take precedence over the extension categories
+        self.rules = rules if rules is not None else RuleEngine()
+        self.shard = shard
+        if shard is not None:
+            # Only sharded runs need coordination, which loads sqlite3
+            from core.coordination import shard_of
+            self._shard_of = shard_of
+        self.coordinator = coordinator
         
         # Initialize configuration
         self.config = {
             'enable_compression': False,
+            'compression': {},  # CompressionHandler options: codecs, rolling, max_archive_size, batch_size, ...
             'enable_stats': True,
             'enable_duplicates': True,
+            'duplicate_action': 'keep',  # 'keep' organizes duplicates anyway, 'skip' leaves them in place
+            'content_store': False,  # store each unique file once and link it into category folders
+            'link_mode': 'auto',  # content store links: 'auto' (reflink, else hardlink), 'reflink' or 'hardlink'
+            'near_duplicates': False,  # chunk files to find earlier versions that differ by a few bytes
+            'near_duplicate_action': 'flag',  # 'flag' logs and counts them, 'group' files them next to the closest match
+            'near_duplicate_threshold': 0.8,  # fraction of bytes two files must share
+            'near_duplicate_min_size': 1024 * 1024,  # smaller files are only compared whole
+            'duplicate_mode': 'default',  # 'default' (md5), 'fast' (xxh3) or 'verified' (sha256 + byte compare)
+            'hash_workers': None,  # None sizes the hashing pool from the CPU count
+            'hash_mode': 'thread',  # 'process' for CPU-bound hash algorithms
+            'quiet_period': 2.0,  # seconds a file must stay unchanged before it is organized
+            'workers': 4,  # threads moving files; moves into one category folder stay in order
+            'max_queue': 1000,  # settled files waiting for a worker before dispatch blocks
+            'large_workers': 1,  # extra threads for large files, so they never hold up small ones
+            'large_file_threshold': 64 * 1024 * 1024,  # bytes at which a file counts as large
+            'io_budgets': {},  # path on a device -> {'bytes_per_sec': ..., 'iops': ...}
+            'io_budget': None,  # budget for every other destination device, None for unlimited
+            'fsync': 'none',  # 'each' or 'batch' to flush cross-device copies to disk
+            'metrics_port': 9464,  # localhost Prometheus endpoint, None to disable
+            'metrics_snapshot': os.path.join(self.dest_dir, ".fileforge", "metrics.json"),
+            'metrics_interval': 60,  # seconds between JSON snapshots
+            'recent_paths': 10000,  # organized paths remembered to ignore events our own moves cause
+            'recent_ttl': 3600,  # seconds before a remembered path is forgotten
+            'reconcile_interval': 300,  # seconds between rescans for files no event reported, None to disable
             'get_category': self._get_category  # Add method for category determination
         }
+        for key, value in (config or {}).items():
+            if key in self.config and key != 'get_category':
+                self.config[key] = value
+            else:
+                logging.warning(f"Ignoring unknown organizer setting: {key}")
         
-        # Initialize handlers
-        self.file_handler = FileHandler(self.dest_dir)
+        # Initialize handlers; duplicate detection and compression are built
+        # (and their modules imported) on first use so startup stays cheap
         self.stats_manager = StatsManager()
-        self.duplicate_handler = DuplicateHandler()
-        self.compression_handler = CompressionHandler()
+        self._duplicate_handler = None
+        self._compression_handler = None
+        self._content_store = None
+        self._chunk_index = None
+        if self.config['enable_compression']:
+            self.compression_handler  # check its settings now rather than on the first file
+        self.io_budgets = DeviceBudgets(self.config['io_budgets'], self.config['io_budget'])
+        self._journal = None
+        self.journal_path = os.path.join(self.dest_dir, ".fileforge", "journal.db")
+        self.transfer = FileTransfer(
+            fsync=self.config['fsync'],
+            verify_with=self._file_digest,
+            throttle=self.io_budgets
+        )
+        self.names = NameAllocator()
+        self.sniffer = ContentSniffer()
+        # Off by default; enable() or the /trace and /profile metrics routes switch it on at runtime
+        self.tracer = Tracer()
+        self.file_handler = FileHandler(
+            self.dest_dir, transfer=self.transfer, names=self.names, sniffer=self.sniffer,
+            tracer=self.tracer
+        )
         
         # Initialize processing variables
-        self.processed_files = set()
-        self.pending_files = []
-        self.last_batch_time = time.time()
-        self.batch_interval = 5
-        self.max_pending = 50
+        self.processed_files = LRUCache(self.config['recent_paths'], self.config['recent_ttl'])
+        # Files the reconciler found; organized even if they predate startup
+        self.recovered_files = LRUCache(self.config['recent_paths'], self.config['recent_ttl'])
+        self.reconciler = None
         self.start_time = time.time()
-        
-        self._create_directories()
+        # Events are coalesced per path and, once the file has settled, handed to
+        # the worker pool so no filesystem I/O runs on the watchdog thread
+        self.worker_pool = IOScheduler(
+            self.process_file,
+            workers=self.config['workers'],
+            large_workers=self.config['large_workers'],
+            large_threshold=self.config['large_file_threshold'],
+            max_pending=self.config['max_queue']
+        )
+        self._init_metrics()
+        self.coalescer = EventCoalescer(
+            self._submit, self.config['quiet_period'], on_settled=self.stage_seconds['stabilize'].observe
+        )
+        # Category folders are created by NameAllocator.claim when first used
+        self.ready_at = time.perf_counter()
 
-    def process_pending_files(self):
-        # Process any files that might be waiting
-        time.sleep(0.1)  # Small delay to ensure file operations complete
-        current_time = time.time()
-        if not self.pending_files or (current_time - self.last_batch_time) < self.batch_interval:
+    @property
+    def duplicate_handler(self):
+        if self._duplicate_handler is None:
+            from features.duplicates import DuplicateHandler
+            from features.hashing import HashEngine
+            self._duplicate_handler = DuplicateHandler(
+                index_path=os.path.join(self.dest_dir, ".fileforge", "hashes.db"),
+                root=self.dest_dir,
+                mode=self.config['duplicate_mode'],
+                engine=HashEngine(
+                    DuplicateHandler.PRESETS[self.config['duplicate_mode']][0],
+                    workers=self.config['hash_workers'],
+                    mode=self.config['hash_mode']
+                )
+            )
+        return self._duplicate_handler
+
+    @property
+    def compression_handler(self):
+        if self._compression_handler is None:
+            from features.compression import CompressionHandler
+            try:
+                self._compression_handler = CompressionHandler(**(self.config['compression'] or {}))
+            except TypeError as e:
+                raise ValueError(f"Invalid compression setting: {str(e)}") from None
+        return self._compression_handler
+
+    @property
+    def content_store(self):
+        if self._content_store is None:
+            from features.content_store import ContentStore
+            self._content_store = ContentStore(
+                self.dest_dir, self.duplicate_handler.algorithm, self.config['link_mode'],
+                transfer=self.transfer, engine=self.duplicate_handler.engine
+            )
+        return self._content_store
+
+    @property
+    def journal(self):
+        """Move journal; recover_moves() settles moves a crash interrupted"""
+        if self._journal is None:
+            from core.journal import MoveJournal
+            self._journal = MoveJournal(self.journal_path)
+        return self._journal
+
+    @property
+    def chunk_index(self):
+        if self._chunk_index is None:
+            from features.chunking import Chunker, ChunkIndex
+            self.chunker = Chunker()
+            self._chunk_index = ChunkIndex(os.path.join(self.dest_dir, ".fileforge", "chunks.db"))
+        return self._chunk_index
+
+    def _find_near_duplicate(self, record):
+        """Chunk a file and return (chunks, closest (path, similarity) or None)"""
+        index = self.chunk_index
+        chunks = self.chunker.chunk_file(record.path)
+        matches = index.similar(chunks, record.size, self.config['near_duplicate_threshold'], limit=1)
+        return chunks, matches[0] if matches else None
+
+    def _file_digest(self, path):
+        return self.duplicate_handler.get_file_digest(path)
+
+    def startup_report(self):
+        """Seconds from launch until ready to handle events, and until the first event arrived"""
+        return {
+            'ready_seconds': self.ready_at - self.launched_at,
+            'first_event_seconds': (self.first_event_at - self.launched_at
+                                    if self.first_event_at is not None else None),
+        }
+
+    def _init_metrics(self):
+        """Register counters, per-stage histograms and queue gauges; exporters start separately"""
+        self.metrics = Metrics()
+        self.stage_seconds = {
+            stage: self.metrics.histogram('fileforge_stage_seconds', "Time spent per pipeline stage",
+                                          {'stage': stage})
+            for stage in STAGES
+        }
+        self.errors = self.metrics.counter('fileforge_errors_total', "Files that failed to process")
+        self.duplicates_skipped = self.metrics.counter('fileforge_duplicates_skipped_total',
+                                                       "Duplicates left in place")
+        self.metrics.gauge('fileforge_pending_files', lambda: self.coalescer.pending_count(),
+                           "Files waiting to settle")
+        self.metrics.gauge('fileforge_queue_depth', lambda: self.worker_pool.depth(),
+                           "Settled files waiting for a worker")
+        self.metrics.gauge('fileforge_bytes_per_second', self._bytes_per_second,
+                           "Average bytes organized per second since startup")
+        self.metrics.add_collector(self.stats_manager.collect)
+        self.metrics.add_collector(self._collect_pipeline)
+        self.metrics.add_collector(self._collect_memory)
+        self.metrics.gauge('fileforge_startup_seconds', lambda: self.startup_report()['ready_seconds'],
+                           "Seconds from launch until events were accepted")
+        self._exporters = []
+
+    def _bytes_per_second(self):
+        elapsed = time.time() - self.start_time
+        return self.stats_manager.get_stats()['size_processed'] / elapsed if elapsed else 0.0
+
+    def _collect_pipeline(self):
+        for name, value in self.worker_pool.get_metrics().items():
+            yield (f'fileforge_workers_{name}', 'gauge', "Worker pool statistic", {}, value)
+        counters = self._journal.counters if self._journal else {}
+        for name, value in counters.items():
+            if name == 'largest_batch':
+                yield ('fileforge_journal_largest_batch', 'gauge', "Most records in one journal commit", {}, value)
+            else:
+                yield (f'fileforge_journal_{name}_total', 'counter', "Move journal counter", {}, value)
+        counters = self.reconciler.counters if self.reconciler else {}
+        for name, value in counters.items():
+            yield (f'fileforge_reconcile_{name}_total', 'counter', "Reconciliation counter", {}, value)
+        yield ('fileforge_io_throttled_seconds_total', 'counter', "Seconds moves waited for I/O budget",
+               {}, self.io_budgets.throttled_seconds)
+        counters = self._duplicate_handler.get_counters() if self._duplicate_handler else {}
+        for name, value in counters.items():
+            yield (f'fileforge_duplicates_{name}_total', 'counter', "Duplicate detection counter",
+                   {}, value)
+        counters = self._chunk_index.get_counters() if self._chunk_index else {}
+        for name, value in counters.items():
+            yield (f'fileforge_chunks_{name}_total', 'counter', "Chunk index counter", {}, value)
+        counters = self._content_store.get_counters() if self._content_store else {}
+        for name, value in counters.items():
+            yield (f'fileforge_store_{name}_total', 'counter', "Content store counter", {}, value)
+        yield ('fileforge_events_total', 'counter', "Filesystem events received",
+               {}, self.coalescer.events_received)
+        yield ('fileforge_events_coalesced_total', 'counter', "Events merged into a pending file",
+               {}, self.coalescer.events_coalesced)
+
+    def _output_path(self, prefix, extension):
+        """A fresh file under .fileforge for trace and profile output"""
+        directory = os.path.join(self.dest_dir, ".fileforge")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+                                       f".{extension}")
+
+    def _trace_route(self, query):
+        """GET /trace returns per-stage totals"""
+        return {'enabled': self.tracer.enabled, 'stages': self.tracer.summary()}
+
+    def _trace_action(self, query):
+        """POST /trace?enable=1|0 toggles tracing, POST /trace?dump=1 writes a Chrome trace"""
+        if 'enable' in query:
+            if query['enable'] in ('1', 'true', 'on'):
+                self.tracer.enable()
+            else:
+                self.tracer.disable()
+        result = self._trace_route(query)
+        if query.get('dump') in ('1', 'true', 'on'):
+            result['path'] = self._output_path("trace", "json")
+            self.tracer.dump_trace(result['path'])
+        return result
+
+    def _profile_action(self, query):
+        """POST /profile?seconds=30 profiles file processing for a window"""
+        seconds = min(float(query.get('seconds', 30)), 3600)
+        path = self._output_path("profile", "prof")
+        return {'started': self.tracer.profile(seconds, path), 'path': path}
+
+    def memory_report(self):
+        """Entries and approximate bytes held by each long-lived in-memory structure"""
+        coalescer, pool = self.coalescer, self.worker_pool
+        report = {
+            'processed_files': (len(self.processed_files), self.processed_files.sizeof()),
+            'recovered_files': (len(self.recovered_files), self.recovered_files.sizeof()),
+            'sniffer_cache': (len(self.sniffer._cache), self.sniffer._cache.sizeof()),
+            'destination_names': (len(self.names), approximate_size(self.names._dirs, depth=4)),
+            'pending_events': (coalescer.pending_count(),
+                               approximate_size(coalescer._entries) + approximate_size(coalescer._heap)),
+            'queued_files': (pool.depth(), approximate_size(pool._queues, depth=3)),
+            'trace_spans': (len(self.tracer.spans), approximate_size(self.tracer.spans, depth=1)
+                            + len(self.tracer.spans) * 120),
+        }
+        return {name: {'entries': entries, 'bytes': size} for name, (entries, size) in report.items()}
+
+    def _collect_memory(self):
+        for name, usage in self.memory_report().items():
+            yield ('fileforge_state_entries', 'gauge', "Entries held in memory",
+                   {'structure': name}, usage['entries'])
+            yield ('fileforge_state_bytes', 'gauge', "Approximate bytes held in memory",
+                   {'structure': name}, usage['bytes'])
+
+    def start_metrics(self):
+        """Start the localhost HTTP exporter and the periodic JSON snapshot, as configured"""
+        if self.config['metrics_port'] is not None:
+            server = MetricsServer(self.metrics, port=self.config['metrics_port'],
+                                   routes={'/trace': self._trace_route},
+                                   actions={'/trace': self._trace_action,
+                                            '/profile': self._profile_action})
+            try:
+                server.start()
+                self._exporters.append(server)
+            except OSError as e:
+                logging.warning(f"Could not start metrics server: {str(e)}")
+        if self.config['metrics_snapshot']:
+            writer = SnapshotWriter(self.metrics, self.config['metrics_snapshot'],
+                                    self.config['metrics_interval'])
+            writer.start()
+            self._exporters.append(writer)
+
+    def start_reconciler(self):
+        """Periodically rescan the monitored directories for files whose events were lost"""
+        if self.config['reconcile_interval'] is None:
             return
+        from core.reconcile import Reconciler
+        # Each shard keeps a snapshot of just its own files
+        name = "reconcile.json" if self.shard is None else f"reconcile-{self.shard[0]}.json"
+        self.reconciler = Reconciler(self, self.source_dirs,
+                                     os.path.join(self.dest_dir, ".fileforge", name),
+                                     interval=self.config['reconcile_interval'])
+        self.reconciler.start()
 
-        files_to_process = self.pending_files[:self.max_pending]
-        self.pending_files = self.pending_files[self.max_pending:]
+    def owns(self, path):
+        """True unless path hashes to another shard"""
+        return self.shard is None or self._shard_of(path, self.shard[1]) == self.shard[0]
 
-        for event in files_to_process:
-            self._process_file(event)
+    def recover(self, path):
+        """Queue a file that no event reported, even one that arrived before startup"""
+        self.recovered_files.add(path)
+        self._queue_path(path)
 
-        self.last_batch_time = current_time
+    def recover_moves(self):
+        """Complete or roll back moves a previous run left half done, and requeue rolled back files"""
+        if self._journal is None and not os.path.exists(self.journal_path):
+            return  # nothing was ever moved, so there is nothing to settle or to load sqlite3 for
+        for source in self.journal.recover():
+            self.recover(source)
 
-        if len(self.processed_files) > 1000:
-            self.processed_files.clear()
+    def process_pending_files(self):
+        """Dispatch any pending files that have already settled"""
+        self.coalescer.poll()
+        self.processed_files.prune()
+        self.recovered_files.prune()
+
+    def stop(self, drain=True, timeout=None):
+        """Stop dispatching and let the workers finish queued files"""
+        if self.reconciler is not None:
+            self.reconciler.stop()
+        self.coalescer.stop()
+        self.worker_pool.shutdown(drain=drain, timeout=timeout)
+        self.transfer.flush()
+        if self._journal is not None:
+            self._journal.close()
+        if self._compression_handler is not None:
+            self._compression_handler.shutdown()
+        if self._content_store is not None:
+            self._content_store.close()
+        if self._chunk_index is not None:
+            self._chunk_index.close()
+        for exporter in self._exporters:
+            exporter.stop()
+        self._exporters = []
+        metrics = self.worker_pool.get_metrics()
+        logging.info(f"Worker pool stopped after {metrics['completed']} files "
+                     f"(max queue depth {metrics['max_depth']})")
+        usage = self.memory_report()
+        logging.info("In-memory state: " + ", ".join(
+            f"{name} {u['entries']} entries/{u['bytes'] // 1024} KiB" for name, u in usage.items()
+        ))
+
+    def _submit(self, file_path, st=None):
+        """Queue a settled file, keyed by its category folder to keep per-folder order"""
+        item = FileRecord.from_stat(file_path, st) if st is not None else file_path
+        self.worker_pool.submit(self._get_category(file_path), item,
+                                size=st.st_size if st is not None else None,
+                                source=os.path.dirname(file_path))
+
+    def _queue_path(self, path):
+        started = time.perf_counter()
+        if self.first_event_at is None:
+            self.first_event_at = started
+            logging.info(f"First event {(started - self.launched_at) * 1000:.1f} ms after launch")
+        # Files we just organized can raise events when the destination is watched too
+        if not self.owns(path):
+            return  # another shard's file
+        if not self._is_temp_file(path) and path not in self.processed_files:
+            self.coalescer.add(path)
+        self.stage_seconds['detect'].observe(time.perf_counter() - started)
 
     def on_created(self, event):
         """Handle file creation event"""
         if not event.is_directory:
-            self.process_file(event.src_path)
+            self._queue_path(event.src_path)
 
     def on_modified(self, event):
         """Handle file modification event"""
         if not event.is_directory:
-            self.process_file(event.src_path)
+            self._queue_path(event.src_path)
 
-    def process_file(self, file_path):
-        """Process a single file"""
-        try:
-            if not os.path.exists(file_path):
-                return
-
-            # Skip if file existed before program start
-            if not self._is_new_file(file_path):
-                return
-
-            # Skip temporary files
-            if self._is_temp_file(file_path):
-                return
-
-            # Get category
-            category = self._get_category(file_path)
-            filename = os.path.basename(file_path)
-            
-            # Setup destination
-            dest_dir = os.path.join(self.dest_dir, category)
-            os.makedirs(dest_dir, exist_ok=True)
-            
-            dest_path = os.path.join(dest_dir, filename)
-            
-            # Handle duplicates
-            if os.path.exists(dest_path):
-                base_name, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(dest_path):
-                    new_name = f"{base_name}_{counter}{ext}"
-                    dest_path = os.path.join(dest_dir, new_name)
-                    counter += 1
-
-            # Move file
-            shutil.move(file_path, dest_path)
-            logging.info(f"Moved {filename} to {category}")
-            
-            # Update stats
-            self.stats_manager.update_stats({
-                'size': os.path.getsize(dest_path),
-                'category': category
-            })
-            
-            return dest_path
+    def on_closed(self, event):
+        """Handle a writer closing a file, reported by the inotify backend"""
+        if not event.is_directory:
+            self._queue_path(event.src_path)
 
-        except Exception as e:
-            logging.error(f"Error processing {file_path}: {str(e)}")
+    def on_moved(self, event):
+        """Handle renames such as a browser finishing a .crdownload"""
+        if not event.is_directory:
+            self._queue_path(event.dest_path)
+
+    def process_file(self, file_path, include_existing=False, raise_errors=False):
+        """Process a single file, include_existing also organizes files older than startup.
+
+        With a coordinator the file is claimed first and skipped if another
+        process already holds it. Errors are logged and counted, and also
+        re-raised with raise_errors so callers can retry the file.
+        """
+        if self.coordinator is None:
+            return self._organize(file_path, include_existing, raise_errors)
+        path = file_path.path if isinstance(file_path, FileRecord) else file_path
+        if not self.coordinator.claim(path):
+            logging.debug(f"{path} is being handled by another process")
             return None
+        try:
+            return self._organize(file_path, include_existing, raise_errors)
+        finally:
+            self.coordinator.finish(path)
+
+    def _organize(self, file_path, include_existing=False, raise_errors=False):
+        """Classify and move one file.
+
+        file_path may be a path or a FileRecord that already carries its stat;
+        either way the file is stat'ed at most once.
+        """
+        record = file_path
+        tracer = self.tracer
+        with tracer.span('process_file', root=True) as span:
+            try:
+                if not isinstance(record, FileRecord):
+                    try:
+                        record = FileRecord.from_path(file_path)
+                    except OSError:
+                        span.outcome = 'gone'
+                        return
+                file_path = record.path
+                span.size = record.size
+
+                # Skip if file existed before program start
+                if not include_existing and not self._is_new_file(record) and \
+                        file_path not in self.recovered_files:
+                    span.outcome = 'existing'
+                    return
+
+                # Skip temporary files
+                if self._is_temp_file(file_path):
+                    span.outcome = 'temporary'
+                    return
+
+                stages = self.stage_seconds
+                started = time.perf_counter()
+                # One header read serves type detection, the readiness check and the first hash chunk
+                with tracer.span('sniff', record.size):
+                    probe = self.sniffer.probe(file_path, record)
+                if probe is None:
+                    logging.debug(f"File {file_path} is not readable yet")
+                    span.outcome = 'unreadable'
+                    return None
+                sniffed, header = probe
+
+                # Get category, letting a routing rule override the destination folder
+                dest_base = self.dest_dir
+                with tracer.span('classify'):
+                    rule = self.rules.match(record)
+                    if rule is not None:
+                        category, filename = rule.category, os.path.basename(file_path)
+                        if rule.destination:
+                            dest_base = os.path.expanduser(rule.destination)
+                    else:
+                        category, filename = self._classify(file_path, sniffed)
+                record.category = category or rule.name
+                hashed = time.perf_counter()
+                stages['classify'].observe(hashed - started)
+
+                # Check for content already present in the destination tree
+                with tracer.span('hash', record.size) as hash_span:
+                    duplicate = self._check_duplicate(record, header)
+                    hash_span.outcome = 'duplicate' if duplicate else 'unique'
+                    # Only the default destination shares a filesystem with the store
+                    use_store = self.config['content_store'] and dest_base == self.dest_dir
+                    if use_store and not duplicate and record.digest is None:
+                        record.digest = self.duplicate_handler.engine.submit(file_path, header).result()
+                if duplicate:
+                    self.duplicates_skipped.inc()
+                    span.outcome = 'duplicate'
+                    return None
+                dest_dir = os.path.join(dest_base, category)
+                chunks = None
+                if self.config['near_duplicates'] and record.size >= self.config['near_duplicate_min_size']:
+                    with tracer.span('chunk', record.size):
+                        chunks, near = self._find_near_duplicate(record)
+                    if near is not None:
+                        logging.info(f"Near-duplicate: {filename} shares {near[1]:.0%} of its content "
+                                     f"with {near[0]}")
+                        if self.config['near_duplicate_action'] == 'group':
+                            dest_dir = os.path.dirname(near[0])
+                started = time.perf_counter()
+                stages['hash'].observe(started - hashed)
+
+                # Claim a free name in the category folder (created on first use)
+                with tracer.span('claim'):
+                    dest_path = self.names.claim(dest_dir, filename)
+
+                # Move file, verifying cross-device copies against the digest if one was computed;
+                # the journal is only loaded once there is something to move
+                self.transfer.journal = self.journal
+                with tracer.span('move', record.size) as move_span:
+                    try:
+                        if use_store:
+                            result = self.content_store.store(file_path, record.digest, dest_path,
+                                                              src_stat=record)
+                        else:
+                            result = self.transfer.move(file_path, dest_path, record.digest,
+                                                        src_stat=record)
+                    except OSError:
+                        self.names.release(dest_path)
+                        raise
+                    move_span.outcome = result['method']
+                self.processed_files.add(dest_path)
+                stages['move'].observe(time.perf_counter() - started)
+                with tracer.span('log'):
+                    logging.info(f"Moved {filename} to {category}")
+                if self.config['enable_duplicates']:
+                    # A rename keeps inode, size and mtime, so the record still describes the file
+                    with tracer.span('index'):
+                        self.duplicate_handler.record_move(
+                            file_path, dest_path, record if result['method'] == 'rename' else None
+                        )
+                if self._chunk_index is not None:
+                    with tracer.span('index'):
+                        # A file organized again (say from a watched category folder) keeps its entry
+                        self._chunk_index.rename(file_path, dest_path)
+                        if chunks is not None:
+                            self._chunk_index.add(dest_path, record.size, chunks)
+
+                # Update stats
+                self.stats_manager.update_stats({
+                    'size': record.size,
+                    'category': record.category
+                })
+
+                if self.config['enable_compression']:
+                    self.compression_handler.submit(dest_path, record.category, record.size)
+
+                span.outcome = 'moved'
+                return dest_path
+
+            except Exception as e:
+                self.errors.inc()
+                span.outcome = 'error'
+                logging.error(f"Error processing {file_path}: {str(e)}")
+                if raise_errors:
+                    raise
+                return None
+
+    def _classify(self, file_path, sniffed):
+        """Return (category, filename), using the sniffed type when the extension is missing or unknown"""
+        filename = os.path.basename(file_path)
+        category = self._get_category(file_path)
+        if sniffed is None or category != self.classifier.default_category:
+            return category, filename
+
+        has_extension = bool(os.path.splitext(filename)[1])
+        if has_extension and sniffed in AMBIGUOUS:
+            return category, filename
+        sniffed_category = self.classifier.classify_extension(sniffed)
+        if sniffed_category == self.classifier.default_category:
+            return category, filename
+        if not has_extension:
+            filename += sniffed
+        logging.debug(f"File {file_path} detected as {sniffed} from its content")
+        return sniffed_category, filename
+
+    def _check_duplicate(self, file_path, header=b""):
+        """Return True if the file is a duplicate that should be left in place"""
+        if not self.config['enable_duplicates']:
+            return False
+        record = None
+        if isinstance(file_path, FileRecord):
+            record, file_path = file_path, file_path.path
+        try:
+            duplicate_of = self.duplicate_handler.find_duplicate(file_path, header, record)
+        except OSError as e:
+            logging.warning(f"Duplicate check failed for {file_path}: {str(e)}")
+            return False
+        if duplicate_of is None:
+            return False
+        logging.info(f"Duplicate file detected: {file_path} matches {duplicate_of}")
+        return self.config['duplicate_action'] == 'skip'
 
     def _is_temp_file(self, path):
         return path.endswith((".tmp", ".crdownload"))
 
     def _is_new_file(self, filepath):
         """Check if file was created after the program started"""
+        if isinstance(filepath, FileRecord):
+            return filepath.ctime > self.start_time - TIMESTAMP_SLACK
         try:
             creation_time = os.path.getctime(filepath)
-            return creation_time > self.start_time
+            return creation_time > self.start_time - TIMESTAMP_SLACK
         except OSError:
             return False
 
     def _process_file(self, event):
-        try:
-            if not os.path.exists(event.src_path):
-                logging.warning(f"File does not exist: {event.src_path}")
-                return
-
-            # Skip if file existed before program start
-            if not self._is_new_file(event.src_path):
-                logging.debug(f"Skipping existing file: {event.src_path}")
-                return
-
-            # Check for duplicates
-            if self.duplicate_handler.is_duplicate(event.src_path):
-                logging.info(f"Duplicate file detected: {event.src_path}")
-                return
-
-            filename = os.path.basename(event.src_path)
-            category = self.config.get_category(event.src_path)
-            
-            dest_path = self.file_handler.move_file(
-                event.src_path,
-                category,
-                filename
-            )
+        tracer = self.tracer
+        with tracer.span('process_file', root=True) as span:
+            try:
+                if not os.path.exists(event.src_path):
+                    logging.warning(f"File does not exist: {event.src_path}")
+                    span.outcome = 'gone'
+                    return
 
-            if dest_path:
-                self.processed_files.add(dest_path)
-                self.stats_manager.update_stats({
-                    'size': os.path.getsize(dest_path),
-                    'category': category
-                })
-                logging.info(f"Moved {filename} to {category} folder")
+                # Skip if file existed before program start
+                if not self._is_new_file(event.src_path):
+                    logging.debug(f"Skipping existing file: {event.src_path}")
+                    span.outcome = 'existing'
+                    return
 
-        except Exception as e:
-            logging.error(f"Error processing {event.src_path}: {str(e)}")
+                # Check for duplicates
+                with tracer.span('hash'):
+                    duplicate = self._check_duplicate(event.src_path)
+                if duplicate:
+                    span.outcome = 'duplicate'
+                    return
+
+                filename = os.path.basename(event.src_path)
+                with tracer.span('classify'):
+                    category = self._get_category(event.src_path)
+
+                expected_digest = None
+                if self.config['enable_duplicates']:
+                    expected_digest = self.duplicate_handler.known_digest(event.src_path)
+                self.transfer.journal = self.journal
+                dest_path = self.file_handler.move_file(
+                    event.src_path,
+                    category,
+                    filename,
+                    expected_digest
+                )
+
+                if dest_path:
+                    self.processed_files.add(dest_path)
+                    if self.config['enable_duplicates']:
+                        with tracer.span('index'):
+                            self.duplicate_handler.record_move(event.src_path, dest_path)
+                    if self._chunk_index is not None:
+                        with tracer.span('index'):
+                            self._chunk_index.rename(event.src_path, dest_path)
+                    size = os.path.getsize(dest_path)
+                    span.size = size
+                    self.stats_manager.update_stats({
+                        'size': size,
+                        'category': category
+                    })
+                    with tracer.span('log'):
+                        logging.info(f"Moved {filename} to {category} folder")
+                span.outcome = 'moved' if dest_path else 'skipped'
+
+            except Exception as e:
+                span.outcome = 'error'
+                logging.error(f"Error processing {event.src_path}: {str(e)}")
 
     def _get_category(self, filepath):
         """Determine file category based on extension"""
         try:
-            # Handle special case for .tar.gz
-            if filepath.endswith('.tar.gz'):
-                return next((cat for cat, exts in self.file_types.items() 
-                          if '.tar.gz' in exts), "Others")
-            
-            # Get file extension and ensure it's lowercase
-            file_ext = os.path.splitext(filepath)[1].lower()
-            
-            # Check all extensions in file_types
-            for category, extensions in self.file_types.items():
-                # Convert all extensions to lowercase for comparison
-                if file_ext in [ext.lower() for ext in extensions]:
-                    logging.debug(f"File {filepath} categorized as {category}")
-                    return category
-                    
-            logging.debug(f"File {filepath} with extension {file_ext} categorized as Others")
-            return "Others"
+            return self.classifier.classify(filepath)
         except Exception as e:
             logging.error(f"Error categorizing {filepath}: {str(e)}")
             return "Others"
 
-    def _create_directories(self):
-        """Create only main category directories"""
-        # Create main category directories only
-        base_categories = {
-            "Images", "Documents", "Videos", "Audio", 
-            "Archives", "Code", "Others"
-        }
-        
-        for category in base_categories:
-            folder_path = os.path.join(self.dest_dir, category)
-            if not os.path.exists(folder_path):
-                os.makedirs(folder_path)
-                logging.info(f"Created directory: {folder_path}")
\ No newline at end of file
+    def update_file_types(self, file_types):
+        """Swap in a new category mapping without restarting.
+
+        A classifier shared with Config was already reloaded along with the
+        mapping, so only one this organizer built itself is recompiled.
+        """
+        self.file_types = file_types
+        if self._owns_classifier:
+            self.classifier.load(file_types)
@@ -0,0 +1,171 @@
+import os
+import time
+import logging
+import threading
+from core.workers import WorkerPool
+from core.record import FileRecord
+
+class BackfillScanner:
+    def __init__(self, organizer, checkpoint_path=None, recursive=False, workers=None,
+                 report_interval=10):
+        """One-shot sweep that organizes files already sitting in monitored directories.
+
+        Directories are streamed with os.scandir and every file goes through
+        organizer.process_file on a worker pool. Finished files and fully
+        processed directories are appended to a checkpoint so an interrupted
+        run picks up where it stopped; the checkpoint is removed once a run
+        completes.
+        """
+        self.organizer = organizer
+        self.checkpoint_path = checkpoint_path or os.path.join(
+            organizer.dest_dir, ".fileforge", "backfill.checkpoint"
+        )
+        self.recursive = recursive
+        self.workers = workers or organizer.config['workers']
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self._checkpoint = None
+        self._done_files = set()
+        self._done_dirs = set()
+        self._dirs = {}  # directory -> [outstanding files, scan finished, a file failed]
+        self.files_seen = 0
+        self.files_moved = 0
+        self.bytes_moved = 0
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                for line in f:
+                    kind, _, path = line.rstrip('\n').partition('\t')
+                    if kind == 'F':
+                        self._done_files.add(path)
+                    elif kind == 'D':
+                        self._done_dirs.add(path)
+        except FileNotFoundError:
+            return
+        logging.info(f"Resuming backfill: {len(self._done_files)} files and "
+                     f"{len(self._done_dirs)} directories already done")
+
+    def _mark(self, kind, path):
+        # Called with self._lock held
+        self._checkpoint.write(f"{kind}\t{path}\n")
+
+    def _skip_dir(self, path):
+        name = os.path.basename(path)
+        return name.startswith('.') or os.path.abspath(path) == os.path.abspath(self.organizer.dest_dir)
+
+    def _scan(self, root):
+        """Yield (directory, DirEntry) for files under root, streaming directory by directory"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            # A finished directory's own files are done, but its subdirectories may not be
+            files_done = directory in self._done_dirs
+            if not files_done:
+                with self._lock:
+                    self._dirs[directory] = [0, False, False]
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive and not self._skip_dir(entry.path):
+                                    stack.append(entry.path)
+                            elif not files_done and entry.is_file(follow_symlinks=False):
+                                yield directory, entry
+                        except OSError:
+                            continue
+            except OSError as e:
+                logging.warning(f"Could not scan {directory}: {str(e)}")
+                if not files_done:
+                    with self._lock:
+                        self._dirs[directory][2] = True  # retry the listing on the next run
+            if not files_done:
+                # Every child has been pushed by now
+                self._finish_dir(directory, scan_done=True)
+
+    def _finish_dir(self, directory, scan_done=False, failed=False):
+        with self._lock:
+            state = self._dirs[directory]
+            if scan_done:
+                state[1] = True
+            else:
+                state[0] -= 1
+            if failed:
+                state[2] = True
+            if state[1] and state[0] == 0:
+                del self._dirs[directory]
+                # A directory with a failed file stays unfinished so the next run retries it
+                if not state[2]:
+                    self._mark('D', directory)
+
+    def _handle(self, item):
+        directory, record = item
+        dest_path = None
+        handled = False
+        try:
+            dest_path = self.organizer.process_file(record, include_existing=True, raise_errors=True)
+            handled = True
+        except Exception:
+            pass  # already logged and counted by the organizer; retried on the next run
+        finally:
+            with self._lock:
+                if dest_path:
+                    self.files_moved += 1
+                    self.bytes_moved += record.size
+                if handled:
+                    self._mark('F', record.path)
+            self._finish_dir(directory, failed=not handled)
+
+    def _report(self, started, final=False):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        with self._lock:
+            files, moved, size = self.files_seen, self.files_moved, self.bytes_moved
+        logging.info(f"Backfill {'finished' if final else 'progress'}: {files} scanned, {moved} moved, "
+                     f"{moved / elapsed:.1f} files/s, {size / elapsed / (1024 * 1024):.1f} MiB/s")
+
+    def run(self, directories):
+        """Sweep directories and return a summary dict"""
+        self._load_checkpoint()
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        self._checkpoint = open(self.checkpoint_path, 'a', encoding='utf-8', buffering=1)
+        pool = WorkerPool(self._handle, workers=self.workers,
+                          max_pending=self.organizer.config['max_queue'])
+        started = time.monotonic()
+        next_report = started + self.report_interval
+        try:
+            for root in directories:
+                if not os.path.isdir(root):
+                    continue
+                for directory, entry in self._scan(root):
+                    path = entry.path
+                    if path in self._done_files or self.organizer._is_temp_file(path):
+                        continue
+                    try:
+                        record = FileRecord.from_entry(entry)
+                    except OSError:
+                        continue
+                    with self._lock:
+                        self._dirs[directory][0] += 1
+                        self.files_seen += 1
+                    pool.submit(self.organizer._get_category(path), (directory, record))
+                    if time.monotonic() >= next_report:
+                        self._report(started)
+                        next_report += self.report_interval
+            pool.shutdown(drain=True)
+        except BaseException:
+            # Keep the checkpoint for the next run, finishing what is already queued
+            pool.shutdown(drain=True)
+            self._checkpoint.close()
+            raise
+
+        self._checkpoint.close()
+        os.unlink(self.checkpoint_path)
+        self._report(started, final=True)
+        elapsed = time.monotonic() - started
+        return {
+            'files_scanned': self.files_seen,
+            'files_moved': self.files_moved,
+            'bytes_moved': self.bytes_moved,
+            'seconds': elapsed,
+        }
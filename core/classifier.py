@@ -0,0 +1,89 @@
+import os
+import sys
+import logging
+
+
+def _iter_extensions(extensions):
+    """Yield extensions from a flat list or a nested dict of sub-categories"""
+    if isinstance(extensions, dict):
+        for sub_extensions in extensions.values():
+            yield from _iter_extensions(sub_extensions)
+    else:
+        yield from extensions
+
+
+class ExtensionClassifier:
+    """Precompiled suffix index mapping file extensions to categories.
+
+    Multi-part extensions such as ``.tar.gz`` or ``.user.js`` are matched
+    longest-first, so only as many suffixes as the longest configured
+    extension are ever looked up. When an extension is listed under several
+    categories the first category in ``file_types`` wins.
+    """
+
+    def __init__(self, file_types=None, default_category="Others"):
+        self.default_category = sys.intern(default_category)
+        self.load(file_types or {})
+
+    def load(self, file_types):
+        """(Re)build the index from a category -> extensions mapping"""
+        self.load_compiled(self.compile(file_types))
+
+    def load_compiled(self, compiled):
+        """Swap in an index returned by compile(), e.g. one read back from a cache"""
+        # Swap in a single assignment so concurrent readers never see a half-built index
+        self._compiled = tuple(compiled)
+
+    @staticmethod
+    def compile(file_types):
+        """Return the (index, max_parts) lookup tables for a category -> extensions mapping"""
+        index = {}
+        max_parts = 1
+        for category, extensions in file_types.items():
+            # One shared string per category, however many records point at it
+            category = sys.intern(category)
+            for ext in _iter_extensions(extensions):
+                ext = ext.lower()
+                if not ext.startswith('.'):
+                    ext = '.' + ext
+                owner = index.get(ext)
+                if owner is not None:
+                    if owner != category:
+                        logging.debug(f"Extension {ext} listed in {owner} and {category}, using {owner}")
+                    continue
+                index[ext] = category
+                max_parts = max(max_parts, ext.count('.'))
+        return index, max_parts
+
+    def classify(self, filepath):
+        """Return the category for a single path"""
+        index, max_parts = self._compiled
+        name = os.path.basename(filepath).lower()
+
+        # Collect candidate dot positions right-to-left; a leading dot marks a
+        # hidden file rather than an extension, matching os.path.splitext
+        dots = []
+        pos = len(name)
+        for _ in range(max_parts):
+            pos = name.rfind('.', 0, pos)
+            if pos <= 0:
+                break
+            dots.append(pos)
+
+        for pos in reversed(dots):
+            category = index.get(name[pos:])
+            if category is not None:
+                return category
+        return self.default_category
+
+    def classify_extension(self, ext):
+        """Return the category for a bare extension such as '.pdf'"""
+        return self._compiled[0].get(ext.lower(), self.default_category)
+
+    def classify_many(self, paths):
+        """Return categories for an iterable of paths, in order"""
+        classify = self.classify
+        return [classify(path) for path in paths]
+
+    def __contains__(self, ext):
+        return ext.lower() in self._compiled[0]
@@ -0,0 +1,128 @@
+import os
+import time
+import heapq
+import logging
+import threading
+
+class EventCoalescer:
+    def __init__(self, dispatch, quiet_period=2.0, on_settled=None):
+        """Collapse bursts of filesystem events into one dispatch per path.
+
+        A path is dispatched once no event has arrived for quiet_period
+        seconds and its size and mtime have stopped changing. Each check costs
+        a single stat; the file itself is never opened here. dispatch is
+        called as dispatch(path, stat_result) so the stat can be reused.
+        on_settled, if given, receives the seconds between a path's first
+        event and its dispatch.
+        """
+        self.dispatch = dispatch
+        self.quiet_period = quiet_period
+        self.on_settled = on_settled
+        self._entries = {}  # path -> [last_event, size, mtime_ns, first_event]
+        self._heap = []  # (due, path), stale items are skipped when popped
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.events_received = 0
+        self.events_coalesced = 0
+        self.dispatched = 0
+
+    def add(self, path):
+        """Record an event for path, deferring its dispatch"""
+        now = time.monotonic()
+        with self._cond:
+            self.events_received += 1
+            entry = self._entries.get(path)
+            if entry is not None:
+                entry[0] = now
+                self.events_coalesced += 1
+                return
+            self._entries[path] = [now, None, None, now]
+            heapq.heappush(self._heap, (now + self.quiet_period, path))
+            self._cond.notify()
+        self.start()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._entries)
+
+    def _is_settled(self, entry, st):
+        if entry[1] is None:
+            # First look: accept immediately if the file was last written a full quiet period ago
+            return time.time() - st.st_mtime >= self.quiet_period
+        return (st.st_size, st.st_mtime_ns) == (entry[1], entry[2])
+
+    def poll(self):
+        """Check every due path once and dispatch the settled ones, return how many"""
+        now = time.monotonic()
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, path = heapq.heappop(self._heap)
+                entry = self._entries.get(path)
+                if entry is None:
+                    continue
+                next_due = entry[0] + self.quiet_period
+                if next_due > now:
+                    heapq.heappush(self._heap, (next_due, path))
+                else:
+                    due.append((path, entry))
+
+        ready = []
+        for path, entry in due:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            with self._cond:
+                if st is None:
+                    # Gone (renamed or deleted); a later event will bring it back if needed
+                    self._entries.pop(path, None)
+                elif self._is_settled(entry, st) and entry[0] + self.quiet_period <= now:
+                    self._entries.pop(path, None)
+                    ready.append((path, st, entry[3]))
+                else:
+                    entry[1], entry[2] = st.st_size, st.st_mtime_ns
+                    heapq.heappush(self._heap, (max(now, entry[0]) + self.quiet_period, path))
+
+        for path, st, first_event in ready:
+            if self.on_settled is not None:
+                self.on_settled(time.monotonic() - first_event)
+            try:
+                self.dispatch(path, st)
+            except Exception as e:
+                logging.error(f"Error dispatching {path}: {str(e)}")
+        with self._cond:
+            self.dispatched += len(ready)
+        return len(ready)
+
+    def start(self):
+        if self._running:
+            return
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="coalescer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                timeout = self._heap[0][0] - time.monotonic()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            self.poll()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,168 @@
+import os
+import time
+import zlib
+import socket
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from core.utils import process_running
+
+DEFAULT_DB = os.path.join(str(Path.home()), ".fileforge", "coordination.db")
+
+def tree_key(path):
+    """Normalized identity of a monitored directory"""
+    return os.path.normcase(os.path.realpath(path))
+
+def shard_of(path, shards):
+    """Stable shard index for path; the same on every process and platform run"""
+    return zlib.crc32(os.path.normcase(path).encode('utf-8', 'surrogateescape')) % shards
+
+class Coordinator:
+    def __init__(self, db_path=DEFAULT_DB, ttl=30.0, claim_timeout=600.0, owner=None):
+        """SQLite leases and per-file claims shared by every organizer on this host.
+
+        A lease on a monitored tree guarantees one organizer per tree; it
+        expires ttl seconds after its last renewal, and a lease whose owner
+        process has died on this host can be taken over at once. Claims let
+        several processes (or a live organizer and a backfill) split files
+        without handling any of them twice: INSERT OR IGNORE on the path
+        succeeds for exactly one of them. Claims left by a dead process, or
+        older than claim_timeout, can be taken over.
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.ttl = ttl
+        self.claim_timeout = claim_timeout
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.owner = owner or f"{self.host}:{self.pid}:{id(self):x}"
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # timeout: wait for other processes' short write transactions instead of failing
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " name TEXT PRIMARY KEY, owner TEXT NOT NULL, host TEXT NOT NULL,"
+            " pid INTEGER NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS claims ("
+            " path TEXT PRIMARY KEY, owner TEXT NOT NULL, host TEXT NOT NULL,"
+            " pid INTEGER NOT NULL, claimed REAL NOT NULL)"
+        )
+
+    def _owner_gone(self, host, pid):
+        """True if the owning process ran on this host and has exited"""
+        return host == self.host and pid != self.pid and not process_running(pid)
+
+    def acquire(self, name):
+        """Take the lease on name, return True if this process now holds it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT owner, host, pid, expires FROM leases WHERE name = ?", (name,)
+                ).fetchone()
+                if row is not None and row[0] != self.owner and row[3] >= now and \
+                        not self._owner_gone(row[1], row[2]):
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, owner, host, pid, expires) VALUES (?, ?, ?, ?, ?)",
+                    (name, self.owner, self.host, self.pid, now + self.ttl)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._held.add(name)
+        return True
+
+    def holder(self, name):
+        """Return who holds the lease on name as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner, host, pid, expires FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'owner': row[0], 'host': row[1], 'pid': row[2], 'expires': row[3]}
+
+    def renew(self):
+        """Extend every held lease, dropping any that another process has taken over"""
+        expires = time.time() + self.ttl
+        with self._lock:
+            for name in list(self._held):
+                cursor = self._conn.execute(
+                    "UPDATE leases SET expires = ? WHERE name = ? AND owner = ?",
+                    (expires, name, self.owner)
+                )
+                if cursor.rowcount == 0:
+                    logging.error(f"Lost lease on {name}")
+                    self._held.discard(name)
+
+    def start(self):
+        """Renew held leases in the background every third of the ttl"""
+        def run():
+            while not self._stop.wait(self.ttl / 3):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    logging.warning(f"Lease renewal failed: {str(e)}")
+        self._thread = threading.Thread(target=run, name="lease-renewal", daemon=True)
+        self._thread.start()
+
+    def release(self, name=None):
+        """Give up one lease, or all of them"""
+        with self._lock:
+            names = [name] if name is not None else list(self._held)
+            for held in names:
+                self._conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?",
+                                   (held, self.owner))
+                self._held.discard(held)
+
+    def claim(self, path):
+        """Claim a file for processing, return False if another live process has it"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO claims (path, owner, host, pid, claimed) VALUES (?, ?, ?, ?, ?)",
+                (path, self.owner, self.host, self.pid, now)
+            )
+            if cursor.rowcount == 1:
+                return True
+            row = self._conn.execute(
+                "SELECT owner, host, pid, claimed FROM claims WHERE path = ?", (path,)
+            ).fetchone()
+            if row is None or row[0] == self.owner:
+                return row is not None
+            if row[3] + self.claim_timeout >= now and not self._owner_gone(row[1], row[2]):
+                return False
+            # Take over a claim abandoned by a dead process; the owner check keeps it atomic
+            cursor = self._conn.execute(
+                "UPDATE claims SET owner = ?, host = ?, pid = ?, claimed = ? WHERE path = ? AND owner = ?",
+                (self.owner, self.host, self.pid, now, path, row[0])
+            )
+            return cursor.rowcount == 1
+
+    def finish(self, path):
+        """Drop a claim once the file has been handled"""
+        with self._lock:
+            self._conn.execute("DELETE FROM claims WHERE path = ? AND owner = ?", (path, self.owner))
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.release()
+        with self._lock:
+            self._conn.close()
@@ -1,97 +1,99 @@
 import os
-import shutil
 import logging
 import time
-import mimetypes
 from pathlib import Path
+from core.transfer import FileTransfer
+from core.names import NameAllocator
+from core.sniffer import ContentSniffer
+from core.record import FileRecord
+from features.tracing import Tracer
+
+# Kernels stamp files from a coarse clock that can lag time.time() by a tick,
+# so a file created just after startup may look older than the start time
+TIMESTAMP_SLACK = 0.05
 
 class FileHandler:
-    def __init__(self, destination_base_dir):
+    def __init__(self, destination_base_dir, transfer=None, names=None, sniffer=None, tracer=None):
         self.destination_base_dir = destination_base_dir
+        self.transfer = transfer or FileTransfer()
+        self.names = names or NameAllocator()
+        self.sniffer = sniffer or ContentSniffer()
+        self.tracer = tracer or Tracer()
         self.start_time = time.time()  # Track when program started
         self.temp_extensions = {'.crdownload', '.tmp', '.part'}
         
     def _is_new_file(self, filepath):
         """Check if file was created after program started"""
+        if isinstance(filepath, FileRecord):
+            return filepath.ctime > self.start_time - TIMESTAMP_SLACK
         try:
             creation_time = os.path.getctime(filepath)
-            return creation_time > self.start_time
+            return creation_time > self.start_time - TIMESTAMP_SLACK
         except OSError:
             return False
             
     def _is_download_complete(self, filepath):
-        """Check if file is completely downloaded"""
-        # Check for temporary extensions
+        """Check if file is completely downloaded.
+
+        Files reach here through EventCoalescer, which already waited for
+        size and mtime to settle, so only the temporary extension is checked.
+        """
         file_ext = Path(filepath).suffix.lower()
-        if file_ext in self.temp_extensions:
-            return False
-            
-        # Check if file is being written to
-        try:
-            with open(filepath, 'rb') as f:
-                # Try to read the file
-                f.read(1)
-            return True
-        except (IOError, PermissionError):
-            return False
+        return file_ext not in self.temp_extensions
     
     def _get_actual_extension(self, filepath):
-        """Get actual file extension by checking file signature/content"""
-        try:
-            # First try getting extension from filepath
-            file_ext = Path(filepath).suffix.lower()
-            
-            # Verify with mime type
-            mime_type, _ = mimetypes.guess_type(filepath)
-            if mime_type:
-                if mime_type.startswith('image/'):
-                    detected_ext = '.' + mime_type.split('/')[-1]
-                    return detected_ext if detected_ext != '.jpeg' else '.jpg'
-                elif mime_type.startswith('video/'):
-                    return '.' + mime_type.split('/')[-1]
-                elif mime_type.startswith('audio/'):
-                    return '.' + mime_type.split('/')[-1]
+        """Get the file's extension, falling back to its sniffed type when it has none"""
+        file_ext = Path(filepath).suffix.lower()
+        if file_ext:
             return file_ext
-        except:
-            return Path(filepath).suffix.lower()
+        probe = self.sniffer.probe(filepath)
+        return (probe[0] if probe else None) or file_ext
             
-    def move_file(self, source, destination_category, filename):
-        try:
-            # Skip if file existed before program start
-            if not self._is_new_file(source):
-                logging.debug(f"Skipping existing file: {source}")
-                return None
-                
-            # Wait for download to complete
-            if not self._is_download_complete(source):
-                logging.debug(f"File {source} is still being downloaded")
-                return None
-                
-            # Get actual file extension
-            actual_ext = self._get_actual_extension(source)
-            if actual_ext != Path(filename).suffix.lower():
-                filename = Path(filename).stem + actual_ext
-                
-            # Create category directory if it doesn't exist
-            dest_dir = os.path.join(self.destination_base_dir, destination_category)
-            os.makedirs(dest_dir, exist_ok=True)
-            
-            dest_path = os.path.join(dest_dir, filename)
-            
-            # Handle duplicates
-            if os.path.exists(dest_path):
-                base_name = Path(filename).stem
-                ext = Path(filename).suffix
-                counter = 1
-                while os.path.exists(dest_path):
-                    new_name = f"{base_name}_{counter}{ext}"
-                    dest_path = os.path.join(dest_dir, new_name)
-                    counter += 1
-                    
-            shutil.move(source, dest_path)
-            logging.info(f"Moved {filename} to {destination_category}")
-            return dest_path
-            
-        except Exception as e:
-            logging.error(f"Error moving file {source}: {str(e)}")
-            return None
\ No newline at end of file
+    def move_file(self, source, destination_category, filename, expected_digest=None):
+        """Move source (a path or FileRecord) into its category folder, return the new path"""
+        record = source if isinstance(source, FileRecord) else None
+        if record is not None:
+            source = record.path
+            expected_digest = expected_digest or record.digest
+        tracer = self.tracer
+        with tracer.span('move_file', record.size if record else None) as span:
+            try:
+                # Skip if file existed before program start
+                if not self._is_new_file(record or source):
+                    logging.debug(f"Skipping existing file: {source}")
+                    span.outcome = 'existing'
+                    return None
+
+                # Wait for download to complete
+                if not self._is_download_complete(source):
+                    logging.debug(f"File {source} is still being downloaded")
+                    span.outcome = 'incomplete'
+                    return None
+
+                # Get actual file extension
+                with tracer.span('sniff'):
+                    actual_ext = self._get_actual_extension(source)
+                if actual_ext != Path(filename).suffix.lower():
+                    filename = Path(filename).stem + actual_ext
+
+                # Claim a free name, creating the category directory on first use
+                dest_dir = os.path.join(self.destination_base_dir, destination_category)
+                with tracer.span('claim'):
+                    dest_path = self.names.claim(dest_dir, filename)
+                with tracer.span('move') as move_span:
+                    try:
+                        result = self.transfer.move(source, dest_path, expected_digest, src_stat=record)
+                    except OSError:
+                        self.names.release(dest_path)
+                        raise
+                    move_span.size = span.size = result['bytes']
+                    move_span.outcome = result['method']
+                with tracer.span('log'):
+                    logging.info(f"Moved {filename} to {destination_category}")
+                span.outcome = 'moved'
+                return dest_path
+
+            except Exception as e:
+                span.outcome = 'error'
+                logging.error(f"Error moving file {source}: {str(e)}")
+                return None
\ No newline at end of file
@@ -0,0 +1,223 @@
+import os
+import sys
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from watchdog.events import FileClosedEvent, FileCreatedEvent, FileMovedEvent
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+READ_SIZE = 256 * 1024  # room for thousands of events per read()
+
+_libc = None
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return _libc
+
+def is_supported():
+    """True when running on Linux with a libc that exposes inotify"""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        return hasattr(_load_libc(), 'inotify_init1')
+    except OSError:
+        return False
+
+class InotifyObserver:
+    def __init__(self, read_size=READ_SIZE):
+        """Watch directories through a single inotify fd on one thread.
+
+        Drop-in for watchdog's Observer: schedule(handler, path, recursive),
+        start(), stop(), join(). Only IN_CLOSE_WRITE and IN_MOVED_TO are
+        requested, so files are reported once their writer has closed them
+        (as FileClosedEvent) or once they were renamed into place (as
+        FileMovedEvent) and half-written files never produce events. Reads
+        drain up to read_size bytes of events per syscall. If the kernel
+        queue overflows, every watched directory is rescanned and each file
+        found is reported as a FileCreatedEvent.
+        """
+        self.read_size = read_size
+        self._fd = None
+        self._watches = {}  # wd -> (path, handler, recursive)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake_r, self._wake_w = None, None
+        self._running = False
+        self.events_read = 0
+        self.batches = 0
+        self.overflows = 0
+
+    def _ensure_fd(self):
+        if self._fd is None:
+            fd = _load_libc().inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+            self._fd = fd
+        return self._fd
+
+    def _add_watch(self, path, handler, recursive):
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_ONLYDIR
+        if recursive:
+            mask |= IN_CREATE  # to start watching new subdirectories
+        wd = _load_libc().inotify_add_watch(self._ensure_fd(), os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"Cannot watch {path}: {os.strerror(err)}")
+        with self._lock:
+            self._watches[wd] = (path, handler, recursive)
+        return wd
+
+    def _add_tree(self, path, handler):
+        self._add_watch(path, handler, True)
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                try:
+                    self._add_tree(entry.path, handler)
+                except OSError as e:
+                    logging.warning(f"{str(e)}")
+
+    def schedule(self, handler, path, recursive=False):
+        """Watch path (and its subdirectories when recursive), reporting to handler"""
+        path = os.path.abspath(path)
+        if recursive:
+            self._add_tree(path, handler)
+        else:
+            self._add_watch(path, handler, False)
+
+    def start(self):
+        self._ensure_fd()
+        self._wake_r, self._wake_w = os.pipe()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inotify", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._wake_w is not None:
+            os.write(self._wake_w, b'x')
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = None
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        poller.register(self._wake_r, select.POLLIN)
+        while self._running:
+            poller.poll()
+            if not self._running:
+                break
+            while True:
+                try:
+                    data = os.read(self._fd, self.read_size)
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    if e.errno == errno.EINTR:
+                        continue
+                    logging.error(f"inotify read failed: {str(e)}")
+                    self._running = False
+                    break
+                if not data:
+                    break
+                self.handle_events(data)
+
+    def handle_events(self, data):
+        """Parse one read() worth of raw events and dispatch them, collapsing repeats"""
+        self.batches += 1
+        seen = set()
+        offset = 0
+        end = len(data)
+        while offset < end:
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].split(b'\0', 1)[0]
+            offset += _EVENT.size + length
+            self.events_read += 1
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflows += 1
+                logging.warning("inotify queue overflowed, rescanning watched directories")
+                self.rescan()
+                continue
+            with self._lock:
+                watch = self._watches.get(wd)
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+            if watch is None or not name:
+                continue
+            directory, handler, recursive = watch
+            path = os.path.join(directory, os.fsdecode(name))
+
+            if mask & IN_ISDIR:
+                if recursive and not os.path.basename(path).startswith('.'):
+                    try:
+                        self._add_tree(path, handler)
+                    except OSError as e:
+                        logging.warning(f"{str(e)}")
+                        continue
+                    # Files may have landed before the new watch existed
+                    self._rescan_dir(path, handler, recursive=True)
+                continue
+            if (path, mask) in seen:
+                continue
+            seen.add((path, mask))
+            if mask & IN_MOVED_TO:
+                self._dispatch(handler, FileMovedEvent("", path))
+            elif mask & IN_CLOSE_WRITE:
+                self._dispatch(handler, FileClosedEvent(path))
+
+    def _dispatch(self, handler, event):
+        try:
+            handler.dispatch(event)
+        except Exception as e:
+            logging.error(f"Error handling {event.src_path or event.dest_path}: {str(e)}")
+
+    def _rescan_dir(self, directory, handler, recursive=False):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_file(follow_symlinks=False):
+                self._dispatch(handler, FileCreatedEvent(entry.path))
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                self._rescan_dir(entry.path, handler, recursive=True)
+
+    def rescan(self):
+        """Report every file in every watched directory, after events may have been lost"""
+        with self._lock:
+            watches = list(self._watches.values())
+        for directory, handler, _ in watches:
+            self._rescan_dir(directory, handler)
@@ -0,0 +1,271 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from core.utils import process_running, boot_time
+
+PLANNED, DONE, FAILED = 'planned', 'done', 'failed'
+# Longest chain of moves locate() follows from an original path
+MAX_HOPS = 16
+# Boot times derived from uptime drift a little between calls
+BOOT_TOLERANCE = 60
+
+class JournalEntry:
+    __slots__ = ('seq', 'id', 'source', 'destination')
+
+    def __init__(self, seq, source, destination):
+        self.seq = seq
+        self.id = None  # rowid, assigned when the batch holding the plan commits
+        self.source = source
+        self.destination = destination
+
+class MoveJournal:
+    def __init__(self, db_path):
+        """Write-ahead log of file moves in SQLite, committed in groups.
+
+        FileTransfer and ContentStore record each move as planned before
+        touching the file and as done or failed afterwards. Records are appended to a queue
+        that one thread commits: everything queued while the previous
+        commit was syncing goes into the next transaction, so under load
+        many moves share one fsync and nobody waits for a timer. Only a
+        cross-device copy waits for its plan to be durable (sync()), since
+        it is the only move a crash can leave half done; a rename is atomic
+        and its plan is committed within the next batch.
+
+        recover() settles the plans of processes that died mid-move, and
+        locate() finds where an original path ended up.
+        """
+        self.db_path = db_path
+        self.host = None  # set by _open, which also imports sqlite3
+        self.pid = os.getpid()
+        self.boot = None
+        self._lock = threading.Lock()  # guards the connection
+        self._cond = threading.Condition()  # guards the queue and sequence numbers
+        self._queue = []
+        self._seq = 0
+        self._committed = 0
+        self._closing = False
+        self._conn = None
+        self._thread = None
+        self.counters = {'records': 0, 'batches': 0, 'largest_batch': 0,
+                         'replayed': 0, 'rolled_back': 0, 'lost': 0}
+
+    def _open(self):
+        """Connect and start the commit thread on first use"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            # Imported here so the organizer only loads sqlite3 once it moves a file
+            import socket
+            import sqlite3
+            self._sqlite_error = sqlite3.Error
+            self.host = socket.gethostname()
+            self.boot = boot_time()
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # FULL syncs the WAL on every commit; batching is what keeps that cheap
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS moves ("
+                " id INTEGER PRIMARY KEY, source TEXT NOT NULL, destination TEXT NOT NULL,"
+                " size INTEGER, mtime_ns INTEGER, via TEXT, state TEXT NOT NULL,"
+                " host TEXT NOT NULL, pid INTEGER NOT NULL, boot REAL, started REAL, finished REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS moves_source ON moves (source)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS moves_planned ON moves (state) WHERE state = 'planned'"
+            )
+            self._conn.commit()
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="move-journal", daemon=True)
+            self._thread.start()
+
+    def _append(self, op):
+        with self._cond:
+            self._seq += 1
+            self._queue.append(op)
+            self._cond.notify_all()
+            return self._seq
+
+    def begin(self, source, destination, st, via=None):
+        """Record a planned move without waiting for it to reach disk.
+
+        via names an intermediate copy of the data, such as a content store
+        blob, that recovery can restore the source from.
+        """
+        self._open()
+        with self._cond:
+            entry = JournalEntry(self._seq + 1, source, destination)
+            self._append(('plan', entry, st.st_size, st.st_mtime_ns, via, time.time()))
+        return entry
+
+    def finish(self, entry, state=DONE):
+        """Record how a planned move ended"""
+        self._append(('finish', entry, state, time.time()))
+
+    def sync(self, entry=None):
+        """Wait until entry's plan, or everything queued so far, is committed"""
+        with self._cond:
+            target = self._seq if entry is None else entry.seq
+            while self._committed < target and self._thread is not None:
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch, self._queue = self._queue, []
+                last = self._seq
+            try:
+                self._commit(batch)
+            except self._sqlite_error as e:
+                logging.error(f"Could not write {len(batch)} move journal records: {str(e)}")
+            with self._cond:
+                self._committed = last
+                self.counters['records'] += len(batch)
+                self.counters['batches'] += 1
+                self.counters['largest_batch'] = max(self.counters['largest_batch'], len(batch))
+                self._cond.notify_all()
+
+    def _commit(self, batch):
+        with self._lock:
+            cursor = self._conn.cursor()
+            for op in batch:
+                if op[0] == 'plan':
+                    _, entry, size, mtime_ns, via, started = op
+                    cursor.execute(
+                        "INSERT INTO moves (source, destination, size, mtime_ns, via, state, host, pid,"
+                        " boot, started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (entry.source, entry.destination, size, mtime_ns, via, PLANNED, self.host,
+                         self.pid, self.boot, started)
+                    )
+                    entry.id = cursor.lastrowid
+                else:
+                    _, entry, state, finished = op
+                    cursor.execute("UPDATE moves SET state = ?, finished = ? WHERE id = ?",
+                                   (state, finished, entry.id))
+            self._conn.commit()
+
+    def recover(self):
+        """Settle moves left planned by processes that are no longer running.
+
+        A copy that reached its destination (same size and mtime) is
+        completed by deleting the source; anything else is rolled back by
+        removing the partial copy and the empty placeholder, leaving the
+        source where it was, or copying it back out of the blob store if
+        it already went in. Returns the sources that were rolled back.
+        """
+        self._open()
+        self.sync()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, source, destination, size, mtime_ns, via, host, pid, boot FROM moves"
+                " WHERE state = 'planned'"
+            ).fetchall()
+        settled = []
+        rolled_back = []
+        for row_id, source, destination, size, mtime_ns, via, host, pid, boot in rows:
+            if not self._owner_gone(host, pid, boot):
+                continue  # still in progress, or on another host we cannot check
+            state, outcome = self._settle(source, destination, size, mtime_ns, via)
+            self.counters[outcome] += 1
+            settled.append((state, time.time(), row_id))
+            if outcome == 'rolled_back':
+                rolled_back.append(source)
+        if settled:
+            with self._lock:
+                self._conn.executemany("UPDATE moves SET state = ?, finished = ? WHERE id = ?", settled)
+                self._conn.commit()
+            logging.info(f"Move journal: completed {self.counters['replayed']}, rolled back "
+                         f"{self.counters['rolled_back']} and lost {self.counters['lost']} "
+                         f"interrupted moves")
+        return rolled_back
+
+    def _owner_gone(self, host, pid, boot):
+        """True if the process that planned a move ran on this host and has exited"""
+        if host != self.host:
+            return False
+        if boot is not None and self.boot is not None and abs(boot - self.boot) > BOOT_TOLERANCE:
+            return True  # planned before the last reboot, whatever now runs under that id
+        return pid != self.pid and not process_running(pid)
+
+    def _settle(self, source, destination, size, mtime_ns, via):
+        dest_dir, name = os.path.split(destination)
+        try:
+            os.unlink(os.path.join(dest_dir, f".{name}.fileforge-tmp"))  # partial cross-device copy
+        except OSError:
+            pass
+        try:
+            dst = os.stat(destination)
+        except OSError:
+            dst = None
+        source_exists = os.path.exists(source)
+        # Links to a blob carry the blob's mtime, and are only ever swapped in whole
+        complete = dst is not None and dst.st_size == size and \
+            (via is not None or dst.st_mtime_ns == mtime_ns)
+        if not complete and not source_exists and via is not None and os.path.exists(via):
+            # The source went into the blob store but was never linked; copy it back
+            source_dir, source_name = os.path.split(source)
+            temp_path = os.path.join(source_dir, f".{source_name}.fileforge-tmp")
+            try:
+                shutil.copy2(via, temp_path)
+                os.replace(temp_path, source)
+                source_exists = True
+            except OSError as e:
+                logging.warning(f"Move journal: could not restore {source} from {via}: {str(e)}")
+        if complete:
+            if source_exists:
+                try:
+                    os.unlink(source)
+                except FileNotFoundError:
+                    pass
+            return DONE, 'replayed'
+        if source_exists:
+            # A placeholder NameAllocator claimed but nothing was moved into
+            if dst is not None and dst.st_size == 0:
+                try:
+                    os.unlink(destination)
+                except OSError:
+                    pass
+            return FAILED, 'rolled_back'
+        logging.warning(f"Move journal: neither {source} nor a complete {destination} exists")
+        return FAILED, 'lost'
+
+    def locate(self, path):
+        """Return where the file originally at path was last moved, or None"""
+        self._open()
+        self.sync()
+        found = None
+        seen = set()
+        with self._lock:
+            while path not in seen and len(seen) < MAX_HOPS:
+                seen.add(path)
+                row = self._conn.execute(
+                    "SELECT destination FROM moves WHERE source = ? AND state = 'done'"
+                    " ORDER BY id DESC LIMIT 1", (path,)
+                ).fetchone()
+                if row is None:
+                    break
+                found = path = row[0]
+        return found
+
+    def close(self):
+        """Commit everything queued and stop the commit thread"""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        thread.join()
+        with self._cond:
+            self._thread = None
+        with self._lock:
+            self._conn.close()
+            self._conn = None
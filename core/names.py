@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+
+class _DirectoryNames:
+    __slots__ = ('names', 'next_suffix', 'lock')
+
+    def __init__(self, names):
+        self.names = names
+        self.next_suffix = {}
+        self.lock = threading.Lock()
+
+class NameAllocator:
+    def __init__(self, max_dirs=256, max_names=100000):
+        """Hand out collision-free destination names, `name_1`, `name_2`, ...
+
+        Each directory is listed once with os.scandir on first use and then
+        tracked in memory, remembering the next free suffix per base name so
+        a clash costs O(1) instead of an os.path.exists probe per suffix. A
+        name is claimed by creating an empty placeholder with O_EXCL, so two
+        workers (or another program) can never be handed the same path; the
+        transfer then replaces the placeholder.
+
+        Memory stays bounded for long runs: at most max_dirs listings are
+        kept (least recently used dropped first), and a directory stops
+        remembering new names past max_names. Both only cost extra O_EXCL
+        attempts later, never a wrong answer.
+        """
+        self.max_dirs = max_dirs
+        self.max_names = max_names
+        self._dirs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _directory(self, directory):
+        with self._lock:
+            entry = self._dirs.get(directory)
+            if entry is not None:
+                self._dirs.move_to_end(directory)
+                return entry
+            os.makedirs(directory, exist_ok=True)
+            with os.scandir(directory) as it:
+                names = {os.path.normcase(e.name) for e in it}
+            entry = self._dirs[directory] = _DirectoryNames(names)
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        return entry
+
+    def _remember(self, entry, name):
+        if len(entry.names) < self.max_names:
+            entry.names.add(name)
+
+    def __len__(self):
+        """Names currently tracked across every cached directory"""
+        with self._lock:
+            return sum(len(entry.names) for entry in self._dirs.values())
+
+    def claim(self, directory, filename):
+        """Reserve a free name in directory for filename and return its full path"""
+        entry = self._directory(directory)
+        base_name, ext = os.path.splitext(filename)
+        key = os.path.normcase(filename)
+        with entry.lock:
+            candidate = filename
+            counter = None
+            while True:
+                if os.path.normcase(candidate) not in entry.names:
+                    path = os.path.join(directory, candidate)
+                    try:
+                        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                    except FileExistsError:
+                        # Created behind our back; remember it and keep looking
+                        pass
+                    else:
+                        self._remember(entry, os.path.normcase(candidate))
+                        if counter is not None:
+                            entry.next_suffix[key] = counter + 1
+                        return path
+                    self._remember(entry, os.path.normcase(candidate))
+                if counter is None:
+                    counter = entry.next_suffix.get(key, 1)
+                else:
+                    counter += 1
+                candidate = f"{base_name}_{counter}{ext}"
+
+    def release(self, path):
+        """Give back a claimed name whose transfer failed, removing the placeholder"""
+        directory, name = os.path.split(path)
+        try:
+            if os.path.getsize(path) == 0:
+                os.unlink(path)
+        except OSError:
+            pass
+        entry = self._dirs.get(directory)
+        if entry is not None:
+            with entry.lock:
+                entry.names.discard(os.path.normcase(name))
+
+    def forget(self, directory=None):
+        """Drop cached listings so they are rebuilt from disk on next use"""
+        with self._lock:
+            if directory is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(directory, None)
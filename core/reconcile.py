@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import logging
+import threading
+
+# Directory mtimes this close to the scan may still change within the same
+# timestamp tick, so such a directory is rescanned next pass regardless
+RACY_SECONDS = 2.0
+
+class Reconciler:
+    def __init__(self, organizer, directories, path=None, interval=300):
+        """Periodically find files in the monitored directories that no event reported.
+
+        A snapshot keeps each directory's mtime and its entries as
+        name -> [inode, size, mtime_ns]. A pass stats every directory and
+        lists only those whose mtime changed, since adding, removing or
+        renaming an entry always updates it. Within a listed directory only
+        names whose inode is new are stat'ed, so the cost follows the
+        number of changes rather than the directory size. New files go to
+        organizer.recover(), i.e. through the coalescer like any event;
+        files the organizer is already handling are simply coalesced.
+
+        The snapshot is saved to path. After a restart the first pass
+        recovers files that arrived while the daemon was down. With no
+        saved snapshot, the first pass only records what is there, and
+        older files are left to --backfill. A sharded organizer's snapshot
+        holds only that shard's files, so each shard needs its own path.
+        """
+        self.organizer = organizer
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.path = path or os.path.join(organizer.dest_dir, ".fileforge", "reconcile.json")
+        self.interval = interval
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {'passes': 0, 'dirs_listed': 0, 'dirs_skipped': 0, 'files_recovered': 0}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable reconcile snapshot {self.path}: {str(e)}")
+            return None
+
+    def save(self):
+        """Write the snapshot, leaving out files recovered by the latest listing of their
+        directory so they are offered again if the daemon stops before handling them"""
+        saved = {}
+        for directory, state in self._snapshot.items():
+            recovered = set(state.get('recovered', ()))
+            entries = state['entries']
+            if recovered:
+                entries = {name: value for name, value in entries.items() if name not in recovered}
+            # racy forces a relisting after a restart, where the left-out files turn up again
+            saved[directory] = {'mtime_ns': state['mtime_ns'], 'racy': state['racy'] or bool(recovered),
+                                'entries': entries}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def _skip(self, entry):
+        name = entry.name
+        return name.startswith('.') or self.organizer._is_temp_file(name) or \
+            not self.organizer.owns(entry.path)
+
+    def _list(self, directory, known, recover):
+        """Return the directory's entries and the names of files recovered because their inode is new"""
+        entries = {}
+        recovered = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if self._skip(entry):
+                    continue
+                try:
+                    previous = known.get(entry.name)
+                    # The inode comes from readdir itself, so unchanged entries cost no stat
+                    if previous is not None and previous[0] == entry.inode():
+                        entries[entry.name] = previous
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                entries[entry.name] = [st.st_ino, st.st_size, st.st_mtime_ns]
+                if recover:
+                    self.organizer.recover(entry.path)
+                    recovered.append(entry.name)
+        return entries, recovered
+
+    def run_once(self):
+        """Run one reconciliation pass and return the number of files recovered"""
+        if self._snapshot is None:
+            loaded = self._load()
+            baseline = loaded is None
+            self._snapshot = loaded or {}
+        else:
+            baseline = False
+        now = time.time()
+        recovered = 0
+        changed = False
+        for directory in self.directories:
+            state = self._snapshot.get(directory)
+            try:
+                dir_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue  # unmounted or gone; its snapshot stays until it comes back
+            if state is not None and state['mtime_ns'] == dir_mtime and not state.get('racy'):
+                self.counters['dirs_skipped'] += 1
+                continue
+            try:
+                entries, found = self._list(directory, state['entries'] if state else {},
+                                            recover=not baseline and state is not None)
+            except OSError as e:
+                logging.warning(f"Could not reconcile {directory}: {str(e)}")
+                continue
+            self.counters['dirs_listed'] += 1
+            self._snapshot[directory] = {
+                'mtime_ns': dir_mtime,
+                'racy': now - dir_mtime / 1e9 < RACY_SECONDS,
+                'entries': entries,
+                'recovered': found,
+            }
+            recovered += len(found)
+            changed = True
+        self.counters['passes'] += 1
+        self.counters['files_recovered'] += recovered
+        if recovered:
+            logging.info(f"Reconciliation found {recovered} files no event reported")
+        if changed:
+            try:
+                self.save()
+            except OSError as e:
+                logging.warning(f"Could not save reconcile snapshot: {str(e)}")
+        return recovered
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Reconciliation pass failed: {str(e)}")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
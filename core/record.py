@@ -0,0 +1,61 @@
+import os
+
+class FileRecord:
+    """Everything the pipeline needs to know about one file, from a single stat.
+
+    The st_* properties let a record stand in for an os.stat_result wherever
+    the hash index, sniffer or transfer layer expect one.
+    """
+
+    __slots__ = ('path', 'inode', 'device', 'size', 'mtime_ns', 'ctime', 'category', 'digest')
+
+    def __init__(self, path, inode, device, size, mtime_ns, ctime, category=None, digest=None):
+        self.path = path
+        self.inode = inode
+        self.device = device
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.ctime = ctime
+        self.category = category
+        self.digest = digest
+
+    @classmethod
+    def from_stat(cls, path, st):
+        return cls(path, st.st_ino, st.st_dev, st.st_size, st.st_mtime_ns, st.st_ctime)
+
+    @classmethod
+    def from_path(cls, path):
+        """Build a record with one os.stat call; raises OSError if the file is gone"""
+        return cls.from_stat(path, os.stat(path))
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Build a record from an os.scandir DirEntry, reusing its cached stat where available"""
+        return cls.from_stat(entry.path, entry.stat(follow_symlinks=False))
+
+    @property
+    def st_ino(self):
+        return self.inode
+
+    @property
+    def st_dev(self):
+        return self.device
+
+    @property
+    def st_size(self):
+        return self.size
+
+    @property
+    def st_mtime_ns(self):
+        return self.mtime_ns
+
+    @property
+    def st_mtime(self):
+        return self.mtime_ns / 1e9
+
+    @property
+    def st_ctime(self):
+        return self.ctime
+
+    def __repr__(self):
+        return f"FileRecord({self.path!r}, size={self.size}, category={self.category!r})"
@@ -0,0 +1,197 @@
+import os
+import re
+import sys
+import time
+import heapq
+import fnmatch
+import logging
+
+SIZE_UNITS = {'': 1, 'b': 1, 'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3, 'tb': 1024 ** 4}
+AGE_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def _parse_quantity(value, units, what):
+    """Parse 1.5GB / 30d style values (or plain numbers) into bytes or seconds"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = re.fullmatch(r'\s*([\d.]+)\s*([a-zA-Z]*)\s*', str(value))
+    if not match or match.group(2).lower() not in units:
+        raise ValueError(f"Invalid {what}: {value!r}")
+    return float(match.group(1)) * units[match.group(2).lower()]
+
+def _normalize_dir(path):
+    return os.path.normcase(os.path.abspath(os.path.expanduser(path)))
+
+class Rule:
+    """One compiled routing rule; every condition that is set must hold"""
+
+    __slots__ = ('index', 'name', 'category', 'destination', 'extensions', 'pattern',
+                 'min_size', 'max_size', 'min_age', 'max_age', 'sources', 'recursive')
+
+    def __init__(self, index, spec):
+        if 'category' not in spec and 'destination' not in spec:
+            raise ValueError(f"Rule {index} needs a category or destination")
+        self.index = index
+        self.name = spec.get('name', f"rule-{index}")
+        self.category = sys.intern(spec.get('category', ""))
+        self.destination = spec.get('destination')
+        extensions = spec.get('extensions') or ()
+        self.extensions = frozenset(
+            e.lower() if e.startswith('.') else '.' + e.lower() for e in extensions
+        ) or None
+        if 'glob' in spec and 'regex' in spec:
+            raise ValueError(f"Rule {self.name} has both glob and regex")
+        if 'glob' in spec:
+            # fnmatch.translate anchors at the end, re.match anchors the start
+            self.pattern = fnmatch.translate(spec['glob'])
+        elif 'regex' in spec:
+            # Searched anywhere in the filename, like re.search
+            self.pattern = f".*?(?:{spec['regex']})"
+        else:
+            self.pattern = None
+        if self.pattern is not None:
+            re.compile(self.pattern)  # surface syntax errors per rule
+        self.min_size = _parse_quantity(spec.get('min_size'), SIZE_UNITS, 'size')
+        self.max_size = _parse_quantity(spec.get('max_size'), SIZE_UNITS, 'size')
+        self.min_age = _parse_quantity(spec.get('min_age'), AGE_UNITS, 'age')
+        self.max_age = _parse_quantity(spec.get('max_age'), AGE_UNITS, 'age')
+        sources = spec.get('source') or ()
+        if isinstance(sources, str):
+            sources = [sources]
+        self.sources = tuple(_normalize_dir(s) for s in sources) or None
+        self.recursive = spec.get('recursive', False)
+
+    def check(self, record, now, parent, suffixes):
+        """Evaluate the non-name conditions against an already-stat'ed FileRecord"""
+        if self.extensions is not None and self.extensions.isdisjoint(suffixes):
+            return False
+        if self.min_size is not None and record.size < self.min_size:
+            return False
+        if self.max_size is not None and record.size > self.max_size:
+            return False
+        if self.min_age is not None or self.max_age is not None:
+            age = now - record.mtime_ns / 1e9
+            if self.min_age is not None and age < self.min_age:
+                return False
+            if self.max_age is not None and age > self.max_age:
+                return False
+        if self.sources is not None:
+            if self.recursive:
+                if not any(parent == s or parent.startswith(s + os.sep) for s in self.sources):
+                    return False
+            elif parent not in self.sources:
+                return False
+        return True
+
+class RuleEngine:
+    """Route files by glob, regex, extension, size, age and source directory.
+
+    Rules are tried in order and the first whose conditions all hold wins.
+    load() compiles them into one case-insensitive regex alternation over
+    every glob/regex rule, an extension index and a list of rules that
+    only test metadata, so a lookup does one regex match and a dict probe
+    however many rules there are. Numeric conditions read the FileRecord,
+    never the disk. Regexes are merged, so they must not use backreferences.
+    """
+
+    def __init__(self, rules=None):
+        self.load(rules or [])
+
+    def load(self, rules):
+        """(Re)compile rules; raises ValueError on an invalid rule, keeping the old set"""
+        self.load_compiled(self.compile(rules))
+
+    def load_compiled(self, compiled):
+        """Swap in tables returned by compile(), e.g. ones read back from a cache"""
+        # Swap in a single assignment so concurrent readers never see a half-built engine
+        self._compiled = tuple(compiled)
+        logging.debug(f"Loaded {len(self._compiled[0])} routing rules")
+
+    @staticmethod
+    def compile(rules):
+        """Return the lookup tables for a list of rule specs; raises ValueError if one is invalid"""
+        compiled = [Rule(index, spec) for index, spec in enumerate(rules)]
+        named = [rule for rule in compiled if rule.pattern is not None]
+        by_extension = {}
+        generic = []
+        max_parts = 1
+        for rule in compiled:
+            if rule.pattern is not None:
+                continue
+            if rule.extensions is not None:
+                for ext in rule.extensions:
+                    by_extension.setdefault(ext, []).append(rule)
+                    max_parts = max(max_parts, ext.count('.'))
+            else:
+                generic.append(rule)
+        for rule in named:
+            if rule.extensions is not None:
+                max_parts = max(max_parts, *(ext.count('.') for ext in rule.extensions))
+
+        combined = None
+        if named:
+            try:
+                combined = re.compile(
+                    "|".join(f"(?P<r{rule.index}>{rule.pattern})" for rule in named),
+                    re.IGNORECASE | re.DOTALL
+                )
+            except re.error as e:
+                raise ValueError(f"Rules cannot be merged into one pattern: {str(e)}")
+        individual = {rule.index: re.compile(rule.pattern, re.IGNORECASE | re.DOTALL)
+                      for rule in named}
+
+        return compiled, combined, named, individual, by_extension, generic, max_parts
+
+    @property
+    def rules(self):
+        return self._compiled[0]
+
+    def __len__(self):
+        return len(self._compiled[0])
+
+    def _suffixes(self, name, max_parts):
+        suffixes = []
+        pos = len(name)
+        for _ in range(max_parts):
+            pos = name.rfind('.', 0, pos)
+            if pos <= 0:
+                break
+            suffixes.append(name[pos:])
+        return suffixes
+
+    def match(self, record, now=None):
+        """Return the first Rule that matches record (a FileRecord), or None"""
+        rules, combined, named, individual, by_extension, generic, max_parts = self._compiled
+        if not named and not by_extension and not generic:
+            return None
+        name = os.path.basename(record.path)
+        suffixes = self._suffixes(name.lower(), max_parts)
+        parent = os.path.normcase(os.path.dirname(os.path.abspath(record.path)))
+        now = time.time() if now is None else now
+
+        candidates = {rule.index for rule in generic}
+        for suffix in suffixes:
+            candidates.update(rule.index for rule in by_extension.get(suffix, ()))
+        first_named = None
+        if combined is not None:
+            found = combined.match(name)
+            if found is not None:
+                # The outer rN group always closes last, so it is lastgroup
+                first_named = rules[int(found.lastgroup[1:])]
+                candidates.add(first_named.index)
+
+        heap = list(candidates)
+        heapq.heapify(heap)
+        while heap:
+            rule = rules[heapq.heappop(heap)]
+            if rule.check(record, now, parent, suffixes):
+                return rule
+            if rule is first_named:
+                # Rare path: the earliest name match failed its other conditions, so
+                # look for the next rule whose pattern matches
+                position = named.index(rule)
+                for later in named[position + 1:]:
+                    if individual[later.index].match(name):
+                        first_named = later
+                        heapq.heappush(heap, later.index)
+                        break
+        return None
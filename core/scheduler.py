@@ -0,0 +1,254 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from core.workers import WorkerPool
+
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+# How far into one source directory's queue a worker looks for an item whose key is free
+SCAN_LIMIT = 64
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """Allow rate units per second on average, and up to burst at once.
+
+        consume() reserves its amount immediately and sleeps off any debt,
+        so callers are served in arrival order and a request larger than
+        burst still goes through, just after a proportionally longer wait.
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """Take amount tokens, sleeping until they are earned; returns the seconds slept"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class DeviceBudgets:
+    def __init__(self, budgets=None, default=None):
+        """Bytes/sec and IOPS limits per destination device.
+
+        budgets maps any path on a device (a mount point, say) to a dict
+        with 'bytes_per_sec' and/or 'iops'; default applies to every other
+        device, or None to leave them unlimited. FileTransfer calls io()
+        before each operation and copied chunk.
+        """
+        self._lock = threading.Lock()
+        self._devices = {}  # directory -> st_dev
+        self.throttled_seconds = 0.0
+        self.configure(budgets, default)
+
+    def configure(self, budgets=None, default=None):
+        """Replace every budget; takes effect for the next operation"""
+        resolved = {}  # st_dev -> budget dict
+        for path, budget in (budgets or {}).items():
+            try:
+                resolved[os.stat(os.path.expanduser(path)).st_dev] = budget
+            except OSError as e:
+                logging.warning(f"Ignoring I/O budget for {path}: {str(e)}")
+        with self._lock:
+            self._budgets = resolved
+            self.default = default
+            self._buckets = {}  # st_dev -> (bytes bucket or None, ops bucket or None)
+
+    def _device(self, path):
+        directory = os.path.dirname(path)
+        device = self._devices.get(directory)
+        if device is None:
+            device = os.stat(directory).st_dev
+            if len(self._devices) > 4096:
+                self._devices.clear()
+            self._devices[directory] = device
+        return device
+
+    def _buckets_for(self, device):
+        buckets = self._buckets.get(device)
+        if buckets is None:
+            budget = self._budgets.get(device, self.default) or {}
+            rate, iops = budget.get('bytes_per_sec'), budget.get('iops')
+            with self._lock:
+                buckets = self._buckets.setdefault(device, (
+                    TokenBucket(rate) if rate else None,
+                    TokenBucket(iops) if iops else None,
+                ))
+        return buckets
+
+    def io(self, path, nbytes=0, ops=0):
+        """Wait until path's device has budget for nbytes and ops"""
+        if not self._budgets and not self.default:
+            return
+        try:
+            byte_bucket, op_bucket = self._buckets_for(self._device(path))
+        except OSError:
+            return
+        waited = 0.0
+        if ops and op_bucket is not None:
+            waited += op_bucket.consume(ops)
+        if nbytes and byte_bucket is not None:
+            waited += byte_bucket.consume(nbytes)
+        if waited:
+            with self._lock:
+                self.throttled_seconds += waited
+
+class _Lane:
+    __slots__ = ('queues', 'ring', 'active', 'pending')
+
+    def __init__(self):
+        self.queues = {}  # source -> deque of (key, item, enqueued_at)
+        self.ring = deque()  # sources with queued items, in round-robin order
+        self.active = set()  # keys being handled in this lane
+        self.pending = 0
+
+class IOScheduler(WorkerPool):
+    def __init__(self, handler, workers=4, large_workers=1, large_threshold=LARGE_FILE_THRESHOLD,
+                 max_pending=1000):
+        """A WorkerPool with separate lanes for small and large files.
+
+        Files of at least large_threshold bytes go to the large lane, which
+        has its own large_workers threads, so a burst of small files never
+        waits behind a multi-gigabyte copy, and the large files keep moving
+        however many small ones arrive. Large-lane threads help with small
+        files when they have nothing else to do. Within a lane, source
+        directories take turns, and items sharing a key still run one at a
+        time in submission order: a key stays in the lane its first item
+        went to until all of its items are done, whatever their sizes.
+        """
+        super().__init__(handler, workers, max_pending)
+        self.large_workers = large_workers
+        self.large_threshold = large_threshold
+        self._lanes = {'small': _Lane(), 'large': _Lane()}
+        self._key_lanes = {}  # key -> [lane name, items queued or running]
+        for lane in self._lanes:
+            self.metrics[f'{lane}_completed'] = 0
+            self.metrics[f'{lane}_wait_seconds_total'] = 0.0
+            self.metrics[f'{lane}_wait_seconds_max'] = 0.0
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            roles = [('small', ('small',))] * self.workers + \
+                    [('large', ('large', 'small'))] * self.large_workers
+            for i, (name, order) in enumerate(roles):
+                thread = threading.Thread(target=self._work, args=(order,),
+                                          name=f"organizer-{name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key, item, timeout=None, size=None, source=None):
+        """Queue item under key; size picks the lane and source the fairness group"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._accepting and self._pending >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            if not self._accepting:
+                return False
+
+            pinned = self._key_lanes.get(key)
+            if pinned is None:
+                name = 'large' if size is not None and size >= self.large_threshold else 'small'
+                pinned = self._key_lanes[key] = [name, 0]
+            pinned[1] += 1
+            lane = self._lanes[pinned[0]]
+            queue = lane.queues.get(source)
+            if queue is None:
+                queue = lane.queues[source] = deque()
+                lane.ring.append(source)
+            queue.append((key, item, time.monotonic()))
+            lane.pending += 1
+            self._pending += 1
+            self.metrics['submitted'] += 1
+            if self._pending > self.metrics['max_depth']:
+                self.metrics['max_depth'] = self._pending
+            self._cond.notify_all()
+        return True
+
+    def lane_depths(self):
+        with self._cond:
+            return {name: lane.pending for name, lane in self._lanes.items()}
+
+    def get_metrics(self):
+        metrics = super().get_metrics()
+        for name, depth in self.lane_depths().items():
+            metrics[f'{name}_depth'] = depth
+        return metrics
+
+    def _take(self, lane):
+        """Pop the next runnable item, visiting source directories round-robin"""
+        ring = lane.ring
+        for _ in range(len(ring)):
+            source = ring[0]
+            ring.rotate(-1)
+            queue = lane.queues[source]
+            for index, (key, item, enqueued_at) in enumerate(queue):
+                if index == SCAN_LIMIT:
+                    break
+                if key in lane.active:
+                    continue
+                del queue[index]
+                if not queue:
+                    del lane.queues[source]
+                    ring.remove(source)
+                lane.active.add(key)
+                lane.pending -= 1
+                return key, item, enqueued_at
+        return None
+
+    def _work(self, order):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    for name in order:
+                        job = self._take(self._lanes[name])
+                        if job is not None:
+                            break
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+                key, item, enqueued_at = job
+
+            started = time.monotonic()
+            failed = False
+            try:
+                self.handler(item)
+            except Exception as e:
+                failed = True
+                logging.error(f"Worker failed on {item}: {str(e)}")
+            finished = time.monotonic()
+
+            with self._cond:
+                self._lanes[name].active.discard(key)
+                pinned = self._key_lanes[key]
+                pinned[1] -= 1
+                if not pinned[1]:
+                    del self._key_lanes[key]
+                self._pending -= 1
+                wait, run = started - enqueued_at, finished - started
+                m = self.metrics
+                m['failed' if failed else 'completed'] += 1
+                m[f'{name}_completed'] += 1
+                m['wait_seconds_total'] += wait
+                m['wait_seconds_max'] = max(m['wait_seconds_max'], wait)
+                m[f'{name}_wait_seconds_total'] += wait
+                m[f'{name}_wait_seconds_max'] = max(m[f'{name}_wait_seconds_max'], wait)
+                m['run_seconds_total'] += run
+                m['run_seconds_max'] = max(m['run_seconds_max'], run)
+                self._cond.notify_all()
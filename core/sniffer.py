@@ -0,0 +1,132 @@
+import os
+from core.state import LRUCache
+
+HEADER_SIZE = 4096
+_NOT_CACHED = object()  # distinguishes a miss from a cached None (unknown type)
+
+# (offset, magic bytes, extension), checked in order
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", ".jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", ".png"),
+    (0, b"GIF87a", ".gif"),
+    (0, b"GIF89a", ".gif"),
+    (0, b"II*\x00", ".tiff"),
+    (0, b"MM\x00*", ".tiff"),
+    (0, b"8BPS", ".psd"),
+    (0, b"\x00\x00\x01\x00", ".ico"),
+    (0, b"%PDF-", ".pdf"),
+    (0, b"{\\rtf", ".rtf"),
+    (0, b"Rar!\x1a\x07", ".rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", ".7z"),
+    (0, b"\x1f\x8b", ".gz"),
+    (0, b"BZh", ".bz2"),
+    (0, b"\xfd7zXZ\x00", ".xz"),
+    (0, b"\x28\xb5\x2f\xfd", ".zst"),
+    (257, b"ustar", ".tar"),
+    (0, b"fLaC", ".flac"),
+    (0, b"OggS", ".ogg"),
+    (0, b"ID3", ".mp3"),
+    (0, b"MThd", ".mid"),
+    (0, b"FLV\x01", ".flv"),
+    (0, b"\x00\x00\x01\xba", ".mpg"),
+    (0, b"\x00\x00\x01\xb3", ".mpg"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".doc"),
+]
+
+RIFF_TYPES = {b"WEBP": ".webp", b"AVI ": ".avi", b"WAVE": ".wav"}
+FORM_TYPES = {b"AIFF": ".aiff", b"AIFC": ".aiff"}
+ASF_GUID = b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"
+# ISO base media (MP4 family) major brands
+# ISO base media files share one container; the major brand says what is inside, and an
+# unknown brand is left to the extension
+FTYP_BRANDS = {
+    b"isom": ".mp4", b"iso2": ".mp4", b"iso4": ".mp4", b"iso5": ".mp4", b"iso6": ".mp4",
+    b"mp41": ".mp4", b"mp42": ".mp4", b"avc1": ".mp4", b"dash": ".mp4", b"MSNV": ".mp4",
+    b"qt  ": ".mov", b"M4A ": ".m4a", b"M4B ": ".m4a", b"M4V ": ".m4v",
+    b"3gp4": ".3gp", b"3gp5": ".3gp", b"3gp6": ".3gp", b"3g2a": ".3g2",
+    b"heic": ".heic", b"heix": ".heic", b"heim": ".heic", b"heis": ".heic",
+    b"hevc": ".heic", b"hevx": ".heic", b"mif1": ".heif", b"msf1": ".heif",
+    b"avif": ".avif", b"avis": ".avif",
+}
+OOXML_PARTS = {b"word/": ".docx", b"xl/": ".xlsx", b"ppt/": ".pptx"}
+ZIP_MIMETYPES = {
+    b"application/epub+zip": ".epub",
+    b"application/vnd.oasis.opendocument.text": ".odt",
+    b"application/vnd.oasis.opendocument.spreadsheet": ".ods",
+    b"application/vnd.oasis.opendocument.presentation": ".odp",
+}
+
+# Generic containers (plain ZIP, OLE2) also wrap installers, jars, etc., so they are only
+# trusted for files that have no extension at all
+AMBIGUOUS = {".zip", ".doc"}
+
+def _sniff_zip(header):
+    # ODF and EPUB store an uncompressed "mimetype" entry first
+    if header[30:38] == b"mimetype":
+        for mimetype, ext in ZIP_MIMETYPES.items():
+            if header[38:38 + len(mimetype)] == mimetype:
+                return ext
+    for part, ext in OOXML_PARTS.items():
+        if part in header:
+            return ext
+    return ".zip"
+
+def sniff(header):
+    """Return the extension implied by a file header, or None if unrecognised"""
+    if header[:4] == b"PK\x03\x04":
+        return _sniff_zip(header)
+    if header[:4] == b"RIFF":
+        return RIFF_TYPES.get(header[8:12])
+    if header[:4] == b"FORM":
+        return FORM_TYPES.get(header[8:12])
+    if header[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(header[8:12])
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return ".webm" if b"webm" in header[:64] else ".mkv"
+    if header[:8] == ASF_GUID:
+        return ".wmv"
+    for offset, magic, ext in SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return ext
+    # MPEG audio frame sync without an ID3 tag
+    if len(header) > 1 and header[0] == 0xff and header[1] & 0xe0 == 0xe0:
+        return ".mp3"
+    return None
+
+class ContentSniffer:
+    def __init__(self, header_size=HEADER_SIZE, cache_size=4096):
+        """Detect real file types from magic numbers with one small read per file.
+
+        Results are cached by (device, inode, size, mtime) so repeated events
+        for an unchanged file never touch the disk again.
+        """
+        self.header_size = header_size
+        self.cache_size = cache_size
+        self._cache = LRUCache(cache_size)
+
+    def probe(self, filepath, st=None):
+        """Return (extension or None, header bytes), or None if the file cannot be opened.
+
+        A failed open doubles as the download-complete check: files still
+        locked by the writer (as on Windows) are reported as not ready. On a
+        cache hit the header is empty because the file was not read.
+        """
+        if st is None:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                return None
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        cached = self._cache.get(key, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached, b""
+
+        try:
+            with open(filepath, 'rb') as f:
+                header = f.read(self.header_size)
+        except OSError:
+            return None
+        ext = sniff(header)
+
+        self._cache.put(key, ext)
+        return ext, header
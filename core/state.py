@@ -0,0 +1,104 @@
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+
+_MISSING = object()
+
+class LRUCache:
+    def __init__(self, max_size=10000, ttl=None):
+        """Thread-safe mapping bounded by entry count and, optionally, age in seconds.
+
+        The least recently used entry is evicted once max_size is exceeded,
+        and entries older than ttl are dropped when touched or by prune(), so
+        a long-running daemon never loses everything at once the way a
+        periodic clear() does.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            if self._expired(item[1], now):
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value=True):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key):
+        """Set-style insert"""
+        self.put(key, True)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+    def prune(self):
+        """Drop expired entries, oldest first, and return how many were removed"""
+        if self.ttl is None:
+            return 0
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._data:
+                key, (_, stored_at) = next(iter(self._data.items()))
+                if not self._expired(stored_at, now):
+                    break
+                del self._data[key]
+                removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def sizeof(self):
+        """Approximate bytes held, counting the container, keys and values"""
+        with self._lock:
+            items = list(self._data.items())
+        return sys.getsizeof(self._data) + sum(
+            approximate_size(key) + approximate_size(value) + 64  # (value, time) tuple + float
+            for key, (value, _) in items
+        )
+
+def approximate_size(obj, depth=2):
+    """Shallow size plus that of contained items and slot attributes, down to depth levels of nesting"""
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, bytearray, int, float)):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(approximate_size(k, depth - 1) + approximate_size(v, depth - 1)
+                          for k, v in list(obj.items()))
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return size + sum(approximate_size(item, depth - 1) for item in list(obj))
+    slots = getattr(type(obj), '__slots__', ())
+    if isinstance(slots, str):
+        slots = (slots,)
+    # Slotted records (such as NameAllocator's per-directory entries) hold their data in attributes
+    return size + sum(approximate_size(getattr(obj, name), depth - 1)
+                      for name in slots if hasattr(obj, name))
@@ -0,0 +1,228 @@
+import os
+import time
+import errno
+import shutil
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux FICLONE ioctl: share extents instead of copying (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+# Files at least this large get a throughput line in the log
+LARGE_FILE_LOG_THRESHOLD = 256 * 1024 * 1024
+
+class FileTransfer:
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, fsync='none', fsync_batch=64,
+                 verify_with=None, progress=None, progress_interval=64 * 1024 * 1024, throttle=None,
+                 journal=None):
+        """Move files, picking the cheapest mechanism the filesystems allow.
+
+        Same-device moves are a single atomic rename. Cross-device moves copy
+        into a hidden temporary file next to the destination (reflink, then
+        copy_file_range, then sendfile, then a buffered copy), rename it into
+        place and only then delete the source.
+
+        fsync: 'none', 'each' or 'batch'. Both 'each' and 'batch' flush a
+            copy and its directory before deleting the source; 'batch' then
+            flushes the source directories, which only record the deletion,
+            in groups of fsync_batch or on flush().
+        verify_with: callable(path) -> digest used to check a copy against a
+            digest the caller already computed.
+        progress: callable(path, bytes_done, total) called every
+            progress_interval bytes during cross-device copies.
+        throttle: object with io(path, nbytes=0, ops=0) (a DeviceBudgets),
+            called before each move and each copied chunk and allowed to
+            block to hold the destination device to its budget.
+        journal: MoveJournal recording each move before and after it runs.
+        """
+        if fsync not in ('none', 'each', 'batch'):
+            raise ValueError(f"Unknown fsync mode: {fsync}")
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.fsync_batch = fsync_batch
+        self.verify_with = verify_with
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.throttle = throttle
+        self.journal = journal
+        self._unsynced = []
+        self._lock = threading.Lock()
+        self._reflink_supported = fcntl is not None
+        self._copy_file_range_supported = hasattr(os, 'copy_file_range')
+        self._sendfile_supported = hasattr(os, 'sendfile') and os.name == 'posix'
+
+    def move(self, source, destination, expected_digest=None, src_stat=None, journaled=True):
+        """Move source to destination and return a dict describing the transfer.
+
+        journaled=False leaves journaling to a caller that records the move
+        under a different destination, as ContentStore does.
+        """
+        started = time.monotonic()
+        st = src_stat or os.stat(source)
+        if self.throttle is not None:
+            self.throttle.io(destination, ops=1)
+        entry = None
+        if journaled and self.journal is not None:
+            entry = self.journal.begin(source, destination, st)
+        try:
+            try:
+                # replace rather than rename so a claimed placeholder is overwritten on Windows too
+                os.replace(source, destination)
+                method = 'rename'
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                if entry is not None:
+                    self.journal.sync(entry)  # a crash mid-copy must find the plan on disk
+                method = self._copy_across_devices(source, destination, st, expected_digest)
+                os.unlink(source)
+                if self.fsync == 'each':
+                    self._sync_directories([os.path.dirname(source)])
+                elif self.fsync == 'batch':
+                    self._queue_fsync(os.path.dirname(source))
+        except BaseException:
+            if entry is not None:
+                self.journal.finish(entry, 'failed')
+            raise
+        if entry is not None:
+            self.journal.finish(entry)
+
+        seconds = time.monotonic() - started
+        if method != 'rename' and st.st_size >= LARGE_FILE_LOG_THRESHOLD:
+            rate = st.st_size / seconds / (1024 * 1024) if seconds else 0.0
+            logging.info(f"Copied {os.path.basename(destination)} ({st.st_size / (1024 * 1024):.0f} MiB) "
+                         f"via {method} in {seconds:.1f}s, {rate:.0f} MiB/s")
+        return {'method': method, 'bytes': st.st_size, 'seconds': seconds}
+
+    def _copy_across_devices(self, source, destination, st, expected_digest):
+        dest_dir, name = os.path.split(destination)
+        temp_path = os.path.join(dest_dir, f".{name}.fileforge-tmp")
+        try:
+            with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+                method = self._copy_data(src, dst, st.st_size, destination)
+                if self.fsync != 'none':
+                    # Whatever the mode, the copy reaches disk before the source is deleted
+                    os.fsync(dst.fileno())
+            shutil.copystat(source, temp_path)
+            if expected_digest is not None and self.verify_with is not None:
+                if self.verify_with(temp_path) != expected_digest:
+                    raise OSError(errno.EIO, f"Copy of {source} failed verification")
+            os.replace(temp_path, destination)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        if self.fsync != 'none':
+            self._sync_directories([dest_dir])
+        return method
+
+    def _copy_data(self, src, dst, size, destination):
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        if self._reflink_supported and size:
+            try:
+                fcntl.ioctl(dst_fd, FICLONE, src_fd)
+                return 'reflink'
+            except OSError:
+                pass
+
+        if self._copy_file_range_supported and size:
+            try:
+                self._copy_loop(lambda offset, count: os.copy_file_range(src_fd, dst_fd, count),
+                                size, destination)
+                return 'copy_file_range'
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                # EXDEV only rules out this pair of filesystems, anything else the whole kernel
+                if e.errno != errno.EXDEV:
+                    self._copy_file_range_supported = False
+                self._rewind(src_fd, dst_fd)
+
+        if self._sendfile_supported and size:
+            try:
+                self._copy_loop(lambda offset, count: os.sendfile(dst_fd, src_fd, offset, count),
+                                size, destination)
+                return 'sendfile'
+            except OSError as e:
+                if e.errno not in (errno.ENOSYS, errno.EINVAL):
+                    raise
+                self._sendfile_supported = False
+                self._rewind(src_fd, dst_fd)
+
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
+        done = 0
+        next_report = self.progress_interval
+        while True:
+            n = src.readinto(buf)
+            if not n:
+                break
+            if self.throttle is not None:
+                self.throttle.io(destination, nbytes=n)
+            dst.write(view[:n])
+            done += n
+            if self.progress and done >= next_report:
+                self.progress(destination, done, size)
+                next_report += self.progress_interval
+        if done < size:
+            raise OSError(errno.EIO, f"Copied {done} of {size} bytes to {destination}")
+        return 'copy'
+
+    def _copy_loop(self, copy_chunk, size, destination):
+        done = 0
+        next_report = self.progress_interval
+        while done < size:
+            count = min(self.buffer_size, size - done)
+            if self.throttle is not None:
+                self.throttle.io(destination, nbytes=count)
+            n = copy_chunk(done, count)
+            if n == 0:
+                break
+            done += n
+            if self.progress and done >= next_report:
+                self.progress(destination, done, size)
+                next_report += self.progress_interval
+        if done != size:
+            # The source shrank while copying; fail the move rather than delete it
+            raise OSError(errno.EIO, f"Copied {done} of {size} bytes to {destination}")
+
+    @staticmethod
+    def _rewind(src_fd, dst_fd):
+        os.lseek(src_fd, 0, os.SEEK_SET)
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        os.ftruncate(dst_fd, 0)
+
+    def _queue_fsync(self, directory):
+        with self._lock:
+            self._unsynced.append(directory)
+            if len(self._unsynced) < self.fsync_batch:
+                return
+            batch, self._unsynced = self._unsynced, []
+        self._sync_directories(batch)
+
+    def flush(self):
+        """fsync every source directory still waiting in the current batch"""
+        with self._lock:
+            batch, self._unsynced = self._unsynced, []
+        self._sync_directories(batch)
+
+    @staticmethod
+    def _sync_directories(directories):
+        # Windows cannot open a directory to flush it
+        if os.name == 'posix':
+            for directory in set(directories):
+                try:
+                    fd = os.open(directory, os.O_RDONLY)
+                except OSError:
+                    continue  # removed since the move
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
@@ -0,0 +1,50 @@
+import os
+import time
+
+# Windows process access right and GetExitCodeProcess status
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+STILL_ACTIVE = 259
+
+def process_running(pid):
+    """True if a process with this id is running on this machine"""
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # Access denied means it exists but belongs to someone else
+            return ctypes.GetLastError() == 5
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def boot_time():
+    """Seconds since the epoch at which this machine booted, or None if unknown.
+
+    Process ids are reused after a reboot, so a record stamped with an
+    older boot time belongs to a process that has certainly exited.
+    """
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+        return time.time() - kernel32.GetTickCount64() / 1000
+    try:
+        with open('/proc/stat', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('btime '):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return None
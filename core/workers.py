@@ -0,0 +1,142 @@
+import time
+import logging
+import threading
+from collections import deque
+
+class WorkerPool:
+    def __init__(self, handler, workers=4, max_pending=1000):
+        """Run handler(item) on a pool of worker threads fed by a bounded queue.
+
+        Items submitted under the same key (the destination directory) run one
+        at a time in submission order; different keys run in parallel. submit
+        blocks once max_pending items are waiting, pushing back on producers.
+        """
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queues = {}  # key -> deque of (item, enqueued_at), present while the key has work
+        self._ready = deque()  # keys with queued items and no worker on them
+        self._active = set()  # keys currently being handled
+        self._pending = 0
+        self._accepting = True
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._threads = []
+        self.metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'max_depth': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'run_seconds_total': 0.0,
+            'run_seconds_max': 0.0,
+        }
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"organizer-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key, item, timeout=None):
+        """Queue item under key, return False if the pool is full after timeout or shut down"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._accepting and self._pending >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            if not self._accepting:
+                return False
+
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+            queue.append((item, time.monotonic()))
+            if len(queue) == 1 and key not in self._active:
+                self._ready.append(key)
+            self._pending += 1
+            self.metrics['submitted'] += 1
+            if self._pending > self.metrics['max_depth']:
+                self.metrics['max_depth'] = self._pending
+            self._cond.notify_all()
+        return True
+
+    def depth(self):
+        with self._cond:
+            return self._pending
+
+    def get_metrics(self):
+        with self._cond:
+            metrics = dict(self.metrics)
+            metrics['depth'] = self._pending
+        return metrics
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                item, enqueued_at = self._queues[key].popleft()
+                self._active.add(key)
+
+            started = time.monotonic()
+            failed = False
+            try:
+                self.handler(item)
+            except Exception as e:
+                failed = True
+                logging.error(f"Worker failed on {item}: {str(e)}")
+            finished = time.monotonic()
+
+            with self._cond:
+                self._active.discard(key)
+                if self._queues[key]:
+                    self._ready.append(key)
+                else:
+                    del self._queues[key]
+                self._pending -= 1
+                wait, run = started - enqueued_at, finished - started
+                m = self.metrics
+                m['failed' if failed else 'completed'] += 1
+                m['wait_seconds_total'] += wait
+                m['wait_seconds_max'] = max(m['wait_seconds_max'], wait)
+                m['run_seconds_total'] += run
+                m['run_seconds_max'] = max(m['run_seconds_max'], run)
+                self._cond.notify_all()
+
+    def drain(self, timeout=None):
+        """Wait until every queued item has been handled, return False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, drain=True, timeout=None):
+        """Stop accepting work, optionally finish what is queued, then stop the workers"""
+        with self._cond:
+            self._accepting = False
+            self._cond.notify_all()
+        if drain:
+            self.drain(timeout)
+        with self._cond:
+            self._stopping = True
+            if not drain:
+                self._ready.clear()
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join()
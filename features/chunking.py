@@ -0,0 +1,258 @@
+import os
+import re
+import bisect
+import random
+import hashlib
+import sqlite3
+import threading
+
+try:
+    import numpy
+except ImportError:  # Optional, chunking falls back to big-integer lane arithmetic
+    numpy = None
+
+MIN_SIZE = 8 * 1024
+AVG_SIZE = 32 * 1024
+MAX_SIZE = 128 * 1024
+HASH_BITS = 16
+WINDOW = HASH_BITS  # bytes that influence each gear hash value
+READ_SIZE = 1024 * 1024
+
+# Fixed seed: chunk boundaries, and so every stored fingerprint, must never change
+_rng = random.Random(0x46617374434443)
+GEAR = tuple(_rng.getrandbits(HASH_BITS) for _ in range(256))
+# Low and high byte of each gear value, for bytes.translate
+_GEAR_BYTES = (bytes(g & 0xFF for g in GEAR), bytes(g >> 8 for g in GEAR))
+_LANE = b'\xff\xff\x00\x00'
+
+def fingerprint(data):
+    """64-bit chunk fingerprint as a signed integer, the range SQLite stores natively"""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
+class Chunker:
+    def __init__(self, min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE):
+        """FastCDC-style content-defined chunking over a 16-bit gear hash.
+
+        A chunk ends where the top bits of the rolling hash are all zero:
+        a stricter mask below avg_size and a looser one above it (normalized
+        chunking), never before min_size and always at max_size. Each hash
+        value depends only on the last 16 bytes, so boundaries follow the
+        content when bytes are inserted or removed earlier in a file.
+
+        Every hash in a buffer is computed at once by log-step doubling: four
+        passes of shift-and-add over all positions. With NumPy the passes
+        run on a uint16 array; without it each position is a 32-bit lane of
+        one Python integer, which is about four times faster than a
+        per-byte loop. Both give identical cuts.
+        """
+        if not WINDOW <= min_size <= avg_size <= max_size:
+            raise ValueError("Chunk sizes must satisfy 16 <= min <= avg <= max")
+        bits = avg_size.bit_length() - 1
+        if not 9 <= bits < HASH_BITS:
+            raise ValueError("Average chunk size must be between 512 bytes and 32 KiB")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.mask_s = ((1 << (bits + 1)) - 1) << (HASH_BITS - bits - 1)
+        self.mask_l = ((1 << (bits - 1)) - 1) << (HASH_BITS - bits + 1)
+        self._gear = numpy.array(GEAR, dtype=numpy.uint16) if numpy is not None else None
+        self._lane_mask = None
+        self._lock = threading.Lock()
+
+    def _mask_for(self, lanes):
+        """Integer keeping the low 16 bits of each 32-bit lane, cached at the usual buffer size"""
+        with self._lock:
+            if self._lane_mask is None or self._lane_mask[0] < lanes:
+                size = max(lanes, (READ_SIZE + self.max_size) + WINDOW)
+                self._lane_mask = (size, int.from_bytes(_LANE * size, 'little'))
+            return self._lane_mask[1]
+
+    def _candidates(self, data):
+        """Positions whose hash passes the loose mask, and the subset passing the strict one"""
+        if self._gear is not None:
+            h = self._gear[numpy.frombuffer(data, dtype=numpy.uint8)]
+            # After the pass for step k each value sums 2k shifted gear terms, mod 2**16
+            for step in (1, 2, 4, 8):
+                h[step:] += h[:-step] << numpy.uint16(step)
+            strict = numpy.flatnonzero((h & numpy.uint16(self.mask_s)) == 0).tolist()
+            loose = numpy.flatnonzero((h & numpy.uint16(self.mask_l)) == 0).tolist()
+            return strict, loose
+
+        n = len(data)
+        lanes = bytearray(4 * n)
+        lanes[0::4] = data.translate(_GEAR_BYTES[0])
+        lanes[1::4] = data.translate(_GEAR_BYTES[1])
+        x = int.from_bytes(lanes, 'little')
+        mask = self._mask_for(n + WINDOW)
+        # Lane i gains lane i-step shifted left by step bits; values stay below 2**25
+        for step in (1, 2, 4, 8):
+            x = (x + (x << (33 * step))) & mask
+        hashes = x.to_bytes(4 * (n + WINDOW), 'little')
+        strict, loose = [], []
+        # Both masks cover the hash's high byte, so only positions where it is zero can pass
+        for match in re.finditer(b'\x00', hashes[1:4 * n:4]):
+            i = match.start()
+            h = hashes[4 * i]
+            if not h & self.mask_l:
+                loose.append(i)
+                if not h & self.mask_s:
+                    strict.append(i)
+        return strict, loose
+
+    def cuts(self, data, final=True):
+        """Return chunk lengths for data, which must start on a chunk boundary.
+
+        Unless final, a trailing piece that more data could still extend is
+        left out; the caller prepends it to the next buffer.
+        """
+        strict, loose = self._candidates(data)
+        n = len(data)
+        lengths = []
+        start = 0
+        while start < n:
+            # Lengths in [min, avg) need the strict mask, [avg, max) the loose one
+            low, mid, high = start + self.min_size - 1, start + self.avg_size - 1, start + self.max_size - 1
+            cut = None
+            i = bisect.bisect_left(strict, low)
+            if i < len(strict) and strict[i] < mid:
+                cut = strict[i] + 1
+            elif n >= mid:
+                i = bisect.bisect_left(loose, mid)
+                if i < len(loose) and loose[i] < high:
+                    cut = loose[i] + 1
+                elif n - start >= self.max_size:
+                    cut = start + self.max_size
+            if cut is None:
+                if not final:
+                    break
+                cut = n
+            lengths.append(cut - start)
+            start = cut
+        return lengths
+
+    def chunk_file(self, path):
+        """Return [(fingerprint, length), ...] for every chunk of a file"""
+        chunks = []
+        pending = b""
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(READ_SIZE)
+                data = pending + block if pending else block
+                final = not block
+                offset = 0
+                for length in self.cuts(data, final):
+                    chunks.append((fingerprint(data[offset:offset + length]), length))
+                    offset += length
+                pending = data[offset:]
+                if final:
+                    return chunks
+
+class ChunkIndex:
+    BATCH_SIZE = 500
+
+    def __init__(self, db_path=":memory:"):
+        """Chunk fingerprints per file, for finding files that share most of their content.
+
+        Similarity is byte-weighted Jaccard: the bytes in chunks two files
+        share over the bytes in either of them. Paths that have disappeared
+        are dropped when they turn up in a lookup.
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-8192")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " fingerprint INTEGER NOT NULL, file_id INTEGER NOT NULL, length INTEGER NOT NULL,"
+            " PRIMARY KEY (fingerprint, file_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_file ON chunks(file_id)")
+        self._conn.commit()
+        self.counters = {'files_indexed': 0, 'chunks_indexed': 0, 'near_duplicates': 0}
+
+    def get_counters(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def _remove(self, path):
+        row = self._conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM chunks WHERE file_id = ?", (row[0],))
+            self._conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+    def add(self, path, size, chunks):
+        """Index a file's chunks, replacing any earlier entry for the path"""
+        with self._lock:
+            self._remove(path)
+            file_id = self._conn.execute(
+                "INSERT INTO files (path, size) VALUES (?, ?)", (path, size)
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (fingerprint, file_id, length) VALUES (?, ?, ?)",
+                [(fp, file_id, length) for fp, length in chunks]
+            )
+            self._conn.commit()
+            self.counters['files_indexed'] += 1
+            self.counters['chunks_indexed'] += len(chunks)
+
+    def remove(self, path):
+        with self._lock:
+            self._remove(path)
+            self._conn.commit()
+
+    def rename(self, source, destination):
+        """Keep a file's entry after it moves, replacing any entry at destination"""
+        with self._lock:
+            self._remove(destination)
+            self._conn.execute("UPDATE files SET path = ? WHERE path = ?", (destination, source))
+            self._conn.commit()
+
+    def similar(self, chunks, size, threshold=0.5, limit=5):
+        """Return [(path, similarity), ...] of indexed files at least threshold similar, best first"""
+        unique = dict(chunks)
+        if not unique:
+            return []
+        shared = {}
+        fingerprints = list(unique)
+        with self._lock:
+            for i in range(0, len(fingerprints), self.BATCH_SIZE):
+                batch = fingerprints[i:i + self.BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT file_id, fingerprint FROM chunks WHERE fingerprint IN "
+                    f"({','.join('?' * len(batch))})", batch
+                )
+                for file_id, fp in rows:
+                    shared[file_id] = shared.get(file_id, 0) + unique[fp]
+            candidates = []
+            for file_id, common in sorted(shared.items(), key=lambda item: -item[1]):
+                # Even identical sizes cannot beat common / max(size) similarity
+                if common / size < threshold:
+                    break
+                row = self._conn.execute("SELECT path, size FROM files WHERE id = ?",
+                                         (file_id,)).fetchone()
+                similarity = common / (size + row[1] - common)
+                if similarity >= threshold:
+                    candidates.append((row[0], similarity))
+        results = []
+        for path, similarity in sorted(candidates, key=lambda item: -item[1]):
+            if not os.path.exists(path):
+                self.remove(path)
+                continue
+            results.append((path, similarity))
+            if len(results) == limit:
+                break
+        if results:
+            with self._lock:
+                self.counters['near_duplicates'] += 1
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
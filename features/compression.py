@@ -1,7 +1,296 @@
 import zipfile
 import os
+import shutil
+import time
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+CODECS = {
+    'deflate': zipfile.ZIP_DEFLATED,
+    'bzip2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+}
+
+# Formats that are already compressed; recompressing them burns CPU for nothing
+COMPRESSED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.mkv', '.avi', '.mov',
+    '.webm', '.m4v', '.mp3', '.m4a', '.aac', '.ogg', '.flac', '.wma', '.zip',
+    '.rar', '.7z', '.gz', '.bz2', '.xz', '.zst', '.tgz', '.iso', '.dmg',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub', '.pdf',
+}
+SKIP_CATEGORIES = {'Images', 'Videos', 'Audio', 'Archives'}
+
+def _codec(spec):
+    """Validate a (codec, level) pair, which JSON settings give as a list"""
+    codec, level = spec
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if not isinstance(level, int) or not 0 <= level <= 9:
+        raise ValueError(f"Compression level must be an integer from 0 to 9, not {level!r}")
+    return codec, level
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _append(zf, paths, done):
+    """Write paths into zf under unused names, return those names and add the paths to done"""
+    added = []
+    names = set(zf.namelist())
+    for path in paths:
+        arcname = os.path.basename(path)
+        base, ext = os.path.splitext(arcname)
+        counter = 1
+        while arcname in names:
+            arcname = f"{base}_{counter}{ext}"
+            counter += 1
+        try:
+            # ZipFile.write streams the file in chunks rather than loading it
+            zf.write(path, arcname)
+        except OSError as e:
+            logging.error(f"Could not compress {path}: {str(e)}")
+            continue
+        names.add(arcname)
+        added.append(arcname)
+        done.append(path)
+    return added
+
+def _compress_batch(archive_path, paths, codec, level, safe=False):
+    """Append paths to archive_path and return sizes; runs in a worker process.
+
+    With safe=True the archive is never modified in place: the batch goes
+    into a temporary file (a copy of the archive, if it already exists)
+    that is synced to disk and read back before it replaces the archive,
+    so the originals can be deleted afterwards without a crash or a full
+    disk ever costing both copies.
+    """
+    started = time.monotonic()
+    done, bytes_in, bytes_out = [], 0, 0
+    target = archive_path
+    if safe:
+        directory, name = os.path.split(archive_path)
+        target = os.path.join(directory, f".{name}.fileforge-tmp")
+        if os.path.exists(archive_path):
+            shutil.copyfile(archive_path, target)
+    try:
+        with zipfile.ZipFile(target, 'a', compression=CODECS[codec], compresslevel=level,
+                             allowZip64=True) as zf:
+            added = _append(zf, paths, done)
+            for arcname in added:
+                info = zf.getinfo(arcname)
+                bytes_in += info.file_size
+                bytes_out += info.compress_size
+        if safe:
+            with open(target, 'r+b') as f:
+                os.fsync(f.fileno())
+            with zipfile.ZipFile(target) as zf:
+                for arcname in added:
+                    # Reading a member to the end checks its CRC
+                    with zf.open(arcname) as member:
+                        while member.read(1024 * 1024):
+                            pass
+            os.replace(target, archive_path)
+            if os.name == 'posix':
+                _fsync_dir(os.path.dirname(archive_path) or '.')
+    except BaseException:
+        if safe:
+            try:
+                os.unlink(target)
+            except OSError:
+                pass
+        raise
+    return {'files': done, 'bytes_in': bytes_in, 'bytes_out': bytes_out,
+            'seconds': time.monotonic() - started}
 
 class CompressionHandler:
-    def compress_file(self, filepath, archive_name):
-        with zipfile.ZipFile(archive_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(filepath)
\ No newline at end of file
+    def __init__(self, codecs=None, default_codec=('deflate', 6), rolling=True,
+                 max_archive_size=1024 * 1024 * 1024, batch_size=32, min_size=4096,
+                 workers=None, remove_originals=False):
+        """Compress organized files on a process pool.
+
+        codecs maps category -> (codec, level) with codec one of CODECS;
+        other categories use default_codec. With rolling=True files are
+        appended to <category>-NNNN.zip archives in their category folder,
+        starting a new archive past max_archive_size; otherwise every file
+        gets its own .zip beside it. Already-compressed categories and
+        formats, and files under min_size, are skipped. remove_originals
+        deletes each file once the archive holding it has been synced and
+        read back; each batch then goes into a new archive, so existing
+        archives are never rewritten.
+        """
+        if batch_size < 1:
+            raise ValueError(f"Compression batch_size must be at least 1, not {batch_size}")
+        if max_archive_size <= 0:
+            raise ValueError(f"Compression max_archive_size must be positive, not {max_archive_size}")
+        codecs = codecs or {'Documents': ('lzma', 6), 'Code': ('lzma', 6)}
+        self.codecs = {category: _codec(spec) for category, spec in codecs.items()}
+        self.default_codec = _codec(default_codec)
+        self.rolling = rolling
+        self.max_archive_size = max_archive_size
+        self.batch_size = batch_size
+        self.min_size = min_size
+        self.workers = workers
+        self.remove_originals = remove_originals
+        self._executor = None
+        # Re-entrant because a batch that finishes immediately runs its callback under the lock
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        # Keyed by (folder, category), which names that folder's rolling archives
+        self._pending = {}  # key -> [paths]
+        self._inflight = {}  # key -> Future, one batch per rolling archive at a time
+        self._outstanding = set()
+        self._archive_index = {}  # key -> number of the archive being filled
+        self.report = {}
+
+    def compress_file(self, filepath, archive_name, codec='deflate', level=6):
+        """Compress a single file into a new archive"""
+        with zipfile.ZipFile(archive_name, 'w', CODECS[codec], compresslevel=level,
+                             allowZip64=True) as zipf:
+            zipf.write(filepath, os.path.basename(filepath))
+
+    def should_compress(self, filepath, category, size=None):
+        if category in SKIP_CATEGORIES:
+            return False
+        if os.path.splitext(filepath)[1].lower() in COMPRESSED_EXTENSIONS:
+            return False
+        if size is None:
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                return False
+        return size >= self.min_size
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, filepath, category, size=None):
+        """Queue an organized file for compression, return False if it is skipped"""
+        if not self.should_compress(filepath, category, size):
+            return False
+        key = (os.path.dirname(filepath), category)
+        with self._lock:
+            batch = self._pending.setdefault(key, [])
+            batch.append(filepath)
+            if len(batch) >= self.batch_size or not self.rolling:
+                self._dispatch(key)
+        return True
+
+    def _archive_path(self, key, fresh=False):
+        """Return the current rolling archive for key, rolling over when it is full.
+
+        fresh=True starts a new archive unless the current one is still
+        missing, so a safe batch never has to copy an existing archive.
+        """
+        directory, category = key
+        index = self._archive_index.get(key)
+        if index is None:
+            prefix = f"{category}-"
+            existing = [int(name[len(prefix):-4]) for name in os.listdir(directory)
+                        if name.startswith(prefix) and name.endswith('.zip')
+                        and name[len(prefix):-4].isdigit()]
+            index = max(existing, default=1)
+        path = os.path.join(directory, f"{category}-{index:04d}.zip")
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        if size is not None and (fresh or size >= self.max_archive_size):
+            index += 1
+            path = os.path.join(directory, f"{category}-{index:04d}.zip")
+        self._archive_index[key] = index
+        return path
+
+    def _dispatch(self, key):
+        # Called with self._lock held
+        if self.rolling and key in self._inflight:
+            return
+        paths = self._pending.pop(key, [])
+        if not paths:
+            return
+        codec, level = self.codecs.get(key[1], self.default_codec)
+        executor = self._get_executor()
+        if self.rolling:
+            # Appending safely means copying the archive first, which grows
+            # quadratically as it fills; give each safe batch its own archive instead
+            jobs = [(self._archive_path(key, fresh=self.remove_originals), paths)]
+        else:
+            jobs = [(path + '.zip', [path]) for path in paths]
+        for archive, batch in jobs:
+            future = executor.submit(_compress_batch, archive, batch, codec, level,
+                                     self.remove_originals)
+            self._outstanding.add(future)
+            if self.rolling:
+                self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+
+    def _finished(self, key, future):
+        category = key[1]
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Compression batch for {category} failed: {str(e)}")
+            result = None
+        if result is not None:
+            if self.remove_originals:
+                for path in result['files']:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+            self._record(category, result)
+        with self._lock:
+            self._outstanding.discard(future)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            # Keep draining whatever queued up behind the finished batch
+            if self.rolling and len(self._pending.get(key, ())) >= self.batch_size:
+                self._dispatch(key)
+            self._idle.notify_all()
+
+    def _record(self, category, result):
+        with self._lock:
+            stats = self.report.setdefault(
+                category, {'files': 0, 'bytes_in': 0, 'bytes_out': 0, 'seconds': 0.0}
+            )
+            stats['files'] += len(result['files'])
+            stats['bytes_in'] += result['bytes_in']
+            stats['bytes_out'] += result['bytes_out']
+            stats['seconds'] += result['seconds']
+        if result['bytes_in']:
+            logging.info(f"Compressed {len(result['files'])} {category} files: "
+                         f"{result['bytes_in']} -> {result['bytes_out']} bytes "
+                         f"({result['bytes_out'] / result['bytes_in']:.0%})")
+
+    def get_report(self):
+        """Per-category compression ratio and throughput"""
+        with self._lock:
+            report = {}
+            for category, stats in self.report.items():
+                report[category] = dict(stats)
+                report[category]['ratio'] = (stats['bytes_out'] / stats['bytes_in']
+                                             if stats['bytes_in'] else 1.0)
+                report[category]['mb_per_second'] = (stats['bytes_in'] / stats['seconds'] / 1e6
+                                                     if stats['seconds'] else 0.0)
+            return report
+
+    def flush(self, wait=True):
+        """Send every queued file off for compression, optionally waiting for all batches"""
+        with self._lock:
+            while True:
+                for key in list(self._pending):
+                    self._dispatch(key)
+                if not wait or (not self._outstanding and not any(self._pending.values())):
+                    return
+                self._idle.wait()
+
+    def shutdown(self):
+        self.flush(wait=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
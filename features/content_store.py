@@ -0,0 +1,308 @@
+import os
+import errno
+import shutil
+import filecmp
+import sqlite3
+import logging
+import threading
+from core.transfer import FileTransfer, FICLONE, fcntl
+
+LINK_MODES = ('auto', 'reflink', 'hardlink')
+# Errors meaning "this filesystem (pair) cannot share data", not "something broke"
+_UNSUPPORTED = (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM, errno.EMLINK)
+
+class ContentStore:
+    BATCH_SIZE = 1000
+
+    def __init__(self, root, algorithm, link_mode='auto', transfer=None, engine=None):
+        """Keep each unique file once under its digest and link it into category folders.
+
+        Blobs live in <root>/.fileforge/objects/<algorithm>/ab/cd/<digest>.
+        A category file is a reflink of its blob where the filesystem
+        supports it (so editing it never touches other copies), otherwise a
+        hardlink, and only as a last resort an ordinary copy. link_mode
+        'reflink' or 'hardlink' allows just that one kind of link before
+        falling back to copying. Every link is recorded in a refs table so
+        gc() can tell which blobs are still in use.
+        """
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode}")
+        self.root = root
+        self.algorithm = algorithm
+        self.link_mode = link_mode
+        self.objects = os.path.join(root, ".fileforge", "objects", algorithm)
+        self.transfer = transfer or FileTransfer()
+        self.engine = engine
+        self._reflink_supported = fcntl is not None and link_mode != 'hardlink'
+        self._hardlink_allowed = link_mode != 'reflink'
+        # Striped by digest so two workers storing the same content never race
+        self._blob_locks = [threading.Lock() for _ in range(64)]
+        self._lock = threading.Lock()
+        self.db_path = os.path.join(root, ".fileforge", "objects.db")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-8192")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs (path TEXT PRIMARY KEY, digest BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_digest ON refs(digest)")
+        self._conn.commit()
+        self.counters = {'blobs_added': 0, 'links_added': 0, 'bytes_deduplicated': 0,
+                         'copy_fallbacks': 0, 'collisions': 0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+    def get_counters(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def blob_path(self, digest):
+        name = digest.hex()
+        return os.path.join(self.objects, name[:2], name[2:4], name)
+
+    def store(self, source, digest, destination, src_stat=None):
+        """Move source into the store and make destination a link to its blob.
+
+        If the blob already exists and the source matches it byte for byte,
+        the source is a duplicate: it is linked and deleted without copying
+        any data. A source that only shares the digest (a collision) is moved
+        to destination as an ordinary file. Returns a dict like
+        FileTransfer.move, with method 'reflink', 'hardlink' or 'copy'.
+
+        With a journal on the transfer, the move is journaled as source ->
+        destination by way of the blob, and the plan is made durable first:
+        the source leaves its folder before destination exists.
+        """
+        st = src_stat or os.stat(source)
+        blob = self.blob_path(digest)
+        journal = self.transfer.journal
+        entry = None
+        collision = False
+        if journal is not None:
+            entry = journal.begin(source, destination, st, via=blob)
+            journal.sync(entry)
+        try:
+            with self._blob_locks[digest[0] % len(self._blob_locks)]:
+                added = not os.path.exists(blob)
+                if not added and not filecmp.cmp(source, blob, shallow=False):
+                    # Digests such as md5 can be forced to collide; never delete on them alone
+                    logging.warning(f"{source} has the digest of {blob} but different content, "
+                                    f"moving it without deduplication")
+                    result = self.transfer.move(source, destination, src_stat=st, journaled=False)
+                    collision = True
+                elif added:
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    self.transfer.move(source, blob, digest, src_stat=st, journaled=False)
+                if not collision:
+                    try:
+                        method = self._link(blob, destination)
+                    except OSError:
+                        if added:
+                            os.replace(blob, source)  # put the file back where it was
+                        raise
+            if not added and not collision:
+                os.unlink(source)
+        except BaseException:
+            if entry is not None:
+                journal.finish(entry, 'failed')
+            raise
+        if entry is not None:
+            journal.finish(entry)
+        if collision:
+            self._count(collisions=1)
+            return {'method': result['method'], 'bytes': st.st_size, 'deduplicated': False}
+        if added:
+            self._count(blobs_added=1, links_added=1)
+        else:
+            self._count(links_added=1, bytes_deduplicated=st.st_size)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO refs (path, digest) VALUES (?, ?)",
+                               (destination, digest))
+            self._conn.commit()
+        return {'method': method, 'bytes': st.st_size, 'deduplicated': not added}
+
+    def _link(self, blob, destination):
+        dest_dir, name = os.path.split(destination)
+        temp_path = os.path.join(dest_dir, f".{name}.fileforge-tmp")
+        try:
+            method = None
+            if self._reflink_supported:
+                method = self._reflink(blob, temp_path)
+            if method is None and self._hardlink_allowed:
+                try:
+                    os.link(blob, temp_path)
+                    method = 'hardlink'
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+            if method is None:
+                shutil.copy2(blob, temp_path)
+                method = 'copy'
+                self._count(copy_fallbacks=1)
+            # Replaces the placeholder NameAllocator claimed
+            os.replace(temp_path, destination)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        return method
+
+    def _reflink(self, blob, temp_path):
+        with open(blob, 'rb') as src, open(temp_path, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                if e.errno != errno.EXDEV:
+                    self._reflink_supported = False
+                cloned = False
+            else:
+                cloned = True
+        if not cloned:
+            os.unlink(temp_path)
+            return None
+        shutil.copystat(blob, temp_path)
+        return 'reflink'
+
+    def references(self, digest):
+        """Paths recorded as links to a blob"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT path FROM refs WHERE digest = ?", (digest,))]
+
+    def blobs(self, start_after=None):
+        """Yield (digest, path) for every blob in digest order, optionally after a digest"""
+        after = start_after.hex() if start_after is not None else ""
+        for first in self._sorted_dirs(self.objects, after[:2]):
+            for second in self._sorted_dirs(os.path.join(self.objects, first), after[2:4]
+                                            if first == after[:2] else ""):
+                directory = os.path.join(self.objects, first, second)
+                try:
+                    names = sorted(os.listdir(directory))
+                except OSError:
+                    continue
+                for name in names:
+                    if name.startswith('.') or name <= after:
+                        continue
+                    try:
+                        digest = bytes.fromhex(name)
+                    except ValueError:
+                        continue
+                    yield digest, os.path.join(directory, name)
+
+    @staticmethod
+    def _sorted_dirs(path, minimum):
+        try:
+            return sorted(name for name in os.listdir(path) if name >= minimum)
+        except OSError:
+            return []
+
+    def gc(self, dry_run=False):
+        """Delete blobs no category file uses any more and forget stale refs.
+
+        Blobs and refs are both walked in digest order and merged, so memory
+        stays constant however many blobs there are. A blob with more than
+        one hardlink is in use without looking at its refs; otherwise it is
+        kept while any ref still exists with the blob's size.
+        """
+        result = {'blobs': 0, 'removed': 0, 'bytes_freed': 0, 'stale_refs': 0}
+        stale = []
+        # A second connection reads a snapshot while the first deletes stale refs
+        reader = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            refs = reader.execute("SELECT path, digest FROM refs ORDER BY digest")
+            ref = next(refs, None)
+            for digest, path in self.blobs():
+                result['blobs'] += 1
+                while ref is not None and ref[1] < digest:
+                    stale.append(ref[0])  # its blob is gone
+                    ref = next(refs, None)
+                with self._blob_locks[digest[0] % len(self._blob_locks)]:
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    live = st.st_nlink > 1
+                    while ref is not None and ref[1] == digest:
+                        if not live:
+                            try:
+                                live = os.stat(ref[0]).st_size == st.st_size
+                            except OSError:
+                                pass
+                            if not live:
+                                stale.append(ref[0])
+                        ref = next(refs, None)
+                    if not live:
+                        result['removed'] += 1
+                        result['bytes_freed'] += st.st_size
+                        if not dry_run:
+                            os.unlink(path)
+                if len(stale) >= self.BATCH_SIZE:
+                    result['stale_refs'] += self._forget(stale, dry_run)
+                    stale = []
+            while ref is not None:
+                stale.append(ref[0])
+                ref = next(refs, None)
+        finally:
+            reader.close()
+        result['stale_refs'] += self._forget(stale, dry_run)
+        logging.info(f"Content store gc: {result['removed']} of {result['blobs']} blobs unused, "
+                     f"{result['bytes_freed'] / (1024 * 1024):.1f} MiB freed, "
+                     f"{result['stale_refs']} stale refs")
+        return result
+
+    def _forget(self, paths, dry_run):
+        if paths and not dry_run:
+            with self._lock:
+                self._conn.executemany("DELETE FROM refs WHERE path = ?", [(p,) for p in paths])
+                self._conn.commit()
+        return len(paths)
+
+    def verify(self, start_after=None, limit=None):
+        """Rehash blobs and report any whose content no longer matches its name.
+
+        Blobs are hashed in batches on the HashEngine's pool. limit bounds
+        the number checked per call; pass the returned 'last' digest as
+        start_after to carry on, so a huge store can be checked a slice at a
+        time.
+        """
+        if self.engine is None:
+            from features.hashing import HashEngine
+            self.engine = HashEngine(self.algorithm)
+        result = {'checked': 0, 'corrupt': [], 'last': None}
+        batch = []
+        for digest, path in self.blobs(start_after):
+            batch.append((digest, path))
+            if len(batch) >= self.BATCH_SIZE or (limit and result['checked'] + len(batch) >= limit):
+                self._verify_batch(batch, result)
+                batch = []
+                if limit and result['checked'] >= limit:
+                    break
+        self._verify_batch(batch, result)
+        for digest, path in result['corrupt']:
+            logging.error(f"Blob {path} is corrupt, affected files: {self.references(digest)}")
+        return result
+
+    def _verify_batch(self, batch, result):
+        futures = self.engine.hash_many([path for _, path in batch])
+        for (digest, path), future in zip(batch, futures):
+            try:
+                ok = future.result() == digest
+            except OSError:
+                ok = False
+            if not ok:
+                result['corrupt'].append((digest, path))
+            result['checked'] += 1
+            result['last'] = digest
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
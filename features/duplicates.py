@@ -1,21 +1,204 @@
-import hashlib
 import os
+import logging
+import threading
+from features.hash_index import HashIndex
+from features.hashing import HashEngine, new_hasher, xxhash
+
+SAMPLE_SIZE = 16384
 
 class DuplicateHandler:
-    def __init__(self):
-        self.hash_cache = {}
-        
+    # Deployment presets: 'fast' trades cryptographic strength for speed,
+    # 'verified' uses SHA-256 and confirms every match byte-for-byte
+    PRESETS = {
+        'default': ('md5', False),
+        'fast': ('xxh3', False),
+        'verified': ('sha256', True),
+    }
+
+    def __init__(self, index_path=None, root=None, mode='default', sample_size=SAMPLE_SIZE,
+                 engine=None):
+        """Detect duplicate content using a persistent HashIndex.
+
+        Files are compared in tiers: size first, then a hash of head, middle
+        and tail samples, and the full content only when both earlier tiers
+        collide.
+
+        index_path: SQLite file for the index, or None for an in-memory index.
+        root: destination tree whose existing files count as known content;
+        it is scanned once, lazily, on the first duplicate check.
+        mode: one of PRESETS, selecting the full-content hash and verification.
+        engine: HashEngine used for full hashes; one is created if omitted.
+        """
+        algorithm, self.verify = self.PRESETS[mode]
+        self.engine = engine or HashEngine(algorithm)
+        self.algorithm = self.engine.algorithm
+        # Samples are only compared with each other, so always use the fastest hash
+        self._sample_algorithm = 'xxh3' if xxhash is not None else 'blake2b'
+        self.sample_size = sample_size
+        self.index = HashIndex(index_path or ":memory:", algorithm=self.algorithm)
+        self.root = root
+        self._warm_lock = threading.Lock()
+        self._warmed = root is None
+        self._counter_lock = threading.Lock()
+        self.counters = {
+            'files_checked': 0,
+            'unique_by_size': 0,
+            'unique_by_sample': 0,
+            'full_hashes': 0,
+            'duplicates': 0,
+            'bytes_saved_by_size': 0,
+            'bytes_saved_by_sample': 0,
+            'bytes_hashed': 0,
+        }
+
+    def _count(self, **increments):
+        with self._counter_lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+    def get_counters(self):
+        with self._counter_lock:
+            return dict(self.counters)
+
+    def get_file_digest(self, filepath):
+        return self.engine.hash_file(filepath)
+
     def get_file_hash(self, filepath):
-        hasher = hashlib.md5()
+        return self.get_file_digest(filepath).hex()
+
+    def get_sample_digest(self, filepath, size):
+        """Hash fixed-size samples from the head, middle and tail of a file"""
+        hasher = new_hasher(self._sample_algorithm)
+        hasher.update(size.to_bytes(8, 'little'))
         with open(filepath, 'rb') as f:
-            buf = f.read(65536)
-            while len(buf) > 0:
-                hasher.update(buf)
-                buf = f.read(65536)
-        return hasher.hexdigest()
-        
+            for offset in (0, (size - self.sample_size) // 2, size - self.sample_size):
+                f.seek(offset)
+                hasher.update(f.read(self.sample_size))
+        return hasher.digest()
+
+    def _ensure_warm(self):
+        if self._warmed:
+            return
+        with self._warm_lock:
+            if not self._warmed:
+                self.index.warm(self.root)
+                self._warmed = True
+
+    def _valid_candidates(self, size, exclude):
+        """Return [path, stat, sample, digest] for indexed files of this size that still exist"""
+        valid = []
+        for path, inode, cand_size, mtime_ns, sample, digest in self.index.candidates(size, exclude):
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.index.remove(path)
+                continue
+            if (st.st_ino, st.st_size, st.st_mtime_ns) != (inode, cand_size, mtime_ns):
+                if st.st_size != size:
+                    self.index.record(path, st)
+                    continue
+                sample = digest = None
+            valid.append([path, st, sample, digest])
+        return valid
+
+    def _same_content(self, path_a, path_b):
+        with open(path_a, 'rb') as a, open(path_b, 'rb') as b:
+            while True:
+                chunk_a = a.read(65536)
+                if chunk_a != b.read(65536):
+                    return False
+                if not chunk_a:
+                    return True
+
+    def find_duplicate(self, filepath, header=b"", record=None):
+        """Return the path of a known file with identical content, or None.
+
+        header: bytes already read from the start of the file, reused as the
+        first chunk of its full hash.
+        record: FileRecord for filepath; its stat is reused and its digest
+        is filled in whenever the full hash gets computed.
+        """
+        self._ensure_warm()
+        st = record if record is not None else os.stat(filepath)
+        size = st.st_size
+        cached = self.index.get(filepath, st)
+        sample, digest = cached if cached else (None, None)
+        self._count(files_checked=1)
+
+        try:
+            # Tier 1: nothing else of this size means nothing to read at all
+            candidates = self._valid_candidates(size, filepath)
+            if not candidates:
+                self._count(unique_by_size=1, bytes_saved_by_size=size)
+                return None
+
+            # Tier 2: compare sampled regions, skipped when they would cover the whole file
+            if size > 3 * self.sample_size:
+                if sample is None:
+                    sample = self.get_sample_digest(filepath, size)
+                matches = []
+                for candidate in candidates:
+                    if candidate[2] is None:
+                        try:
+                            candidate[2] = self.get_sample_digest(candidate[0], size)
+                        except OSError:
+                            continue
+                        self.index.record(candidate[0], candidate[1], candidate[3], candidate[2])
+                    if candidate[2] == sample:
+                        matches.append(candidate)
+                if not matches:
+                    self._count(unique_by_sample=1,
+                                bytes_saved_by_sample=size - 3 * self.sample_size)
+                    return None
+                candidates = matches
+
+            # Tier 3: full content hash, with every missing digest computed concurrently
+            unhashed = [candidate for candidate in candidates if candidate[3] is None]
+            own_future = self.engine.submit(filepath, header) if digest is None else None
+            futures = self.engine.hash_many([candidate[0] for candidate in unhashed])
+            if own_future is not None:
+                digest = own_future.result()
+                self._count(full_hashes=1, bytes_hashed=size - len(header))
+            for candidate, future in zip(unhashed, futures):
+                try:
+                    candidate[3] = future.result()
+                except OSError:
+                    continue
+                self._count(full_hashes=1, bytes_hashed=size)
+                self.index.record(candidate[0], candidate[1], candidate[3], candidate[2])
+
+            for path, cand_st, cand_sample, cand_digest in candidates:
+                if cand_digest is not None and cand_digest == digest and (not self.verify or self._same_content(filepath, path)):
+                    self._count(duplicates=1)
+                    return path
+            return None
+        finally:
+            # Always index the incoming file so later arrivals of the same size can compare with it
+            self.index.record(filepath, st, digest, sample)
+            if record is not None:
+                record.digest = digest
+
     def is_duplicate(self, filepath):
-        file_hash = self.get_file_hash(filepath)
-        is_dup = file_hash in self.hash_cache
-        self.hash_cache[file_hash] = filepath
-        return is_dup
\ No newline at end of file
+        duplicate_of = self.find_duplicate(filepath)
+        if duplicate_of:
+            logging.debug(f"{filepath} duplicates {duplicate_of}")
+        return duplicate_of is not None
+
+    def known_digest(self, filepath):
+        """Return the full digest already computed for an unchanged file, or None"""
+        try:
+            return self.index.get_digest(filepath, os.stat(filepath))
+        except OSError:
+            return None
+
+    def record_move(self, source, destination, st=None):
+        """Keep the index pointing at a file after it has been moved.
+
+        st describes the file at its new location; it is looked up when omitted.
+        """
+        if st is None:
+            try:
+                st = os.stat(destination)
+            except OSError:
+                st = None
+        self.index.rename(source, destination, st)
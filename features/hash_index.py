@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import logging
+import threading
+
+
+class HashIndex:
+    """On-disk index of file digests keyed by size and digest.
+
+    Rows are validated against (inode, size, mtime) so a file is only ever
+    re-hashed after it changes. Digests are filled in lazily: warming records
+    just the stat metadata of the destination tree, and the sample and full
+    digests are computed the first time another file of the same size needs
+    comparing against it.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, db_path=":memory:", algorithm="md5"):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Cap the page cache (negative = KiB) so RAM stays bounded for huge indexes
+        self._conn.execute("PRAGMA cache_size=-8192")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " inode INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " digest BLOB,"
+            " gen INTEGER NOT NULL DEFAULT 0,"
+            " sample BLOB)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if "sample" not in columns:
+            self._conn.execute("ALTER TABLE files ADD COLUMN sample BLOB")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_size_digest ON files(size, digest)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._set_algorithm(algorithm)
+        self._conn.commit()
+
+    def _set_algorithm(self, algorithm):
+        """Drop stored digests when the deployment switches hash algorithm"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'algorithm'").fetchone()
+        if row is not None and row[0] != algorithm:
+            logging.info(f"Hash algorithm changed from {row[0]} to {algorithm}, clearing digests")
+            self._conn.execute("UPDATE files SET digest = NULL, sample = NULL")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('algorithm', ?)", (algorithm,)
+        )
+
+    @staticmethod
+    def _key(st):
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def get(self, path, st):
+        """Return (sample, digest) stored for path if its stat still matches, else None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT inode, size, mtime_ns, sample, digest FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None or tuple(row[:3]) != self._key(st):
+            return None
+        return row[3], row[4]
+
+    def get_digest(self, path, st):
+        """Return the stored full digest for path if its stat still matches, else None"""
+        cached = self.get(path, st)
+        return cached[1] if cached else None
+
+    def record(self, path, st, digest=None, sample=None):
+        """Insert or refresh the row for path"""
+        inode, size, mtime_ns = self._key(st)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO files (path, inode, size, mtime_ns, digest, sample) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET inode = excluded.inode, size = excluded.size,"
+                " mtime_ns = excluded.mtime_ns, digest = excluded.digest, sample = excluded.sample",
+                (path, inode, size, mtime_ns, digest, sample)
+            )
+            self._conn.commit()
+
+    def rename(self, old_path, new_path, st=None):
+        """Carry a row over to a file's new location after a move.
+
+        Pass the new stat result when the move may have changed the inode
+        (cross-device copies) so the stored digest stays valid.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (new_path,))
+            self._conn.execute("UPDATE files SET path = ? WHERE path = ?", (new_path, old_path))
+            if st is not None:
+                self._conn.execute(
+                    "UPDATE files SET inode = ?, size = ?, mtime_ns = ? WHERE path = ?",
+                    (*self._key(st), new_path)
+                )
+            self._conn.commit()
+
+    def remove(self, path):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def candidates(self, size, exclude=None):
+        """Return (path, inode, size, mtime_ns, sample, digest) rows of the given size"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, inode, size, mtime_ns, sample, digest FROM files WHERE size = ?", (size,)
+            ).fetchall()
+        return [row for row in rows if row[0] != exclude]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def warm(self, root):
+        """Sync stat metadata for every file under root and drop vanished rows.
+
+        Unchanged rows keep their digest; changed rows have it cleared so it is
+        recomputed on demand. Hidden directories (including the index's own
+        .fileforge folder) are skipped.
+        """
+        if not os.path.isdir(root):
+            return 0
+
+        with self._lock:
+            gen = self._conn.execute("SELECT COALESCE(MAX(gen), 0) + 1 FROM files").fetchone()[0]
+
+        batch = []
+        seen = 0
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.name.startswith('.'):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                batch.append((entry.path, *self._key(st), gen))
+                        except OSError:
+                            continue
+                        if len(batch) >= self.BATCH_SIZE:
+                            seen += self._flush_warm(batch)
+                            batch = []
+            except OSError as e:
+                logging.warning(f"Could not scan {current}: {str(e)}")
+        seen += self._flush_warm(batch)
+
+        prefix = os.path.join(root, '')
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM files WHERE gen < ? AND substr(path, 1, ?) = ?",
+                (gen, len(prefix), prefix)
+            )
+            self._conn.commit()
+        logging.info(f"Hash index warmed with {seen} files from {root}")
+        return seen
+
+    def _flush_warm(self, batch):
+        if not batch:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO files (path, inode, size, mtime_ns, gen) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET"
+                " digest = CASE WHEN inode = excluded.inode AND size = excluded.size"
+                " AND mtime_ns = excluded.mtime_ns THEN digest ELSE NULL END,"
+                " sample = CASE WHEN inode = excluded.inode AND size = excluded.size"
+                " AND mtime_ns = excluded.mtime_ns THEN sample ELSE NULL END,"
+                " inode = excluded.inode, size = excluded.size,"
+                " mtime_ns = excluded.mtime_ns, gen = excluded.gen",
+                batch
+            )
+            self._conn.commit()
+        return len(batch)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+try:
+    import xxhash
+except ImportError:  # Optional, only needed for algorithm='xxh3'
+    xxhash = None
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Files at least this large are hashed through mmap instead of read buffers
+DEFAULT_MMAP_THRESHOLD = 64 * 1024 * 1024
+
+_local = threading.local()
+
+def new_hasher(algorithm):
+    """Return a fresh hash object for the named algorithm"""
+    if algorithm == 'xxh3':
+        if xxhash is not None:
+            return xxhash.xxh3_128()
+        algorithm = 'blake2b'
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.new(algorithm)
+
+def resolve_algorithm(algorithm):
+    """Return the algorithm that will actually be used, warning on fallbacks"""
+    if algorithm == 'xxh3' and xxhash is None:
+        logging.warning("xxhash is not installed, falling back to blake2b for fast hashing")
+        return 'blake2b'
+    return algorithm
+
+def _buffer(chunk_size):
+    """Return this thread's reusable read buffer, growing it if needed"""
+    buf = getattr(_local, 'buffer', None)
+    if buf is None or len(buf) < chunk_size:
+        buf = _local.buffer = bytearray(chunk_size)
+    return memoryview(buf)[:chunk_size]
+
+def hash_file(filepath, algorithm='md5', chunk_size=DEFAULT_CHUNK_SIZE,
+              mmap_threshold=DEFAULT_MMAP_THRESHOLD, prefix=b""):
+    """Return the binary digest of a file's content.
+
+    prefix holds bytes already read from the start of the file (e.g. a
+    sniffed header) so they are not read again. Large files are mapped into
+    memory; everything else streams through a per-thread buffer with
+    readinto, so no new bytes objects are allocated per chunk. This is a
+    module-level function so process pools can pickle it.
+    """
+    hasher = new_hasher(algorithm)
+    with open(filepath, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if prefix:
+            hasher.update(prefix)
+            f.seek(len(prefix))
+        if size >= mmap_threshold and size > len(prefix):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for offset in range(len(prefix), size, chunk_size):
+                        hasher.update(view[offset:offset + chunk_size])
+                finally:
+                    view.release()
+        else:
+            buf = _buffer(chunk_size)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                hasher.update(buf[:n])
+    return hasher.digest()
+
+class HashEngine:
+    def __init__(self, algorithm='md5', workers=None, mode='thread',
+                 chunk_size=DEFAULT_CHUNK_SIZE, mmap_threshold=DEFAULT_MMAP_THRESHOLD):
+        """Hash files concurrently on a thread or process pool.
+
+        hashlib releases the GIL while digesting, so the default thread mode
+        already hashes several files at once; mode='process' suits hashes that
+        hold the GIL or very CPU-heavy algorithms. Pools start on first use.
+        """
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown hashing mode: {mode}")
+        self.algorithm = resolve_algorithm(algorithm)
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.mmap_threshold = mmap_threshold
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="hasher"
+                        )
+        return self._executor
+
+    def hash_file(self, filepath, prefix=b""):
+        """Hash one file in the calling thread"""
+        return hash_file(filepath, self.algorithm, self.chunk_size, self.mmap_threshold, prefix)
+
+    def submit(self, filepath, prefix=b""):
+        """Queue one file and return a Future resolving to its digest"""
+        return self._get_executor().submit(
+            hash_file, filepath, self.algorithm, self.chunk_size, self.mmap_threshold, prefix
+        )
+
+    def hash_many(self, paths):
+        """Queue every path at once and return their Futures in the same order"""
+        return [self.submit(path) for path in paths]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds, roughly x2.5 apart from 100us to 5 minutes
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + inner + "}"
+
+class Counter:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket that contains it"""
+        counts, _, count = self.snapshot()
+        if not count:
+            return 0.0
+        target = q * count
+        seen = 0
+        for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+            seen += bucket
+            if seen >= target:
+                return bound
+        return float('inf')
+
+class Metrics:
+    def __init__(self):
+        """Registry of counters, per-stage latency histograms and lazily read gauges.
+
+        Hot-path updates are a lock acquire and an add (a bisect for
+        histograms); gauges and collectors are only evaluated on export.
+        """
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels tuple) -> (help, Counter)
+        self._histograms = {}
+        self._gauges = {}  # (name, labels tuple) -> (help, callable)
+        self._collectors = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def counter(self, name, help_text="", labels=None):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._counters:
+                self._counters[key] = (help_text, Counter())
+            return self._counters[key][1]
+
+    def histogram(self, name, help_text="", labels=None, bounds=DEFAULT_BUCKETS):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = (help_text, Histogram(bounds))
+            return self._histograms[key][1]
+
+    def gauge(self, name, read, help_text="", labels=None):
+        """Register a gauge whose value is read by calling read() at export time"""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = (help_text, read)
+
+    def add_collector(self, collect):
+        """Register collect() -> iterable of (name, type, help, labels, value) samples"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def _samples(self):
+        """Yield (name, type, help, labels, value) for every counter, gauge and collector"""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            collectors = list(self._collectors)
+        for (name, labels), (help_text, counter) in counters:
+            yield name, 'counter', help_text, dict(labels), counter.value
+        for (name, labels), (help_text, read) in gauges:
+            try:
+                value = read()
+            except Exception as e:
+                logging.debug(f"Gauge {name} failed: {str(e)}")
+                continue
+            yield name, 'gauge', help_text, dict(labels), value
+        for collect in collectors:
+            yield from collect()
+
+    def render_prometheus(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        described = set()
+
+        def describe(name, kind, help_text):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for name, kind, help_text, labels, value in self._samples():
+            describe(name, kind, help_text)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        with self._lock:
+            histograms = list(self._histograms.items())
+        for (name, labels), (help_text, histogram) in histograms:
+            describe(name, 'histogram', help_text)
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket in zip(histogram.bounds + ('+Inf',), counts):
+                cumulative += bucket
+                bucket_labels = dict(labels, le=bound)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(dict(labels))} {total}")
+            lines.append(f"{name}_count{_format_labels(dict(labels))} {count}")
+        lines.append(f"fileforge_uptime_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Return a JSON-serialisable view including p50/p99 per histogram"""
+        data = {'timestamp': time.time(), 'uptime_seconds': time.time() - self.started,
+                'metrics': [], 'latency': {}}
+        for name, kind, _, labels, value in self._samples():
+            data['metrics'].append({'name': name, 'type': kind, 'labels': labels, 'value': value})
+        with self._lock:
+            histograms = list(self._histograms.items())
+        for (name, labels), (_, histogram) in histograms:
+            _, total, count = histogram.snapshot()
+            label = ",".join(f"{k}={v}" for k, v in labels) or name
+            data['latency'][label] = {
+                'count': count,
+                'mean': total / count if count else 0.0,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+            }
+        return data
+
+class MetricsServer:
+    def __init__(self, metrics, host='127.0.0.1', port=9464, routes=None, actions=None):
+        """Serve /metrics (Prometheus text) and /metrics.json on a local port.
+
+        routes maps extra GET paths, and actions extra POST paths, to
+        route(query_dict) callables whose return value is sent back as JSON.
+        Anything that changes state belongs in actions: POSTs carrying a
+        browser Origin header are refused, so a web page cannot trigger them.
+        """
+        self.metrics = metrics
+        self.routes = routes or {}
+        self.actions = actions or {}
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        # Imported here so the organizer does not pay for http.server unless the exporter runs
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import urlsplit, parse_qsl
+        metrics = self.metrics
+        routes = self.routes
+        actions = self.actions
+
+        class Handler(BaseHTTPRequestHandler):
+            def _call(self, route, url):
+                try:
+                    result = route(dict(parse_qsl(url.query)))
+                except Exception as e:
+                    self.send_error(400, str(e))
+                    return
+                self._send(json.dumps(result).encode(), 'application/json')
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                if url.path not in actions:
+                    self.send_error(404)
+                elif self.headers.get('Origin') is not None:
+                    self.send_error(403, "Cross-origin requests are not allowed")
+                else:
+                    self._call(actions[url.path], url)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == '/metrics':
+                    body = metrics.render_prometheus().encode()
+                    content_type = 'text/plain; version=0.0.4'
+                elif url.path == '/metrics.json':
+                    body = json.dumps(metrics.snapshot()).encode()
+                    content_type = 'application/json'
+                elif url.path in routes:
+                    self._call(routes[url.path], url)
+                    return
+                else:
+                    self.send_error(404)
+                    return
+                self._send(body, content_type)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http",
+                                        daemon=True)
+        self._thread.start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class SnapshotWriter:
+    def __init__(self, metrics, path, interval=60):
+        """Periodically write metrics.snapshot() to a JSON file, replacing it atomically"""
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.metrics.snapshot(), f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logging.warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.write()
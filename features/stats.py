@@ -1,18 +1,35 @@
+import threading
+
 class StatsManager:
     def __init__(self):
         self.files_processed = 0
         self.size_processed = 0
         self.category_counts = {}
+        # Worker threads update stats concurrently
+        self._lock = threading.Lock()
 
     def update_stats(self, file_info):
-        self.files_processed += 1
-        self.size_processed += file_info['size']
-        category = file_info['category']
-        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        with self._lock:
+            self.files_processed += 1
+            self.size_processed += file_info['size']
+            category = file_info['category']
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
 
     def get_stats(self):
-        return {
-            'files_processed': self.files_processed,
-            'size_processed': self.size_processed,
-            'category_counts': self.category_counts
-        }
\ No newline at end of file
+        with self._lock:
+            return {
+                'files_processed': self.files_processed,
+                'size_processed': self.size_processed,
+                'category_counts': dict(self.category_counts)
+            }
+
+    def collect(self):
+        """Metrics samples for features.metrics.Metrics.add_collector"""
+        stats = self.get_stats()
+        yield ('fileforge_files_moved_total', 'counter', "Files organized",
+               {}, stats['files_processed'])
+        yield ('fileforge_bytes_moved_total', 'counter', "Bytes organized",
+               {}, stats['size_processed'])
+        for category, count in stats['category_counts'].items():
+            yield ('fileforge_category_files_total', 'counter', "Files organized per category",
+                   {'category': category}, count)
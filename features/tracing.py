@@ -0,0 +1,163 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+class Span:
+    """One timed stage; set outcome (and size, if only known later) before it closes"""
+
+    __slots__ = ('tracer', 'name', 'size', 'outcome', 'start', 'duration', 'thread', 'profiler')
+
+    def __init__(self, tracer, name, size=None, profile=False):
+        self.tracer = tracer
+        self.name = name
+        self.size = size
+        self.outcome = None
+        self.start = 0.0
+        self.duration = 0.0
+        self.thread = threading.get_ident()
+        self.profiler = None
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+
+    def __enter__(self):
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError:  # another profiler already owns this thread
+                self.profiler = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+        if exc_type is not None and self.outcome is None:
+            self.outcome = 'error'
+        self.tracer._finish(self)
+        return False
+
+class _NullSpan:
+    """Returned while tracing is off so instrumented code needs no branches"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Tracer:
+    def __init__(self, capacity=10000):
+        """Collect spans around pipeline stages when enabled.
+
+        Disabled, span() is one attribute check returning NULL_SPAN. Enabled,
+        finished spans go to a bounded ring buffer and to every hook added
+        with add_hook(). profile() additionally runs cProfile inside the
+        outermost per-file spans for a time window and merges the results.
+        """
+        self.enabled = False
+        self.spans = deque(maxlen=capacity)
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._stats = None
+        self._profiling = False
+        self._timer = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add_hook(self, hook):
+        """hook(span) is called for every finished span, on the thread that ran it"""
+        self._hooks.append(hook)
+
+    def span(self, name, size=None, root=False):
+        """Time a stage; root marks the outermost span for one file, where profiling attaches"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, size, profile=root and self._profiling)
+
+    def _finish(self, span):
+        self.spans.append(span)
+        for hook in self._hooks:
+            try:
+                hook(span)
+            except Exception as e:
+                logging.debug(f"Trace hook failed: {str(e)}")
+        if span.profiler is not None:
+            import pstats
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(span.profiler)
+                else:
+                    self._stats.add(span.profiler)
+
+    def summary(self):
+        """Per-stage count, total seconds, bytes and outcomes over the buffered spans"""
+        stages = {}
+        for span in list(self.spans):
+            stage = stages.setdefault(span.name, {'count': 0, 'seconds': 0.0, 'bytes': 0,
+                                                  'outcomes': {}})
+            stage['count'] += 1
+            stage['seconds'] += span.duration
+            stage['bytes'] += span.size or 0
+            if span.outcome is not None:
+                stage['outcomes'][span.outcome] = stage['outcomes'].get(span.outcome, 0) + 1
+        return stages
+
+    def dump_trace(self, path):
+        """Write buffered spans as Chrome trace events (chrome://tracing, Perfetto, speedscope)"""
+        events = []
+        for span in list(self.spans):
+            events.append({
+                'name': span.name, 'ph': 'X', 'pid': 0, 'tid': span.thread,
+                'ts': span.start * 1e6, 'dur': span.duration * 1e6,
+                'args': {'size': span.size, 'outcome': span.outcome},
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events}, f)
+        return len(events)
+
+    def profile(self, seconds, path):
+        """Enable tracing and cProfile for seconds, then write pstats data to path"""
+        with self._lock:
+            if self._profiling:
+                return False
+            self._profiling = True
+            self._stats = None
+            self._was_enabled = self.enabled
+        self.enabled = True
+        self._timer = threading.Timer(seconds, self.stop_profile, args=(path,))
+        self._timer.daemon = True
+        self._timer.start()
+        logging.info(f"Profiling for {seconds}s, writing {path}")
+        return True
+
+    def stop_profile(self, path):
+        """End the profiling window early or on schedule and write the merged profile"""
+        with self._lock:
+            if not self._profiling:
+                return False
+            self._profiling = False
+            stats, self._stats = self._stats, None
+            self.enabled = self._was_enabled
+        if self._timer is not None:
+            self._timer.cancel()
+        if stats is None:
+            logging.info("Profiling window ended with no files processed")
+            return False
+        stats.dump_stats(path)
+        logging.info(f"Wrote profile to {path}")
+        return True
@@ -2,9 +2,14 @@ import os
 import sys
 import logging
 import time
-import winreg
+LAUNCHED_AT = time.perf_counter()  # before the heavier imports below, for startup timing
+try:
+    import winreg
+except ImportError:  # Startup registration is Windows-only
+    winreg = None
 from watchdog.observers import Observer
 from core.FileOrganiser import FileOrganizer
+from core import inotify
 from config.settings import Config
 
 def remove_all_startup_entries():
@@ -33,17 +38,6 @@ def remove_all_startup_entries():
         logging.error(f"Error cleaning startup entries: {str(e)}")
         return False
 
-def kill_existing_instances():
-    """Kill any existing Python processes running the script"""
-    try:
-        # Try to kill pythonw.exe first
-        os.system('taskkill /F /IM pythonw.exe 2>nul')
-        # Then try python.exe
-        os.system('taskkill /F /IM python.exe 2>nul')
-        time.sleep(1)
-    except Exception as e:
-        logging.warning(f"Process not found (this is normal if not running): {e}")
-
 def add_to_startup(file_path):
     """Add the script to Windows startup"""
     try:
@@ -95,6 +89,132 @@ def remove_from_startup():
         logging.error(f"Failed to remove from startup: {str(e)}")
         return False
 
+def acquire_trees(coordinator, directories):
+    """Lease each monitored directory, skipping those another organizer already handles"""
+    from core.coordination import tree_key
+    acquired = []
+    for directory in directories:
+        if not os.path.exists(directory):
+            continue
+        if coordinator.acquire(tree_key(directory)):
+            acquired.append(directory)
+        else:
+            holder = coordinator.holder(tree_key(directory))
+            logging.warning(f"{directory} is already organized by process {holder['pid']} "
+                            f"on {holder['host']}, skipping it")
+    return acquired
+
+def run_organizer(config, directories, shard=None, stop_event=None):
+    """Organize new files in directories until interrupted or stop_event is set"""
+    coordinator = None
+    if shard is not None:
+        # Only shards share files, and coordination loads sqlite3
+        from core.coordination import Coordinator
+        coordinator = Coordinator()
+    organizer = FileOrganizer(
+        source_dirs=directories,
+        dest_dir=config.destination_dir,
+        file_types=config.file_types,
+        classifier=config.classifier,
+        rules=config.rules,
+        config=config.organizer_config,
+        launched_at=LAUNCHED_AT,
+        shard=shard,
+        coordinator=coordinator
+    )
+    if shard is not None:
+        # Each shard serves and snapshots its own metrics; None leaves them disabled
+        index = shard[0]
+        if organizer.config['metrics_port'] is not None:
+            organizer.config['metrics_port'] += index
+        if organizer.config['metrics_snapshot']:
+            organizer.config['metrics_snapshot'] = organizer.config['metrics_snapshot'].replace(
+                "metrics.json", f"metrics-{index}.json")
+
+    # Settle moves a crash interrupted before new files start arriving
+    organizer.recover_moves()
+
+    # Start monitoring; one observer covers every directory, and on Linux the
+    # native inotify backend reports only files whose writer has closed them
+    observer = inotify.InotifyObserver() if inotify.is_supported() else Observer()
+    for directory in directories:
+        observer.schedule(organizer, directory, recursive=False)
+        logging.info(f"Started monitoring: {directory}")
+    observer.start()
+    logging.info(f"Watching for new files {(time.perf_counter() - LAUNCHED_AT) * 1000:.1f} ms after launch")
+    organizer.start_metrics()
+    organizer.start_reconciler()
+
+    try:
+        while stop_event is None or not stop_event.is_set():
+            time.sleep(1)
+            if config.reload_if_changed():
+                organizer.update_file_types(config.file_types)
+                logging.info("Reloaded file types and routing rules")
+    except KeyboardInterrupt:
+        pass
+    observer.stop()
+    logging.info("Stopping File Forge...")
+    observer.join()
+    organizer.stop()
+    if coordinator is not None:
+        coordinator.close()
+
+def _run_shard(index, shards, directories, stop_event):
+    """Entry point of one shard process started by --shards"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - [shard {index}] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    run_organizer(Config(), directories, shard=(index, shards), stop_event=stop_event)
+
+def run_sharded(directories, shards):
+    """Split the monitored trees across shard processes by a hash of each file path"""
+    import multiprocessing
+    stop_event = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=_run_shard, args=(index, shards, directories, stop_event),
+                                name=f"fileforge-shard-{index}")
+        for index in range(shards)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        for process in processes:
+            process.join()
+
+def maintain_store(config, directories, action):
+    """--gc removes unused content store blobs, --verify rehashes them"""
+    organizer = FileOrganizer(
+        source_dirs=directories,
+        dest_dir=config.destination_dir,
+        file_types=config.file_types,
+        classifier=config.classifier,
+        rules=config.rules,
+        config=config.organizer_config,
+        launched_at=LAUNCHED_AT
+    )
+    store = organizer.content_store
+    if action == "--gc":
+        store.gc(dry_run="--dry-run" in sys.argv)
+    else:
+        result = store.verify()
+        logging.info(f"Verified {result['checked']} blobs, {len(result['corrupt'])} corrupt")
+    organizer.stop()
+
+def locate(config, path):
+    """--where PATH prints where File Forge moved the file originally at PATH"""
+    from core.journal import MoveJournal
+    journal = MoveJournal(os.path.join(config.destination_dir, ".fileforge", "journal.db"))
+    destination = journal.locate(os.path.abspath(os.path.expanduser(path)))
+    journal.close()
+    print(destination or f"No recorded move of {path}")
+
 def main():
     logging.basicConfig(
         level=logging.INFO,
@@ -103,41 +223,60 @@ def main():
     )
     
     # Handle command line arguments but continue execution
+    backfill = len(sys.argv) > 1 and sys.argv[1] == "--backfill"
+    maintenance = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in ("--gc", "--verify") else None
     if len(sys.argv) > 1:
         if sys.argv[1] == "--add-startup":
             add_to_startup(__file__)
         elif sys.argv[1] == "--remove-startup":
             remove_all_startup_entries()
             return
+    shards = int(sys.argv[sys.argv.index("--shards") + 1]) if "--shards" in sys.argv else 0
     
     # Continue with normal execution
     config = Config()
-    organizer = FileOrganizer(
-        source_dirs=config.monitored_dirs,
-        dest_dir=config.destination_dir,
-        file_types=config.file_types
-    )
-    
-    # Start monitoring
-    observers = []
-    for directory in config.monitored_dirs:
-        if os.path.exists(directory):
-            observer = Observer()
-            observer.schedule(organizer, directory, recursive=False)
-            observer.start()
-            observers.append(observer)
-            logging.info(f"Started monitoring: {directory}")
+    if "--where" in sys.argv:
+        locate(config, sys.argv[sys.argv.index("--where") + 1])
+        return
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        for observer in observers:
-            observer.stop()
-        logging.info("Stopping File Forge...")
+    # One organizer per monitored tree: lease each directory instead of killing other processes
+    from core.coordination import Coordinator
+    coordinator = Coordinator()
+    directories = acquire_trees(coordinator, config.monitored_dirs)
+    if not directories:
+        logging.error("Every monitored directory is already being organized, exiting")
+        coordinator.close()
+        return
+    coordinator.start()
 
-    for observer in observers:
-        observer.join()
+    try:
+        # One-shot sweep of files that were already there: --backfill [--recursive]
+        if backfill:
+            from core.backfill import BackfillScanner
+            organizer = FileOrganizer(
+                source_dirs=directories,
+                dest_dir=config.destination_dir,
+                file_types=config.file_types,
+                classifier=config.classifier,
+                rules=config.rules,
+                config=config.organizer_config,
+                launched_at=LAUNCHED_AT
+            )
+            organizer.journal.recover()  # rolled back files are still in place for the scan
+            scanner = BackfillScanner(organizer, recursive="--recursive" in sys.argv)
+            try:
+                scanner.run(directories)
+            except KeyboardInterrupt:
+                logging.info("Backfill interrupted, rerun --backfill to resume")
+            organizer.stop()
+        elif maintenance:
+            maintain_store(config, directories, maintenance)
+        elif shards > 1:
+            run_sharded(directories, shards)
+        else:
+            run_organizer(config, directories)
+    finally:
+        coordinator.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -67,7 +67,7 @@ class TestFileOrganizer:
             self.test_dest,
             file_types=file_types
         )
-        self.organizer.batch_interval = 0
+        self.organizer.coalescer.quiet_period = 0.1
 
         yield
 
@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.FileOrganiser import FileOrganizer
+from core.backfill import BackfillScanner
+from core.record import FileRecord
+
+
+def test_backfill_sweeps_existing_files_and_resumes(tmp_path):
+    source = tmp_path / "Downloads"
+    dest = tmp_path / "Organized"
+    (source / "nested").mkdir(parents=True)
+    for name in ["a.pdf", "b.jpg", "c.pdf", "partial.crdownload"]:
+        (source / name).write_text(name)
+    (source / "nested" / "d.mp3").write_text("d")
+
+    organizer = FileOrganizer([str(source)], str(dest), file_types={
+        "Documents": [".pdf"], "Images": [".jpg"], "Audio": [".mp3"],
+    })
+    checkpoint = tmp_path / "backfill.checkpoint"
+    # A previous run already handled c.pdf (e.g. left in place as a duplicate)
+    checkpoint.write_text(f"F\t{source / 'c.pdf'}\n")
+
+    scanner = BackfillScanner(organizer, checkpoint_path=str(checkpoint), recursive=True)
+    summary = scanner.run([str(source)])
+    organizer.stop()
+
+    assert summary["files_moved"] == 3
+    assert sorted(os.listdir(dest / "Documents")) == ["a.pdf"]
+    assert os.path.exists(dest / "Images" / "b.jpg")
+    assert os.path.exists(dest / "Audio" / "d.mp3")
+    assert os.path.exists(source / "c.pdf")
+    assert os.path.exists(source / "partial.crdownload")
+    assert not checkpoint.exists()
+
+
+def test_resume_descends_into_finished_directories(tmp_path):
+    source = tmp_path / "Downloads"
+    (source / "sub").mkdir(parents=True)
+    (source / "a.pdf").write_text("a")
+    (source / "sub" / "b.pdf").write_text("b")
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Documents": [".pdf"],
+    })
+    checkpoint = tmp_path / "backfill.checkpoint"
+    # The previous run finished the top level's own files before it was interrupted
+    checkpoint.write_text(f"D\t{source}\n")
+
+    summary = BackfillScanner(organizer, checkpoint_path=str(checkpoint), recursive=True).run([str(source)])
+    organizer.stop()
+
+    assert summary["files_moved"] == 1
+    assert os.path.exists(tmp_path / "Organized" / "Documents" / "b.pdf")
+    assert os.path.exists(source / "a.pdf")
+
+
+def test_failed_file_is_not_checkpointed(tmp_path, monkeypatch):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    (source / "a.pdf").write_text("a")
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Documents": [".pdf"],
+    })
+    checkpoint = tmp_path / "backfill.checkpoint"
+    scanner = BackfillScanner(organizer, checkpoint_path=str(checkpoint))
+    scanner._checkpoint = open(checkpoint, 'a', encoding='utf-8')
+    scanner._dirs[str(source)] = [1, True, False]
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(organizer.transfer, "move", fail)
+    scanner._handle((str(source), FileRecord.from_path(str(source / "a.pdf"))))
+    scanner._checkpoint.close()
+    organizer.stop()
+
+    # Neither the file nor its directory is recorded, so a resumed run retries both
+    assert checkpoint.read_text() == ""
+    assert organizer.errors.value == 1
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench import run_scenario, SCENARIOS
+
+
+def test_scenarios_are_reproducible():
+    import random
+    for name, build in SCENARIOS.items():
+        assert build(random.Random(7), 0.01) == build(random.Random(7), 0.01)
+
+
+def test_direct_run_reports_throughput_and_latency():
+    result = run_scenario('collisions', 'direct', scale=0.02, seed=1, quiet_period=0.1, timeout=30)
+    assert result['files'] == result['moved'] == 20
+    assert result['moves_per_second'] > 0
+    assert 0 < result['latency_p50'] <= result['latency_p99']
+
+
+def test_watchdog_run_organizes_every_file():
+    result = run_scenario('duplicates', 'watchdog', scale=0.04, seed=1, quiet_period=0.1, timeout=30)
+    assert result['moved'] == result['files'] == 20
+    assert result['duplicates'] == 10
+    assert result['events'] >= result['files']
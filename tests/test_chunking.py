@@ -0,0 +1,128 @@
+import os
+import sys
+import random
+import itertools
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import chunking
+from features.chunking import Chunker, ChunkIndex, GEAR
+from core.FileOrganiser import FileOrganizer
+
+
+def _random_bytes(size, seed=1):
+    return random.Random(seed).randbytes(size)
+
+
+def _boundaries(lengths):
+    return set(itertools.accumulate(lengths))
+
+
+def test_hashes_match_a_plain_gear_loop():
+    chunker = Chunker()
+    data = _random_bytes(300000)
+    expected_loose = []
+    h = 0
+    for i, byte in enumerate(data):
+        h = ((h << 1) + GEAR[byte]) & 0xFFFF
+        if not h & chunker.mask_l:
+            expected_loose.append(i)
+    assert chunker._candidates(data)[1] == expected_loose
+
+
+def test_numpy_and_integer_lanes_agree():
+    pytest.importorskip("numpy")
+    data = _random_bytes(500000)
+    vectorized = Chunker().cuts(data)
+    lanes = Chunker()
+    lanes._gear = None
+    assert lanes.cuts(data) == vectorized
+
+
+def test_chunk_sizes_stay_in_bounds():
+    chunker = Chunker()
+    lengths = chunker.cuts(_random_bytes(2 * 1024 * 1024))
+    assert sum(lengths) == 2 * 1024 * 1024
+    assert all(chunker.min_size <= n <= chunker.max_size for n in lengths[:-1])
+    # Long runs of identical bytes never hit a boundary, so max_size caps them
+    assert set(chunker.cuts(bytes(600000))[:-1]) == {chunker.max_size}
+
+
+def test_boundaries_survive_an_insertion():
+    chunker = Chunker()
+    data = _random_bytes(1024 * 1024)
+    edited = data[:5000] + b"a few new bytes" + data[5000:]
+    before = _boundaries(chunker.cuts(data))
+    after = {b - 15 for b in _boundaries(chunker.cuts(edited))}
+    assert len(before & after) >= len(before) - 1
+
+
+def test_streaming_matches_whole_buffer(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunking, "READ_SIZE", 100000)
+    data = _random_bytes(700000)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    chunker = Chunker()
+    assert [length for _, length in chunker.chunk_file(str(path))] == chunker.cuts(data)
+
+
+def test_index_reports_similar_files(tmp_path):
+    chunker = Chunker()
+    index = ChunkIndex()
+    base = _random_bytes(1024 * 1024)
+    original = tmp_path / "report-v1.bin"
+    unrelated = tmp_path / "other.bin"
+    original.write_bytes(base)
+    unrelated.write_bytes(_random_bytes(1024 * 1024, seed=2))
+    for path in (original, unrelated):
+        index.add(str(path), path.stat().st_size, chunker.chunk_file(str(path)))
+
+    revised = tmp_path / "report-v2.bin"
+    revised.write_bytes(base[:400000] + b"revised paragraph" + base[400000:])
+    matches = index.similar(chunker.chunk_file(str(revised)), revised.stat().st_size, 0.5)
+    assert [path for path, _ in matches] == [str(original)]
+    assert matches[0][1] > 0.9
+
+    original.unlink()
+    assert index.similar(chunker.chunk_file(str(revised)), revised.stat().st_size, 0.5) == []
+    index.close()
+
+
+def test_organizer_groups_near_duplicates(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Archives": [".zip"], "Documents": [".pdf"]})
+    organizer.config.update({'near_duplicates': True, 'near_duplicate_action': 'group',
+                             'near_duplicate_min_size': 0})
+    organizer.start_time = 0
+    base = _random_bytes(512 * 1024)
+    (source / "build.zip").write_bytes(base)
+    first = organizer.process_file(str(source / "build.zip"))
+    # Same content under a different category's extension still lands beside the first copy
+    (source / "build (1).pdf").write_bytes(base[:1000] + b"x" + base[1000:])
+    second = organizer.process_file(str(source / "build (1).pdf"))
+
+    assert os.path.dirname(second) == os.path.dirname(first)
+    assert organizer.chunk_index.get_counters()['near_duplicates'] == 1
+    organizer.stop()
+
+
+def test_index_follows_files_the_organizer_moves(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Archives": [".zip"]})
+    organizer.config.update({'near_duplicates': True, 'near_duplicate_min_size': 10 ** 9})
+    organizer.start_time = 0
+    path = source / "build.zip"
+    path.write_bytes(_random_bytes(256 * 1024))
+    # Indexed where it was organized before, e.g. in a watched category folder
+    organizer.chunk_index.add(str(path), path.stat().st_size, Chunker().chunk_file(str(path)))
+
+    dest = organizer.process_file(str(path))
+    chunks = Chunker().chunk_file(dest)
+    assert organizer.chunk_index.similar(chunks, os.path.getsize(dest), 0.9) == [(dest, 1.0)]
+    organizer.stop()
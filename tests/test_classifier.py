@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.classifier import ExtensionClassifier
+from config.settings import Config
+from core.FileOrganiser import FileOrganizer
+
+
+FILE_TYPES = {
+    "Documents": [".pdf", ".HTML"],
+    "Archives": [".zip", ".gz", ".tar.gz", ".tar.zst"],
+    "Code": [".js", ".html", ".user.js"],
+}
+
+
+def test_multi_part_extensions_match_longest_first():
+    classifier = ExtensionClassifier(FILE_TYPES)
+    assert classifier.classify("backup.tar.gz") == "Archives"
+    assert classifier.classify("backup.tar.zst") == "Archives"
+    assert classifier.classify("logs.gz") == "Archives"
+    assert classifier.classify("/tmp/greasemonkey.user.js") == "Code"
+    assert classifier.classify("app.min.js") == "Code"
+
+
+def test_conflicts_resolve_to_first_category():
+    classifier = ExtensionClassifier(FILE_TYPES)
+    assert classifier.classify("index.html") == "Documents"
+    assert classifier.classify("INDEX.HTML") == "Documents"
+
+
+def test_unknown_and_hidden_files_fall_back():
+    classifier = ExtensionClassifier(FILE_TYPES)
+    assert classifier.classify("no_extension") == "Others"
+    assert classifier.classify(".gz") == "Others"
+    assert classifier.classify("file.xyz") == "Others"
+
+
+def test_classify_many_and_reload():
+    classifier = ExtensionClassifier(FILE_TYPES)
+    assert classifier.classify_many(["a.pdf", "b.zip", "c"]) == ["Documents", "Archives", "Others"]
+    classifier.load({"Books": {"Ebooks": [".epub"], "Comics": [".cbz"]}})
+    assert classifier.classify_many(["a.pdf", "b.epub", "c.cbz"]) == ["Others", "Books", "Books"]
+
+
+def test_config_shares_classifier():
+    config = Config()
+    assert config.get_category("release.tar.gz") == "Archives"
+    assert config.get_category("page.html") == "Documents"
+    assert config.reload_if_changed() is False
+
+
+def test_invalid_file_types_keep_the_previous_mapping(tmp_path):
+    config = Config()
+    config.cache_dir = str(tmp_path)
+    config.config_path = str(tmp_path / "file_types.json")
+    with open(config.config_path, "w") as f:
+        f.write('{"Documents": [".pdf"],')  # truncated mid-edit
+    assert config.reload_if_changed() is False
+    assert config.get_category("release.tar.gz") == "Archives"
+
+
+def test_organizer_picks_up_new_file_types(tmp_path):
+    organizer = FileOrganizer([str(tmp_path)], str(tmp_path / "Organized"), file_types=FILE_TYPES)
+    assert organizer._get_category("book.epub") == "Others"
+    organizer.update_file_types({"Books": [".epub"]})
+    assert organizer._get_category("book.epub") == "Books"
+    assert organizer.file_types == {"Books": [".epub"]}
+    organizer.stop()
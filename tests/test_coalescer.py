@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.coalescer import EventCoalescer
+
+
+def test_burst_of_events_dispatches_once(tmp_path):
+    path = str(tmp_path / "movie.mkv")
+    dispatched = []
+    coalescer = EventCoalescer(lambda path, st: dispatched.append(path), quiet_period=0.2)
+    coalescer._running = True  # drive poll() by hand instead of the background thread
+
+    with open(path, "wb") as f:
+        for _ in range(5):
+            f.write(b"x" * 1024)
+            f.flush()
+            coalescer.add(path)
+    assert coalescer.poll() == 0
+
+    # A write that produced no event is still caught by the fresh mtime
+    time.sleep(0.25)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    coalescer.poll()
+    assert dispatched == []
+
+    # Size and mtime held steady across a full quiet period
+    time.sleep(0.25)
+    coalescer.poll()
+    assert dispatched == [path]
+    assert coalescer.events_coalesced == 4
+    assert coalescer.pending_count() == 0
+
+
+def test_vanished_files_are_dropped(tmp_path):
+    path = str(tmp_path / "gone.txt")
+    dispatched = []
+    coalescer = EventCoalescer(lambda path, st: dispatched.append(path), quiet_period=0)
+    coalescer._running = True
+    coalescer.add(path)
+    assert coalescer.poll() == 0
+    assert coalescer.pending_count() == 0
@@ -0,0 +1,91 @@
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.compression import CompressionHandler
+from core.FileOrganiser import FileOrganizer
+
+
+def test_rolling_archive_skips_compressed_formats(tmp_path):
+    docs = tmp_path / "Documents"
+    docs.mkdir()
+    texts = []
+    for i in range(3):
+        path = docs / f"notes_{i}.txt"
+        path.write_text("all work and no play " * 1000)
+        texts.append(str(path))
+    photo = tmp_path / "Images" / "photo.jpg"
+    photo.parent.mkdir()
+    photo.write_bytes(os.urandom(8192))
+
+    handler = CompressionHandler(batch_size=2, workers=2, remove_originals=True)
+    assert not handler.submit(str(photo), "Images")
+    assert not handler.submit(str(docs / "missing.pdf"), "Documents")
+    for path in texts:
+        assert handler.submit(path, "Documents")
+    handler.shutdown()
+
+    # Removing originals writes every batch to a new archive instead of copying the last one
+    names = []
+    for archive in ("Documents-0001.zip", "Documents-0002.zip"):
+        with zipfile.ZipFile(docs / archive) as zf:
+            names += zf.namelist()
+            assert all(info.compress_type == zipfile.ZIP_LZMA for info in zf.infolist())
+    assert sorted(names) == ["notes_0.txt", "notes_1.txt", "notes_2.txt"]
+    assert not any(os.path.exists(path) for path in texts)
+    assert sorted(os.listdir(docs)) == ["Documents-0001.zip", "Documents-0002.zip"]  # no temporary copy left behind
+    assert photo.exists()
+
+    report = handler.get_report()["Documents"]
+    assert report["files"] == 3
+    assert report["ratio"] < 0.1
+
+
+def test_per_file_archives_roll_nothing(tmp_path):
+    path = tmp_path / "script.py"
+    path.write_text("print('hello')\n" * 500)
+    handler = CompressionHandler(rolling=False, codecs={"Code": ("bzip2", 9)},
+                                 remove_originals=False)
+    assert handler.submit(str(path), "Code")
+    handler.shutdown()
+    with zipfile.ZipFile(str(path) + ".zip") as zf:
+        assert zf.infolist()[0].compress_type == zipfile.ZIP_BZIP2
+    assert path.exists()
+
+
+def test_each_folder_gets_its_own_archive(tmp_path):
+    handler = CompressionHandler(batch_size=1, workers=1)
+    paths = []
+    for folder in ("Organized", "Work"):
+        path = tmp_path / folder / "Documents" / "notes.txt"
+        path.parent.mkdir(parents=True)
+        path.write_text("all work and no play " * 1000)
+        paths.append(path)
+        assert handler.submit(str(path), "Documents")
+    handler.shutdown()
+
+    for path in paths:
+        with zipfile.ZipFile(path.parent / "Documents-0001.zip") as zf:
+            assert zf.namelist() == ["notes.txt"]
+        assert path.exists()  # originals are kept unless remove_originals is set
+
+
+def test_organizer_builds_the_handler_from_its_settings(tmp_path):
+    organizer = FileOrganizer([str(tmp_path)], str(tmp_path / "Organized"), config={
+        'enable_compression': True,
+        'compression': {'codecs': {'Documents': ['bzip2', 9]}, 'batch_size': 4,
+                        'max_archive_size': 1024 * 1024, 'remove_originals': True},
+    })
+    handler = organizer.compression_handler
+    assert handler.codecs == {'Documents': ('bzip2', 9)}
+    assert (handler.batch_size, handler.max_archive_size, handler.remove_originals) == (4, 1024 * 1024, True)
+    organizer.stop()
+
+    for settings in ({'codecs': {'Documents': ['zstd', 3]}}, {'batch_size': 0}, {'batchsize': 4}):
+        with pytest.raises(ValueError):
+            FileOrganizer([str(tmp_path)], str(tmp_path / "Organized"),
+                          config={'enable_compression': True, 'compression': settings})
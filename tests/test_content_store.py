@@ -0,0 +1,105 @@
+import os
+import sys
+import hashlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.content_store import ContentStore
+from core.FileOrganiser import FileOrganizer
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_duplicates_share_one_blob(tmp_path):
+    store = ContentStore(str(tmp_path / "dest"), "md5", link_mode="hardlink")
+    data = b"same content" * 100
+    digest = hashlib.md5(data).digest()
+    first = str(tmp_path / "dest" / "Docs" / "a.txt")
+    second = str(tmp_path / "dest" / "Docs" / "b.txt")
+    os.makedirs(os.path.dirname(first))
+
+    assert not store.store(_write(tmp_path / "in" / "a.txt", data), digest, first)['deduplicated']
+    result = store.store(_write(tmp_path / "in" / "b.txt", data), digest, second)
+    assert result['deduplicated'] and result['method'] == 'hardlink'
+    assert not os.path.exists(tmp_path / "in" / "b.txt")
+    assert os.stat(first).st_ino == os.stat(second).st_ino == os.stat(store.blob_path(digest)).st_ino
+    assert store.get_counters()['bytes_deduplicated'] == len(data)
+    assert sorted(store.references(digest)) == [first, second]
+    store.close()
+
+
+def test_colliding_digest_is_not_deduplicated(tmp_path):
+    store = ContentStore(str(tmp_path / "dest"), "md5", link_mode="hardlink")
+    digest = hashlib.md5(b"original").digest()
+    first = str(tmp_path / "dest" / "Docs" / "a.txt")
+    second = str(tmp_path / "dest" / "Docs" / "b.txt")
+    os.makedirs(os.path.dirname(first))
+    store.store(_write(tmp_path / "in" / "a.txt", b"original"), digest, first)
+
+    # Same digest, different bytes: what a crafted md5 collision looks like to the store
+    result = store.store(_write(tmp_path / "in" / "b.txt", b"imposter"), digest, second)
+    assert not result['deduplicated']
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        assert (a.read(), b.read()) == (b"original", b"imposter")
+    assert not os.path.exists(tmp_path / "in" / "b.txt")
+    assert store.references(digest) == [first]
+    assert store.get_counters()['collisions'] == 1
+    store.close()
+
+
+def test_gc_removes_only_unreferenced_blobs(tmp_path):
+    store = ContentStore(str(tmp_path / "dest"), "md5", link_mode="hardlink")
+    os.makedirs(tmp_path / "dest" / "Docs")
+    kept = str(tmp_path / "dest" / "Docs" / "kept.txt")
+    dropped = str(tmp_path / "dest" / "Docs" / "dropped.txt")
+    store.store(_write(tmp_path / "in" / "k", b"keep"), hashlib.md5(b"keep").digest(), kept)
+    store.store(_write(tmp_path / "in" / "d", b"drop"), hashlib.md5(b"drop").digest(), dropped)
+    os.unlink(dropped)
+
+    assert store.gc(dry_run=True)['removed'] == 1
+    result = store.gc()
+    assert result == {'blobs': 2, 'removed': 1, 'bytes_freed': 4, 'stale_refs': 1}
+    assert os.path.exists(store.blob_path(hashlib.md5(b"keep").digest()))
+    assert not os.path.exists(store.blob_path(hashlib.md5(b"drop").digest()))
+    store.close()
+
+
+def test_verify_reports_corrupt_blobs_in_slices(tmp_path):
+    store = ContentStore(str(tmp_path / "dest"), "md5", link_mode="hardlink")
+    os.makedirs(tmp_path / "dest" / "Docs")
+    digests = []
+    for i in range(5):
+        data = f"file {i}".encode()
+        digests.append(hashlib.md5(data).digest())
+        store.store(_write(tmp_path / "in" / f"{i}", data), digests[-1],
+                    str(tmp_path / "dest" / "Docs" / f"{i}.txt"))
+    with open(store.blob_path(digests[2]), 'ab') as f:
+        f.write(b"bit rot")
+
+    first = store.verify(limit=3)
+    rest = store.verify(start_after=first['last'])
+    assert first['checked'] == 3 and rest['checked'] == 2
+    assert [d for d, _ in first['corrupt'] + rest['corrupt']] == [digests[2]]
+    store.engine.shutdown()
+    store.close()
+
+
+def test_organizer_links_duplicates_into_place(tmp_path):
+    source = tmp_path / "Downloads"
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Documents": [".pdf"]})
+    organizer.config['content_store'] = True
+    organizer.start_time = 0
+    first = organizer.process_file(_write(source / "a.pdf", b"%PDF-1.4 same"))
+    second = organizer.process_file(_write(source / "copy of a.pdf", b"%PDF-1.4 same"))
+
+    assert second == str(tmp_path / "Organized" / "Documents" / "copy of a.pdf")
+    assert not (source / "copy of a.pdf").exists()
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        assert a.read() == b.read()
+    assert organizer.content_store.get_counters()['blobs_added'] == 1
+    organizer.stop()
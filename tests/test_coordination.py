@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.coordination import Coordinator, tree_key, shard_of
+from core.FileOrganiser import FileOrganizer
+
+
+def test_only_one_owner_holds_a_tree(tmp_path):
+    db = str(tmp_path / "coord.db")
+    first = Coordinator(db, owner="first")
+    second = Coordinator(db, owner="second")
+    key = tree_key(str(tmp_path))
+    assert first.acquire(key)
+    assert not second.acquire(key)
+    assert second.holder(key)['owner'] == "first"
+
+    first.release(key)
+    assert second.acquire(key)
+    first.close()
+    second.close()
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    db = str(tmp_path / "coord.db")
+    first = Coordinator(db, ttl=0.05, owner="first")
+    second = Coordinator(db, ttl=0.05, owner="second")
+    assert first.acquire("tree")
+    time.sleep(0.1)
+    assert second.acquire("tree")
+    first.renew()  # notices the takeover and drops the lease
+    assert "tree" not in first._held
+    first.close()
+    second.close()
+
+
+def test_a_file_is_claimed_by_one_process_at_a_time(tmp_path):
+    db = str(tmp_path / "coord.db")
+    first = Coordinator(db, owner="first")
+    second = Coordinator(db, owner="second")
+    assert first.claim("/tmp/a.pdf")
+    assert not second.claim("/tmp/a.pdf")
+    first.finish("/tmp/a.pdf")
+    assert second.claim("/tmp/a.pdf")
+    first.close()
+    second.close()
+
+
+def test_shards_split_paths_stably():
+    paths = [f"/downloads/file{i}.txt" for i in range(100)]
+    assignment = [shard_of(path, 4) for path in paths]
+    assert assignment == [shard_of(path, 4) for path in paths]
+    assert set(assignment) == {0, 1, 2, 3}
+
+
+def test_organizer_queues_only_its_shard(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizers = [FileOrganizer([str(source)], str(tmp_path / "Organized"), shard=(i, 2))
+                  for i in range(2)]
+    paths = [str(source / f"f{i}.txt") for i in range(20)]
+    for path in paths:
+        for organizer in organizers:
+            organizer._queue_path(path)
+    counts = [organizer.coalescer.pending_count() for organizer in organizers]
+    assert sum(counts) == len(paths)
+    for organizer in organizers:
+        organizer.stop()
+
+
+def test_claimed_file_is_left_to_its_owner(tmp_path):
+    db = str(tmp_path / "coord.db")
+    other = Coordinator(db, owner="other")
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    path = source / "a.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Documents": [".pdf"]},
+                              coordinator=Coordinator(db, owner="mine"))
+    organizer.start_time = 0
+
+    assert other.claim(str(path))
+    assert organizer.process_file(str(path)) is None
+    assert path.exists()
+    other.finish(str(path))
+    assert organizer.process_file(str(path)) is not None
+    assert not path.exists()
+    organizer.stop()
+    organizer.coordinator.close()
+    other.close()
+
+
+def test_shard_runs_with_metrics_disabled(tmp_path, monkeypatch):
+    import threading
+    import main
+    from core import coordination
+
+    class Settings:
+        destination_dir = str(tmp_path / "Organized")
+        file_types = {"Documents": [".pdf"]}
+        classifier = None
+        rules = None
+        organizer_config = {'metrics_port': None, 'metrics_snapshot': None}
+
+        def reload_if_changed(self):
+            return False
+
+    db = str(tmp_path / "coord.db")
+    monkeypatch.setattr(coordination, "Coordinator", lambda: Coordinator(db))
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    stop = threading.Event()
+    stop.set()
+    main.run_organizer(Settings(), [str(source)], shard=(1, 2), stop_event=stop)
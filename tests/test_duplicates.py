@@ -0,0 +1,66 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.duplicates import DuplicateHandler
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_index_survives_restart_and_sees_destination_tree(tmp_path):
+    dest = tmp_path / "organized"
+    index_path = str(tmp_path / "index" / "hashes.db")
+    existing = write(str(dest / "Documents" / "report.pdf"), b"quarterly numbers")
+
+    handler = DuplicateHandler(index_path=index_path, root=str(dest))
+    incoming = write(str(tmp_path / "downloads" / "report (1).pdf"), b"quarterly numbers")
+    assert handler.find_duplicate(incoming) == existing
+    handler.index.close()
+
+    # A fresh handler reuses the stored digest instead of re-hashing the tree
+    restarted = DuplicateHandler(index_path=index_path, root=str(dest))
+    restarted.get_file_digest = lambda path: (_ for _ in ()).throw(AssertionError(path))
+    assert restarted.find_duplicate(incoming) == existing
+
+
+def test_changed_files_are_rehashed(tmp_path):
+    dest = tmp_path / "organized"
+    existing = write(str(dest / "notes.txt"), b"version one")
+    handler = DuplicateHandler(root=str(dest))
+    incoming = write(str(tmp_path / "notes.txt"), b"version one")
+    assert handler.is_duplicate(incoming)
+
+    write(existing, b"version two")
+    os.utime(existing, ns=(1, 1))
+    assert not handler.is_duplicate(incoming)
+
+
+def test_tiers_avoid_reading_unrelated_large_files(tmp_path):
+    dest = tmp_path / "organized"
+    size = 256 * 1024
+    write(str(dest / "Videos" / "a.mp4"), b"a" * size)
+    handler = DuplicateHandler(root=str(dest), sample_size=4096)
+
+    # Different size: decided by the size tier without reading anything
+    other_size = write(str(tmp_path / "b.mp4"), b"a" * (size + 1))
+    assert not handler.is_duplicate(other_size)
+    # Same size, different tail: decided by the sample tier
+    other_tail = write(str(tmp_path / "c.mp4"), b"a" * (size - 1) + b"b")
+    assert not handler.is_duplicate(other_tail)
+    counters = handler.get_counters()
+    assert counters['bytes_hashed'] == 0
+    assert counters['unique_by_size'] == 1
+    assert counters['unique_by_sample'] == 1
+    assert counters['bytes_saved_by_size'] == size + 1
+
+    # Only a real collision pays for full hashes, and verified mode compares bytes
+    verified = DuplicateHandler(root=str(dest), mode='verified', sample_size=4096)
+    same = write(str(tmp_path / "d.mp4"), b"a" * size)
+    assert verified.find_duplicate(same) == str(dest / "Videos" / "a.mp4")
+    assert verified.get_counters()['full_hashes'] == 2
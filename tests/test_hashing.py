@@ -0,0 +1,43 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.hashing import HashEngine, hash_file
+
+
+@pytest.fixture
+def sample_files(tmp_path):
+    paths = []
+    for i, size in enumerate([0, 1, 4095, 4096, 100000]):
+        path = tmp_path / f"file_{i}.bin"
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+def expected(path, algorithm="md5"):
+    with open(path, "rb") as f:
+        return hashlib.new(algorithm, f.read()).digest()
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_hash_many_matches_hashlib(sample_files, mode):
+    engine = HashEngine("sha256", workers=2, mode=mode, chunk_size=4096)
+    try:
+        futures = engine.hash_many(sample_files)
+        assert [f.result() for f in futures] == [expected(p, "sha256") for p in sample_files]
+    finally:
+        engine.shutdown()
+
+
+def test_mmap_and_prefix_paths_agree(sample_files):
+    big = sample_files[-1]
+    with open(big, "rb") as f:
+        head = f.read(512)
+    assert hash_file(big, mmap_threshold=1, chunk_size=1000) == expected(big)
+    assert hash_file(big, prefix=head, chunk_size=1000) == expected(big)
+    assert hash_file(sample_files[0], mmap_threshold=0) == expected(sample_files[0])
@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import struct
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import inotify
+from core.inotify import InotifyObserver, IN_Q_OVERFLOW
+
+pytestmark = pytest.mark.skipif(not inotify.is_supported(), reason="inotify is Linux-only")
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.cond = threading.Condition()
+
+    def dispatch(self, event):
+        with self.cond:
+            self.events.append((event.event_type, event.dest_path or event.src_path))
+            self.cond.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.events) >= count, timeout)
+        return list(self.events)
+
+
+@pytest.fixture
+def observed(tmp_path):
+    recorder = Recorder()
+    observer = InotifyObserver()
+    observer.schedule(recorder, str(tmp_path), recursive=False)
+    observer.start()
+    yield tmp_path, recorder, observer
+    observer.stop()
+    observer.join()
+
+
+def test_reports_files_only_once_closed(observed):
+    tmp_path, recorder, _ = observed
+    path = tmp_path / "download.bin"
+    with open(path, "wb") as f:
+        f.write(b"part one")
+        f.flush()
+        time.sleep(0.2)
+        assert recorder.events == []
+        f.write(b"part two")
+    assert recorder.wait_for(1) == [("closed", str(path))]
+
+
+def test_reports_files_renamed_into_place(observed, tmp_path_factory):
+    tmp_path, recorder, _ = observed
+    outside = tmp_path_factory.mktemp("staging") / "file.pdf"
+    outside.write_bytes(b"%PDF")
+    os.replace(outside, tmp_path / "file.pdf")
+    assert recorder.wait_for(1) == [("moved", str(tmp_path / "file.pdf"))]
+
+
+def test_overflow_triggers_rescan(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    recorder = Recorder()
+    observer = InotifyObserver()
+    observer.schedule(recorder, str(tmp_path))
+    try:
+        observer.handle_events(struct.pack('iIII', -1, IN_Q_OVERFLOW, 0, 0))
+    finally:
+        observer.join()
+    assert observer.overflows == 1
+    assert sorted(recorder.events) == [("created", str(tmp_path / "a.txt")),
+                                       ("created", str(tmp_path / "b.txt"))]
+
+
+def test_one_fd_serves_every_directory_and_batches_reads(tmp_path):
+    dirs = [tmp_path / f"d{i}" for i in range(5)]
+    recorder = Recorder()
+    observer = InotifyObserver()
+    for directory in dirs:
+        directory.mkdir()
+        observer.schedule(recorder, str(directory))
+    # Events queue on the shared fd until the reader starts, then drain in bulk
+    for i in range(200):
+        (dirs[i % 5] / f"f{i}.txt").write_text("x")
+    observer.start()
+    try:
+        events = recorder.wait_for(200)
+    finally:
+        observer.stop()
+        observer.join()
+    assert len(events) == 200
+    assert observer.batches <= 2
+
+
+def test_organizer_picks_up_closed_files(tmp_path):
+    from core.FileOrganiser import FileOrganizer
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Documents": [".pdf"]})
+    organizer.start_time = 0
+    organizer.coalescer.quiet_period = 0.1
+    observer = InotifyObserver()
+    observer.schedule(organizer, str(source))
+    observer.start()
+    try:
+        (source / "doc.pdf").write_bytes(b"%PDF-1.4")
+        target = tmp_path / "Organized" / "Documents" / "doc.pdf"
+        deadline = time.time() + 5
+        while not target.exists() and time.time() < deadline:
+            time.sleep(0.05)
+        assert target.exists()
+    finally:
+        observer.stop()
+        observer.join()
+        organizer.stop()
@@ -0,0 +1,154 @@
+import os
+import sys
+import shutil
+import hashlib
+import subprocess
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.journal import MoveJournal
+from core.transfer import FileTransfer
+from features.content_store import ContentStore
+from core.FileOrganiser import FileOrganizer
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _interrupted(db, source, destination):
+    """Leave a planned move behind, as a process killed mid-move would"""
+    journal = MoveJournal(db)
+    journal.pid = _dead_pid()
+    journal.sync(journal.begin(str(source), str(destination), os.stat(source)))
+    journal.close()
+
+
+def test_concurrent_moves_share_commits(tmp_path):
+    journal = MoveJournal(str(tmp_path / "journal.db"))
+    st = os.stat(tmp_path)
+
+    def mover(n):
+        for i in range(50):
+            entry = journal.begin(f"/src/{n}-{i}", f"/dest/{n}-{i}", st)
+            journal.sync(entry)
+            journal.finish(entry)
+
+    threads = [threading.Thread(target=mover, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert journal.locate("/src/3-7") == "/dest/3-7"
+    counters = journal.counters
+    assert counters['records'] == 800
+    assert counters['batches'] < counters['records']
+    journal.close()
+
+
+def test_completed_copy_is_replayed(tmp_path):
+    db = str(tmp_path / "journal.db")
+    source, destination = tmp_path / "report.pdf", tmp_path / "Documents" / "report.pdf"
+    source.write_bytes(b"%PDF report")
+    destination.parent.mkdir()
+    shutil.copy2(source, destination)  # copied, but the source was never deleted
+    _interrupted(db, source, destination)
+
+    journal = MoveJournal(db)
+    assert journal.recover() == []
+    assert not source.exists() and destination.exists()
+    assert journal.locate(str(source)) == str(destination)
+    journal.close()
+
+
+def test_partial_copy_is_rolled_back(tmp_path):
+    db = str(tmp_path / "journal.db")
+    source, destination = tmp_path / "movie.mkv", tmp_path / "Videos" / "movie.mkv"
+    source.write_bytes(b"x" * 1000)
+    destination.parent.mkdir()
+    destination.write_bytes(b"")  # the claimed placeholder
+    partial = destination.parent / ".movie.mkv.fileforge-tmp"
+    partial.write_bytes(b"x" * 400)
+    _interrupted(db, source, destination)
+
+    journal = MoveJournal(db)
+    assert journal.recover() == [str(source)]
+    assert source.read_bytes() == b"x" * 1000
+    assert not destination.exists() and not partial.exists()
+    assert journal.locate(str(source)) is None
+    assert journal.recover() == []  # settled once
+    journal.close()
+
+
+def test_organizer_journals_moves(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Documents": [".pdf"]})
+    organizer.start_time = 0
+    (source / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    dest = organizer.process_file(str(source / "a.pdf"))
+    assert organizer.journal.locate(str(source / "a.pdf")) == dest
+    organizer.stop()
+
+
+def test_moves_planned_before_a_reboot_are_settled(tmp_path):
+    db = str(tmp_path / "journal.db")
+    source, destination = tmp_path / "a.pdf", tmp_path / "Documents" / "a.pdf"
+    source.write_bytes(b"%PDF a")
+    destination.parent.mkdir()
+    journal = MoveJournal(db)
+    journal.recover()  # opens the journal
+    journal.boot -= 3600  # stamp the plan as made before the last reboot
+    journal.begin(str(source), str(destination), os.stat(source))
+    journal.close()
+
+    # A live process with the same id (ours) cannot be the one that planned it
+    recovering = MoveJournal(db)
+    assert recovering.recover() == [str(source)]
+    recovering.close()
+
+
+def test_content_store_moves_are_journaled_to_their_folders(tmp_path):
+    journal = MoveJournal(str(tmp_path / "journal.db"))
+    transfer = FileTransfer(journal=journal)
+    store = ContentStore(str(tmp_path / "dest"), "md5", link_mode="hardlink", transfer=transfer)
+    data = b"same content" * 100
+    digest = hashlib.md5(data).digest()
+    os.makedirs(tmp_path / "dest" / "Docs")
+    for name in ("a.txt", "b.txt"):  # b.txt is a duplicate, deleted rather than moved
+        source = tmp_path / "in" / name
+        source.parent.mkdir(exist_ok=True)
+        source.write_bytes(data)
+        store.store(str(source), digest, str(tmp_path / "dest" / "Docs" / name))
+    for name in ("a.txt", "b.txt"):
+        assert journal.locate(str(tmp_path / "in" / name)) == str(tmp_path / "dest" / "Docs" / name)
+    assert journal.counters['records'] == 4
+    store.close()
+    journal.close()
+
+
+def test_file_stranded_in_the_blob_store_is_restored(tmp_path):
+    db = str(tmp_path / "journal.db")
+    source, destination = tmp_path / "in" / "a.txt", tmp_path / "Docs" / "a.txt"
+    blob = tmp_path / "objects" / "ab" / "abcd"
+    blob.parent.mkdir(parents=True)
+    source.parent.mkdir()
+    destination.parent.mkdir()
+    source.write_bytes(b"data")
+    journal = MoveJournal(db)
+    journal.pid = _dead_pid()
+    journal.sync(journal.begin(str(source), str(destination), os.stat(source), via=str(blob)))
+    journal.close()
+    # The crash came after the move into the store and before the link
+    os.replace(source, blob)
+    destination.write_bytes(b"")
+
+    recovering = MoveJournal(db)
+    assert recovering.recover() == [str(source)]
+    assert source.read_bytes() == b"data"
+    assert not destination.exists()
+    recovering.close()
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import threading
+import urllib.error
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.metrics import Metrics, MetricsServer, SnapshotWriter, Histogram
+
+def test_counter_is_exact_under_concurrency():
+    metrics = Metrics()
+    counter = metrics.counter('test_total')
+
+    def work():
+        for _ in range(10000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value == 80000
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram()
+    for _ in range(99):
+        histogram.observe(0.0003)
+    histogram.observe(2.0)
+    assert histogram.quantile(0.5) == 0.0005
+    assert histogram.quantile(0.99) == 0.0005
+    assert histogram.quantile(1.0) == 2.5
+
+def test_prometheus_text_and_json_snapshot(tmp_path):
+    metrics = Metrics()
+    metrics.counter('fileforge_errors_total', "Errors").inc(3)
+    metrics.gauge('fileforge_queue_depth', lambda: 7, "Depth")
+    metrics.histogram('fileforge_stage_seconds', "Stages", {'stage': 'move'}).observe(0.02)
+
+    text = metrics.render_prometheus()
+    assert 'fileforge_errors_total 3' in text
+    assert 'fileforge_queue_depth 7' in text
+    assert 'fileforge_stage_seconds_bucket{le="0.025",stage="move"} 1' in text
+    assert 'fileforge_stage_seconds_count{stage="move"} 1' in text
+
+    path = tmp_path / "metrics.json"
+    writer = SnapshotWriter(metrics, str(path), interval=60)
+    writer.write()
+    data = json.loads(path.read_text())
+    assert data['latency']['stage=move']['p50'] == 0.025
+
+def test_http_exporter_serves_metrics():
+    metrics = Metrics()
+    metrics.counter('fileforge_files_moved_total').inc()
+    server = MetricsServer(metrics, port=0)
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+        assert 'fileforge_files_moved_total 1' in body
+    finally:
+        server.stop()
+
+def test_state_changing_routes_need_a_local_post():
+    calls = []
+    server = MetricsServer(Metrics(), port=0, routes={'/trace': lambda query: {'enabled': False}},
+                           actions={'/trace': lambda query: calls.append(query) or {'enabled': True}})
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}/trace?enable=1"
+        assert json.loads(urllib.request.urlopen(url, timeout=5).read()) == {'enabled': False}
+        assert calls == []
+
+        post = urllib.request.Request(url, method='POST')
+        assert json.loads(urllib.request.urlopen(post, timeout=5).read()) == {'enabled': True}
+        assert calls == [{'enable': '1'}]
+
+        # A form on some web page posting to localhost
+        post.add_header('Origin', 'https://example.com')
+        try:
+            urllib.request.urlopen(post, timeout=5)
+            assert False, "cross-origin POST was accepted"
+        except urllib.error.HTTPError as e:
+            assert e.code == 403
+        assert len(calls) == 1
+    finally:
+        server.stop()
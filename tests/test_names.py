@@ -0,0 +1,52 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.names import NameAllocator
+
+
+def test_suffixes_continue_from_existing_files(tmp_path):
+    (tmp_path / "invoice.pdf").write_text("x")
+    (tmp_path / "invoice_1.pdf").write_text("x")
+    names = NameAllocator()
+    assert names.claim(str(tmp_path), "invoice.pdf") == str(tmp_path / "invoice_2.pdf")
+    assert names.claim(str(tmp_path), "invoice.pdf") == str(tmp_path / "invoice_3.pdf")
+    assert names.claim(str(tmp_path), "other.pdf") == str(tmp_path / "other.pdf")
+
+
+def test_files_created_behind_the_index_are_skipped(tmp_path):
+    names = NameAllocator()
+    assert names.claim(str(tmp_path), "a.txt") == str(tmp_path / "a.txt")
+    (tmp_path / "a_1.txt").write_text("someone else")
+    assert names.claim(str(tmp_path), "a.txt") == str(tmp_path / "a_2.txt")
+    assert (tmp_path / "a_1.txt").read_text() == "someone else"
+
+
+def test_concurrent_claims_never_collide(tmp_path):
+    names = NameAllocator()
+    claimed = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            path = names.claim(str(tmp_path / "Documents"), "report.pdf")
+            with lock:
+                claimed.append(path)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(claimed)) == 200
+    assert len(os.listdir(tmp_path / "Documents")) == 200
+
+
+def test_release_frees_the_placeholder(tmp_path):
+    names = NameAllocator()
+    path = names.claim(str(tmp_path), "song.mp3")
+    names.release(path)
+    assert not os.path.exists(path)
+    assert names.claim(str(tmp_path), "song.mp3") == path
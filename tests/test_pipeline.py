@@ -0,0 +1,63 @@
+import builtins
+import os
+import sys
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.FileOrganiser import FileOrganizer
+from core.record import FileRecord
+
+
+def count_calls(monkeypatch, counts):
+    """Wrap the filesystem calls the pipeline may make so each one is tallied"""
+    for module, name in [(os, "stat"), (os, "lstat"), (os, "open"), (os, "replace"),
+                         (os, "rename"), (os, "scandir"), (os, "makedirs"), (builtins, "open")]:
+        original = getattr(module, name)
+
+        def wrapper(*args, _original=original, _name=f"{module.__name__}.{name}", **kwargs):
+            counts[_name] += 1
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(module, name, wrapper)
+
+
+def test_new_file_costs_one_stat(tmp_path, monkeypatch):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Documents": [".pdf"],
+    })
+    organizer.start_time = 0
+
+    # First file warms the hash index and the destination name listing
+    (source / "first.pdf").write_bytes(b"%PDF-1.4 first")
+    assert organizer.process_file(str(source / "first.pdf"))
+
+    (source / "second.pdf").write_bytes(b"%PDF-1.4 second document")
+    counts = Counter()
+    count_calls(monkeypatch, counts)
+    dest = organizer.process_file(str(source / "second.pdf"))
+    monkeypatch.undo()
+
+    assert dest == str(tmp_path / "Organized" / "Documents" / "second.pdf")
+    # One stat, one header read, one O_EXCL name claim and one rename
+    assert counts == Counter({"os.stat": 1, "builtins.open": 1, "os.open": 1, "os.replace": 1})
+
+
+def test_record_from_coalescer_needs_no_stat(tmp_path, monkeypatch):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={})
+    organizer.start_time = 0
+    (source / "warmup").write_bytes(b"warm")
+    organizer.process_file(str(source / "warmup"))
+
+    path = source / "notes"
+    path.write_bytes(b"plain words")
+    record = FileRecord.from_path(str(path))
+    counts = Counter()
+    count_calls(monkeypatch, counts)
+    assert organizer.process_file(record)
+    monkeypatch.undo()
+
+    assert counts == Counter({"builtins.open": 1, "os.open": 1, "os.replace": 1})
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import reconcile
+from core.reconcile import Reconciler
+from core.FileOrganiser import FileOrganizer
+
+
+def _organizer(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Documents": [".pdf"],
+    })
+    # Every file looks like it predates startup, so only recovery can get it organized
+    organizer.start_time = time.time() + 3600
+    return organizer, source
+
+
+def _collect(organizer, monkeypatch):
+    recovered = []
+    original = organizer.recover
+
+    def recover(path):
+        recovered.append(os.path.basename(path))
+        original(path)
+    monkeypatch.setattr(organizer, "recover", recover)
+    return recovered
+
+
+def test_first_pass_is_a_baseline(tmp_path, monkeypatch):
+    organizer, source = _organizer(tmp_path)
+    (source / "old.pdf").write_bytes(b"%PDF old")
+    recovered = _collect(organizer, monkeypatch)
+    reconciler = Reconciler(organizer, [str(source)])
+    assert reconciler.run_once() == 0
+    assert recovered == []
+    assert os.path.exists(reconciler.path)
+    organizer.stop()
+
+
+def test_missed_file_is_recovered_and_organized(tmp_path, monkeypatch):
+    organizer, source = _organizer(tmp_path)
+    recovered = _collect(organizer, monkeypatch)
+    reconciler = Reconciler(organizer, [str(source)])
+    reconciler.run_once()
+
+    (source / "missed.pdf").write_bytes(b"%PDF missed")
+    (source / "partial.pdf.crdownload").write_bytes(b"still downloading")
+    assert reconciler.run_once() == 1
+    assert recovered == ["missed.pdf"]
+    dest = organizer.process_file(str(source / "missed.pdf"))
+    assert dest == str(tmp_path / "Organized" / "Documents" / "missed.pdf")
+    organizer.stop()
+
+
+def test_unchanged_directory_is_not_listed(tmp_path, monkeypatch):
+    organizer, source = _organizer(tmp_path)
+    (source / "old.pdf").write_bytes(b"%PDF old")
+    past = time.time() - 60
+    os.utime(source, (past, past))
+    reconciler = Reconciler(organizer, [str(source)])
+    reconciler.run_once()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged directory was listed")
+    monkeypatch.setattr(reconcile.os, "scandir", fail)
+    assert reconciler.run_once() == 0
+    assert reconciler.counters['dirs_skipped'] == 1
+    organizer.stop()
+
+
+def test_files_arriving_while_stopped_are_recovered_after_restart(tmp_path, monkeypatch):
+    organizer, source = _organizer(tmp_path)
+    (source / "old.pdf").write_bytes(b"%PDF old")
+    Reconciler(organizer, [str(source)]).run_once()
+
+    (source / "while-down.pdf").write_bytes(b"%PDF arrived while stopped")
+    recovered = _collect(organizer, monkeypatch)
+    restarted = Reconciler(organizer, [str(source)])
+    assert restarted.run_once() == 1
+    assert recovered == ["while-down.pdf"]
+
+    # Not organized yet when the daemon stops again, so it is offered once more
+    assert Reconciler(organizer, [str(source)]).run_once() == 1
+    organizer.stop()
+
+
+def test_shards_reconcile_their_own_files(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizers = [FileOrganizer([str(source)], str(tmp_path / "Organized"), shard=(i, 2),
+                                config={'reconcile_interval': 3600}) for i in range(2)]
+    for organizer in organizers:
+        organizer.start_reconciler()
+    for organizer in organizers:
+        organizer.reconciler.stop()  # the first (baseline) pass ran on start
+
+    names = [f"file{n}.pdf" for n in range(20)]
+    for name in names:
+        (source / name).write_bytes(b"%PDF")
+    owned = []
+    for organizer in organizers:
+        organizer.reconciler.run_once()
+        owned.append(set(organizer.reconciler._snapshot[str(source)]['entries']))
+        organizer.stop()
+
+    assert organizers[0].reconciler.path != organizers[1].reconciler.path
+    assert not owned[0] & owned[1]
+    assert owned[0] | owned[1] == set(names)
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rules import RuleEngine
+from core.record import FileRecord
+from core.FileOrganiser import FileOrganizer
+
+GB = 1024 ** 3
+
+
+def record(path, size=100, age=0, now=1_000_000):
+    return FileRecord(path, 1, 1, size, int((now - age) * 1e9), now - age)
+
+
+RULES = [
+    {"name": "big-installers", "extensions": [".exe", ".msi"], "min_size": "1GB",
+     "destination": "/mnt/bulk", "category": "Installers"},
+    {"name": "screenshots", "glob": "Screenshot*.png", "category": "Screenshots"},
+    {"name": "invoices", "regex": r"invoice[-_ ]?\d+", "category": "Invoices", "max_size": "5MB"},
+    {"name": "big-invoices", "regex": r"invoice", "category": "Invoices/Large"},
+    {"name": "stale-desktop", "source": "/home/u/Desktop", "min_age": "30d", "category": "Old"},
+    {"name": "archives", "extensions": [".tar.gz"], "category": "Backups"},
+]
+
+
+def test_first_matching_rule_wins_on_metadata():
+    engine = RuleEngine(RULES)
+    now = 1_000_000
+    assert engine.match(record("/dl/setup.exe", size=2 * GB), now).name == "big-installers"
+    assert engine.match(record("/dl/setup.exe", size=10), now) is None
+    assert engine.match(record("/dl/screenshot 2024.PNG"), now).name == "screenshots"
+    assert engine.match(record("/home/u/Desktop/notes.txt", age=40 * 86400), now).name == "stale-desktop"
+    assert engine.match(record("/home/u/Desktop/notes.txt", age=86400), now) is None
+    assert engine.match(record("/dl/site.tar.gz"), now).name == "archives"
+
+
+def test_failed_name_match_falls_through_to_later_pattern():
+    engine = RuleEngine(RULES)
+    now = 1_000_000
+    assert engine.match(record("/dl/my invoice-42.pdf", size=1024), now).name == "invoices"
+    assert engine.match(record("/dl/my invoice-42.pdf", size=50 * 1024 ** 2), now).name == "big-invoices"
+
+
+def test_invalid_rules_raise_and_keep_previous_rules():
+    engine = RuleEngine(RULES)
+    with pytest.raises(ValueError):
+        engine.load([{"glob": "*.txt"}])
+    with pytest.raises(ValueError):
+        engine.load([{"category": "X", "min_size": "lots"}])
+    assert len(engine) == len(RULES)
+
+
+def test_organizer_routes_by_rule_and_hot_reloads(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Documents": [".pdf"]})
+    organizer.start_time = 0
+
+    (source / "invoice_7.pdf").write_bytes(b"%PDF-1.4 invoice")
+    assert organizer.process_file(str(source / "invoice_7.pdf")) == \
+        str(tmp_path / "Organized" / "Documents" / "invoice_7.pdf")
+
+    # Swap rules in place; nothing else is rebuilt
+    organizer.rules.load([{"regex": "^invoice", "category": "Invoices",
+                           "destination": str(tmp_path / "Finance")}])
+    (source / "invoice_8.pdf").write_bytes(b"%PDF-1.4 another invoice")
+    assert organizer.process_file(str(source / "invoice_8.pdf")) == \
+        str(tmp_path / "Finance" / "Invoices" / "invoice_8.pdf")
+    organizer.stop()
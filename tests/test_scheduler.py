@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.scheduler import IOScheduler, TokenBucket, DeviceBudgets
+from core.transfer import FileTransfer
+
+
+def test_small_files_do_not_wait_for_a_large_one():
+    release = threading.Event()
+    done = []
+
+    def handler(item):
+        if item == "huge.iso":
+            release.wait(5)
+        done.append(item)
+
+    pool = IOScheduler(handler, workers=1, large_workers=1, large_threshold=1000)
+    pool.submit("Disk Images", "huge.iso", size=10 ** 9)
+    for n in range(5):
+        pool.submit("Documents", f"doc{n}.pdf", size=100)
+    deadline = time.monotonic() + 5
+    while len(done) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert done == [f"doc{n}.pdf" for n in range(5)]
+    release.set()
+    pool.shutdown()
+    assert done[-1] == "huge.iso"
+    assert pool.get_metrics()['large_completed'] == 1
+
+
+def test_source_directories_take_turns():
+    gate = threading.Event()
+    order = []
+
+    def handler(item):
+        gate.wait(5)
+        order.append(item)
+
+    pool = IOScheduler(handler, workers=1, large_workers=0)
+    pool.submit("block", "first", source="other")
+    time.sleep(0.05)  # the single worker is now holding "first"
+    for n in range(3):
+        pool.submit(f"k{n}", f"a{n}", source="Downloads")
+    for n in range(3):
+        pool.submit(f"k{n}", f"b{n}", source="Desktop")
+    gate.set()
+    pool.shutdown()
+    assert order == ["first", "a0", "b0", "a1", "b1", "a2", "b2"]
+
+
+def test_token_bucket_holds_the_average_rate():
+    bucket = TokenBucket(rate=1000)
+    started = time.monotonic()
+    for _ in range(3):
+        bucket.consume(500)
+    # 1000 tokens were available up front, the remaining 500 take half a second
+    assert 0.4 <= time.monotonic() - started < 1.0
+
+
+def test_cross_device_copies_are_charged_to_the_destination_budget(tmp_path):
+    budgets = DeviceBudgets({str(tmp_path): {'bytes_per_sec': 10 ** 9, 'iops': 1000}})
+    calls = []
+    original = budgets.io
+
+    def record(path, nbytes=0, ops=0):
+        calls.append((nbytes, ops))
+        original(path, nbytes, ops)
+
+    budgets.io = record
+    transfer = FileTransfer(buffer_size=4096, throttle=budgets)
+    transfer._reflink_supported = transfer._copy_file_range_supported = False
+    transfer._sendfile_supported = False
+    source = tmp_path / "a.bin"
+    source.write_bytes(b"x" * 10000)
+    transfer._copy_across_devices(str(source), str(tmp_path / "b.bin"), source.stat(), None)
+    assert sum(nbytes for nbytes, _ in calls) == 10000
+
+    transfer.move(str(tmp_path / "b.bin"), str(tmp_path / "c.bin"))
+    assert calls[-1] == (0, 1)
+
+
+def test_one_key_never_runs_in_both_lanes():
+    release = threading.Event()
+    running = set()
+    overlaps = []
+    order = []
+
+    def handler(item):
+        key = item.split(":")[0]
+        if key in running:
+            overlaps.append(item)
+        running.add(key)
+        if item == "Videos:movie.mkv":
+            release.wait(5)
+        order.append(item)
+        running.discard(key)
+
+    pool = IOScheduler(handler, workers=2, large_workers=1, large_threshold=1000)
+    pool.submit("Videos", "Videos:movie.mkv", size=10 ** 9)
+    pool.submit("Videos", "Videos:clip.mp4", size=100)
+    pool.submit("Documents", "Documents:a.pdf", size=100)
+    time.sleep(0.1)
+    # The small file waits for the large one in its folder, other folders do not
+    assert order == ["Documents:a.pdf"]
+    release.set()
+    pool.shutdown()
+    assert order == ["Documents:a.pdf", "Videos:movie.mkv", "Videos:clip.mp4"]
+    assert overlaps == []
@@ -0,0 +1,66 @@
+import builtins
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sniffer import ContentSniffer, sniff
+from core.FileOrganiser import FileOrganizer
+
+
+def test_signatures():
+    assert sniff(b"\x89PNG\r\n\x1a\n....") == ".png"
+    assert sniff(b"%PDF-1.7\n") == ".pdf"
+    assert sniff(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == ".webp"
+    assert sniff(b"\x00\x00\x00\x18ftypisom") == ".mp4"
+    assert sniff(b"\x00\x00\x00\x14ftypqt  ") == ".mov"
+    assert sniff(b"\x00\x00\x00\x18ftypheic") == ".heic"
+    assert sniff(b"\x00\x00\x00\x1cftypavif") == ".avif"
+    assert sniff(b"\x00\x00\x00\x18ftypcrx ") is None
+    assert sniff(b"PK\x03\x04" + b"\x00" * 26 + b"[Content_Types].xml word/document.xml") == ".docx"
+    assert sniff(b"PK\x03\x04" + b"\x00" * 26 + b"mimetypeapplication/epub+zip") == ".epub"
+    assert sniff(b"\x00" * 257 + b"ustar\x0000") == ".tar"
+    assert sniff(b"plain text") is None
+
+
+def test_cache_skips_reopening_unchanged_files(tmp_path, monkeypatch):
+    path = tmp_path / "scan"
+    path.write_bytes(b"%PDF-1.4 rest of file")
+    sniffer = ContentSniffer()
+    assert sniffer.probe(str(path)) == (".pdf", b"%PDF-1.4 rest of file")
+
+    def fail_open(*args, **kwargs):
+        raise AssertionError("file reopened")
+    monkeypatch.setattr(builtins, "open", fail_open)
+    assert sniffer.probe(str(path)) == (".pdf", b"")
+
+
+def test_extensionless_download_is_classified_by_content(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    (source / "statement").write_bytes(b"%PDF-1.4 statement")
+    (source / "setup.msi").write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1 installer")
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Documents": [".pdf", ".doc"],
+    })
+    organizer.process_file(str(source / "statement"), include_existing=True)
+    organizer.process_file(str(source / "setup.msi"), include_existing=True)
+    assert os.path.exists(tmp_path / "Organized" / "Documents" / "statement.pdf")
+    assert os.path.exists(tmp_path / "Organized" / "Others" / "setup.msi")
+
+
+def test_heic_photo_is_not_taken_for_a_video(tmp_path):
+    source = tmp_path / "DCIM"
+    source.mkdir()
+    (source / "IMG_0001.heic").write_bytes(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic")
+    (source / "IMG_0002").write_bytes(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic")
+    (source / "IMG_0003.heif").write_bytes(b"\x00\x00\x00\x18ftypmif1\x00\x00\x00\x00mif1heic")
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Images": [".jpg", ".heic"], "Videos": [".mp4"],
+    })
+    organizer.process_file(str(source / "IMG_0001.heic"), include_existing=True)
+    organizer.process_file(str(source / "IMG_0002"), include_existing=True)
+    organizer.process_file(str(source / "IMG_0003.heif"), include_existing=True)
+    assert os.path.exists(tmp_path / "Organized" / "Images" / "IMG_0001.heic")
+    assert os.path.exists(tmp_path / "Organized" / "Images" / "IMG_0002.heic")
+    assert os.path.exists(tmp_path / "Organized" / "Others" / "IMG_0003.heif")
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.cache import load_cached
+from core.FileOrganiser import FileOrganizer
+
+
+def test_config_cache_is_reused_until_the_json_changes(tmp_path):
+    source = tmp_path / "file_types.json"
+    source.write_text(json.dumps({"Documents": [".pdf"]}))
+    cache = str(tmp_path / "cache" / "types.cache")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return json.loads(source.read_text())
+
+    assert load_cached(cache, [str(source)], build) == {"Documents": [".pdf"]}
+    assert load_cached(cache, [str(source)], build) == {"Documents": [".pdf"]}
+    assert len(builds) == 1
+
+    source.write_text(json.dumps({"Documents": [".pdf", ".txt"]}))
+    os.utime(source, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert load_cached(cache, [str(source)], build) == {"Documents": [".pdf", ".txt"]}
+    assert len(builds) == 2
+
+
+def test_corrupt_cache_falls_back_to_build(tmp_path):
+    source = tmp_path / "rules.json"
+    source.write_text("[]")
+    cache = tmp_path / "rules.cache"
+    cache.write_bytes(b"not a pickle")
+    assert load_cached(str(cache), [str(source)], lambda: "built") == "built"
+    assert load_cached(str(cache), [str(source)], lambda: "rebuilt") == "built"
+
+
+def test_organizer_defers_handlers_and_directories(tmp_path):
+    dest = tmp_path / "Organized"
+    organizer = FileOrganizer([str(tmp_path)], str(dest), file_types={"Documents": [".pdf"]})
+    organizer.config['enable_duplicates'] = False
+    assert not dest.exists()
+
+    organizer.start_time = 0
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+    assert organizer.process_file(str(tmp_path / "a.pdf"))
+    assert organizer._duplicate_handler is None
+    assert organizer._compression_handler is None
+    # Only the used category folder, plus the move journal
+    assert sorted(os.listdir(dest)) == [".fileforge", "Documents"]
+
+    organizer._queue_path(str(tmp_path / "b.pdf"))
+    report = organizer.startup_report()
+    assert 0 <= report['ready_seconds'] <= report['first_event_seconds']
+    organizer.stop()
+
+
+def test_organizer_settings_apply_at_construction(tmp_path):
+    organizer = FileOrganizer([str(tmp_path)], str(tmp_path / "Organized"), config={
+        'workers': 2, 'quiet_period': 0.5, 'large_file_threshold': 1024,
+        'io_budget': {'iops': 100}, 'no_such_setting': True,
+    })
+    assert organizer.worker_pool.workers == 2
+    assert organizer.worker_pool.large_threshold == 1024
+    assert organizer.coalescer.quiet_period == 0.5
+    assert organizer.io_budgets.default == {'iops': 100}
+    assert 'no_such_setting' not in organizer.config
+    organizer.stop()
+
+
+def test_daemon_defers_sqlite_until_it_is_needed(tmp_path):
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('sqlite3' in sys.modules)"],
+        cwd=root, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert loaded == "False"
+
+    # With no journal yet there is nothing to recover, and no journal is opened to find that out
+    organizer = FileOrganizer([str(tmp_path)], str(tmp_path / "Organized"))
+    organizer.recover_moves()
+    assert organizer._journal is None
+    assert not (tmp_path / "Organized").exists()
+    organizer.stop()
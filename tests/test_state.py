@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.state import LRUCache
+from core.names import NameAllocator
+from core.FileOrganiser import FileOrganizer
+
+
+def test_lru_evicts_oldest_instead_of_clearing():
+    cache = LRUCache(max_size=3)
+    for key in "abc":
+        cache.add(key)
+    assert "a" in cache  # touching "a" makes "b" the oldest
+    cache.add("d")
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.evictions == 1
+
+
+def test_lru_entries_expire_after_ttl():
+    cache = LRUCache(max_size=10, ttl=0.05)
+    cache.put("x", 1)
+    assert cache.get("x") == 1
+    time.sleep(0.1)
+    cache.put("y", 2)
+    assert cache.prune() == 1
+    assert cache.get("x") is None and cache.get("y") == 2
+
+
+def test_name_allocator_keeps_a_bounded_number_of_listings(tmp_path):
+    names = NameAllocator(max_dirs=2, max_names=3)
+    for i in range(4):
+        for j in range(5):
+            names.claim(str(tmp_path / f"d{i}"), f"f{j}.txt")
+    assert len(names._dirs) == 2
+    assert len(names) <= 6
+    # Untracked names are still caught by the exclusive create
+    assert names.claim(str(tmp_path / "d3"), "f4.txt").endswith("f4_1.txt")
+
+
+def test_memory_report_counts_every_claimed_name(tmp_path):
+    organizer = FileOrganizer([str(tmp_path / "Downloads")], str(tmp_path / "Organized"))
+    directory = str(tmp_path / "Organized" / "Documents")
+    os.makedirs(directory)
+    organizer.names.claim(directory, "first.txt")
+    small = organizer.memory_report()['destination_names']['bytes']
+    for i in range(2000):
+        organizer.names.claim(directory, f"file {i}.txt")
+    large = organizer.memory_report()['destination_names']['bytes']
+    # Each name is a set slot plus a string object of about 60 bytes
+    assert large - small > 2000 * 60
+    organizer.stop()
+
+
+def test_organizer_ignores_its_own_moves_and_reports_memory(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"),
+                              file_types={"Documents": [".pdf"]})
+    organizer.start_time = 0
+    (source / "a.pdf").write_bytes(b"%PDF-1.4")
+    dest = organizer.process_file(str(source / "a.pdf"))
+
+    organizer._queue_path(dest)
+    assert organizer.coalescer.pending_count() == 0
+
+    report = organizer.memory_report()
+    assert report['processed_files']['entries'] == 1
+    assert all(usage['bytes'] > 0 for usage in report.values())
+    organizer.stop()
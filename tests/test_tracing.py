@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import pstats
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.FileOrganiser import FileOrganizer
+from features.tracing import Tracer, NULL_SPAN
+
+
+def make_organizer(tmp_path):
+    source = tmp_path / "Downloads"
+    source.mkdir()
+    organizer = FileOrganizer([str(source)], str(tmp_path / "Organized"), file_types={
+        "Documents": [".pdf"],
+    })
+    organizer.start_time = 0
+    return organizer, source
+
+
+def test_disabled_tracer_hands_out_null_span():
+    tracer = Tracer()
+    with tracer.span('move', 10) as span:
+        span.outcome = 'moved'
+    assert span is NULL_SPAN
+    assert len(tracer.spans) == 0
+
+
+def test_spans_record_stage_size_and_outcome(tmp_path):
+    organizer, source = make_organizer(tmp_path)
+    organizer.tracer.enable()
+    (source / "report.pdf").write_bytes(b"%PDF-1.4 report")
+    assert organizer.process_file(str(source / "report.pdf"))
+
+    by_name = {span.name: span for span in organizer.tracer.spans}
+    assert {'sniff', 'classify', 'hash', 'claim', 'move', 'log'} <= set(by_name)
+    assert by_name['process_file'].outcome == 'moved'
+    assert by_name['process_file'].size == len(b"%PDF-1.4 report")
+    assert by_name['move'].outcome == 'rename'
+
+    trace_path = tmp_path / "trace.json"
+    assert organizer.tracer.dump_trace(str(trace_path)) == len(organizer.tracer.spans)
+    assert json.loads(trace_path.read_text())['traceEvents'][0]['ph'] == 'X'
+    organizer.stop()
+
+
+def test_profile_window_writes_pstats(tmp_path):
+    organizer, source = make_organizer(tmp_path)
+    profile_path = str(tmp_path / "window.prof")
+    assert organizer.tracer.profile(60, profile_path)
+    (source / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    organizer.process_file(str(source / "a.pdf"))
+    assert organizer.tracer.stop_profile(profile_path)
+
+    assert not organizer.tracer.enabled
+    stats = pstats.Stats(profile_path)
+    assert any(func[2] == 'probe' for func in stats.stats)
+    organizer.stop()
@@ -0,0 +1,116 @@
+import errno
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import transfer as transfer_module
+from core.transfer import FileTransfer
+
+
+def md5_file(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).digest()
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if not os.path.basename(src).endswith(".fileforge-tmp"):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        real_replace(src, dst)
+    monkeypatch.setattr(transfer_module.os, "replace", replace)
+
+
+def make_source(tmp_path, size=300000):
+    source = tmp_path / "big.iso"
+    source.write_bytes(os.urandom(size))
+    (tmp_path / "dest").mkdir()
+    return str(source), str(tmp_path / "dest" / "big.iso")
+
+
+def test_same_device_move_is_a_rename(tmp_path):
+    source, dest = make_source(tmp_path)
+    result = FileTransfer().move(source, dest)
+    assert result["method"] == "rename"
+    assert os.path.exists(dest) and not os.path.exists(source)
+
+
+@pytest.mark.parametrize("disable", [(), ("_reflink_supported",),
+                                     ("_reflink_supported", "_copy_file_range_supported"),
+                                     ("_reflink_supported", "_copy_file_range_supported",
+                                      "_sendfile_supported")])
+def test_cross_device_copy_paths(tmp_path, cross_device, disable):
+    source, dest = make_source(tmp_path)
+    digest = md5_file(source)
+    progress = []
+    transfer = FileTransfer(buffer_size=65536, fsync="batch", verify_with=md5_file,
+                            progress=lambda path, done, total: progress.append(done),
+                            progress_interval=100000)
+    for flag in disable:
+        setattr(transfer, flag, False)
+
+    result = transfer.move(source, dest, expected_digest=digest)
+    transfer.flush()
+    assert md5_file(dest) == digest
+    assert not os.path.exists(source)
+    assert result["bytes"] == 300000
+    if result["method"] != "reflink":
+        assert progress and progress == sorted(progress)
+    assert os.listdir(os.path.dirname(dest)) == ["big.iso"]
+
+
+def test_failed_verification_keeps_source(tmp_path, cross_device):
+    source, dest = make_source(tmp_path)
+    transfer = FileTransfer(verify_with=md5_file)
+    with pytest.raises(OSError):
+        transfer.move(source, dest, expected_digest=b"not the digest")
+    assert os.path.exists(source)
+    assert os.listdir(os.path.dirname(dest)) == []
+
+
+@pytest.mark.parametrize("disable", [(), ("_copy_file_range_supported",),
+                                     ("_copy_file_range_supported", "_sendfile_supported")])
+def test_source_truncated_mid_copy_fails_the_move(tmp_path, cross_device, disable):
+    source, dest = make_source(tmp_path)
+
+    def truncate(path, done, total):
+        os.truncate(source, done)
+    transfer = FileTransfer(buffer_size=65536, progress=truncate, progress_interval=65536)
+    transfer._reflink_supported = False
+    for flag in disable:
+        setattr(transfer, flag, False)
+
+    with pytest.raises(OSError) as info:
+        transfer.move(source, dest)
+    assert info.value.errno == errno.EIO
+    assert os.path.exists(source)
+    assert os.listdir(tmp_path / "dest") == []
+
+
+@pytest.mark.parametrize("fsync", ["each", "batch"])
+def test_copy_is_on_disk_before_the_source_is_deleted(tmp_path, cross_device, monkeypatch, fsync):
+    source, dest = make_source(tmp_path)
+    events = []
+    real_fsync, real_unlink = os.fsync, os.unlink
+
+    def record_fsync(fd):
+        events.append(("fsync", os.path.realpath(f"/proc/self/fd/{fd}")))
+        real_fsync(fd)
+
+    def record_unlink(path):
+        events.append(("unlink", path))
+        real_unlink(path)
+    monkeypatch.setattr(transfer_module.os, "fsync", record_fsync)
+    monkeypatch.setattr(transfer_module.os, "unlink", record_unlink)
+
+    FileTransfer(fsync=fsync).move(source, dest)
+    before_unlink = events[:events.index(("unlink", source))]
+    temp_path = os.path.join(os.path.dirname(dest), ".big.iso.fileforge-tmp")
+    assert ("fsync", os.path.realpath(temp_path)) in before_unlink
+    assert ("fsync", os.path.realpath(os.path.dirname(dest))) in before_unlink
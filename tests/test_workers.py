@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.workers import WorkerPool
+
+
+def test_same_key_runs_in_order_and_keys_run_in_parallel():
+    seen = []
+    running = set()
+    overlap = threading.Event()
+    lock = threading.Lock()
+
+    def handler(item):
+        key, n = item
+        with lock:
+            assert key not in running
+            running.add(key)
+            if len(running) > 1:
+                overlap.set()
+        time.sleep(0.01)
+        with lock:
+            running.discard(key)
+            seen.append(item)
+
+    pool = WorkerPool(handler, workers=4)
+    for n in range(10):
+        for key in ("Documents", "Videos", "Images"):
+            pool.submit(key, (key, n))
+    assert pool.drain(timeout=5)
+    pool.shutdown()
+
+    for key in ("Documents", "Videos", "Images"):
+        assert [n for k, n in seen if k == key] == list(range(10))
+    assert overlap.is_set()
+    assert pool.get_metrics()['completed'] == 30
+
+
+def test_full_queue_applies_backpressure():
+    release = threading.Event()
+    pool = WorkerPool(lambda item: release.wait(), workers=1, max_pending=2)
+    assert pool.submit("a", 1)
+    assert pool.submit("a", 2)
+    assert not pool.submit("a", 3, timeout=0.05)
+    release.set()
+    pool.shutdown(drain=True, timeout=5)
+    assert pool.get_metrics()['completed'] == 2
+    assert not pool.submit("a", 4)